@@ -0,0 +1,208 @@
+"""
+DogMatch ANN Index - Busca aproximada de vizinhos (IVF) para catálogos grandes
+
+Este arquivo contém a classe IVFIndex, um índice de arquivo invertido (IVF)
+em NumPy puro para catálogos de dezenas/centenas de milhares de linhas (raças
+do dataset completo, mestiços, perfis de cães de abrigo), onde a busca exata
+do SimilarityIndex deixa de caber em menos de 1 ms por consulta.
+
+Construção: k-means (esférico para cosine) sobre uma amostra do catálogo gera
+n_lists centróides; cada linha vai para a lista do centróide mais próximo e o
+catálogo é reordenado para que cada lista fique contígua em memória.
+
+Consulta: as n_probe listas com centróides mais próximos da consulta são
+varridas e os candidatos são ordenados pela distância exata (mesma fórmula do
+SimilarityIndex). n_probe controla o compromisso recall x latência.
+"""
+
+from typing import Any, Optional, Tuple
+
+import numpy as np
+
+
+# Métricas suportadas pelo IVF (aliases normalizados como no SimilarityIndex)
+SUPPORTED_METRICS = ('cosine', 'euclidean', 'l2', 'minkowski')
+
+# Parâmetros padrão de treino do quantizador
+KMEANS_ITERATIONS = 15
+KMEANS_SAMPLE_SIZE = 50_000
+
+
+class IVFIndex:
+    """
+    Índice aproximado de vizinhos mais próximos (inverted file) sobre uma matriz fixa.
+
+    Mesma interface de consulta do SimilarityIndex: query(X, k) -> (distâncias, índices).
+    """
+
+    def __init__(self, data: Any, metric: str = 'cosine', p: float = 2, n_lists: Optional[int] = None,
+                 n_probe: Optional[int] = None, dtype: Any = np.float64, seed: int = 0):
+        """
+        Args:
+            data: Matriz do catálogo (n_amostras, n_features)
+            metric: 'cosine' ou 'euclidean' (ou minkowski com p=2)
+            p: Parâmetro da métrica minkowski (apenas p=2 é suportado)
+            n_lists: Número de listas/centróides (padrão: ~sqrt(n_amostras))
+            n_probe: Listas varridas por consulta (padrão: ~n_lists/32, mínimo 8)
+            dtype: Tipo de ponto flutuante do índice
+            seed: Semente do k-means (índices reprodutíveis)
+
+        Raises:
+            ValueError: Se a métrica não for suportada
+        """
+        if metric not in SUPPORTED_METRICS or (metric == 'minkowski' and p != 2):
+            raise ValueError(f"Métrica não suportada pelo índice IVF: {metric}. "
+                             f"Métricas suportadas: ['cosine', 'euclidean']")
+        self.metric = 'cosine' if metric == 'cosine' else 'euclidean'
+        self.p = p
+        self.dtype = np.dtype(dtype)
+
+        data = np.ascontiguousarray(data, dtype=self.dtype)
+        self.n_samples = data.shape[0]
+        if self.n_samples == 0:
+            raise ValueError("Catálogo vazio: não é possível construir o índice IVF")
+
+        self.n_lists = int(n_lists) if n_lists else max(1, int(round(np.sqrt(self.n_samples))))
+        self.n_lists = min(self.n_lists, self.n_samples)
+        self.n_probe = int(n_probe) if n_probe else min(self.n_lists, max(8, self.n_lists // 32))
+
+        # Vetores usados na busca (cosine: linhas normalizadas)
+        vectors = self._normalize(data) if self.metric == 'cosine' else data
+
+        # Quantizador grosso e atribuição de cada linha a uma lista
+        rng = np.random.default_rng(seed)
+        self.centroids = self._train_centroids(vectors, rng)
+        assignments = self._nearest_centroids(vectors, self.centroids, 1)[:, 0]
+
+        # Catálogo reordenado por lista (cada lista contígua) + offsets
+        order = np.argsort(assignments, kind='stable')
+        self._ids = order.astype(np.intp)
+        self._vectors = np.ascontiguousarray(vectors[order])
+        self._sq_norms = np.einsum('ij,ij->i', self._vectors, self._vectors)
+        counts = np.bincount(assignments, minlength=self.n_lists)
+        self._offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.intp)
+
+    @classmethod
+    def from_estimator(cls, estimator: Any, data: Any = None, **options: Any) -> 'IVFIndex':
+        """
+        Cria o índice com a mesma métrica de um NearestNeighbors/KNeighbors* treinado.
+        """
+        if data is None:
+            data = estimator._fit_X
+        metric = estimator.metric if isinstance(estimator.metric, str) else None
+        if getattr(estimator, 'metric_params', None):
+            p = estimator.metric_params.get('p', estimator.p)
+        else:
+            p = getattr(estimator, 'p', 2)
+        return cls(data, metric=metric, p=p, **options)
+
+    def __len__(self) -> int:
+        return self.n_samples
+
+    @staticmethod
+    def _normalize(X: np.ndarray) -> np.ndarray:
+        norms = np.sqrt(np.einsum('ij,ij->i', X, X))
+        norms[norms == 0.0] = 1.0
+        return X / norms[:, np.newaxis]
+
+    def _train_centroids(self, vectors: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        """
+        k-means (Lloyd) sobre uma amostra; centróides normalizados no caso cosine.
+        """
+        sample = vectors
+        if len(vectors) > KMEANS_SAMPLE_SIZE:
+            sample = vectors[rng.choice(len(vectors), KMEANS_SAMPLE_SIZE, replace=False)]
+
+        centroids = sample[rng.choice(len(sample), self.n_lists, replace=False)].copy()
+        for _ in range(KMEANS_ITERATIONS):
+            assignments = self._nearest_centroids(sample, centroids, 1)[:, 0]
+            counts = np.bincount(assignments, minlength=self.n_lists)
+
+            sums = np.empty_like(centroids)
+            for j in range(sample.shape[1]):
+                sums[:, j] = np.bincount(assignments, weights=sample[:, j], minlength=self.n_lists)
+
+            # Listas vazias recebem um ponto aleatório da amostra
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+            counts[empty] = 1
+            centroids = sums / counts[:, np.newaxis]
+            if self.metric == 'cosine':
+                centroids = self._normalize(centroids)
+
+        return np.ascontiguousarray(centroids)
+
+    def _nearest_centroids(self, X: np.ndarray, centroids: np.ndarray, n: int) -> np.ndarray:
+        """
+        Índices dos n centróides mais próximos de cada linha de X (sem ordem entre eles).
+        """
+        if self.metric == 'cosine':
+            scores = X @ centroids.T                      # maior similaridade = mais próximo
+        else:
+            scores = 2 * (X @ centroids.T) - np.einsum('ij,ij->i', centroids, centroids)
+        if n >= scores.shape[1]:
+            return np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+        if n == 1:
+            return np.argmax(scores, axis=1)[:, np.newaxis]
+        return np.argpartition(-scores, n - 1, axis=1)[:, :n]
+
+    def query(self, X: Any, k: int, n_probe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca aproximada dos k vizinhos mais próximos de cada linha de X.
+
+        Args:
+            X: Consultas (n_consultas, n_features) ou um único vetor
+            k: Número de vizinhos (limitado ao tamanho do catálogo)
+            n_probe: Listas varridas por consulta (padrão: self.n_probe)
+
+        Returns:
+            (distâncias, índices), ambos com shape (n_consultas, k), ordenados
+            da menor para a maior distância
+
+        Raises:
+            ValueError: Se X contiver NaN/infinito
+        """
+        X = np.asarray(X, dtype=self.dtype)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity.")
+
+        k = max(1, min(int(k), self.n_samples))
+        n_probe = min(int(n_probe or self.n_probe), self.n_lists)
+
+        queries = self._normalize(X) if self.metric == 'cosine' else X
+        probes = self._nearest_centroids(queries, self.centroids, n_probe)
+
+        distances = np.empty((X.shape[0], k), dtype=self.dtype)
+        indices = np.empty((X.shape[0], k), dtype=np.intp)
+        for row in range(X.shape[0]):
+            distances[row], indices[row] = self._query_one(queries[row], probes[row], k)
+        return distances, indices
+
+    def _query_one(self, query: np.ndarray, lists: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k exato entre os candidatos das listas sondadas.
+
+        Cada lista é contígua em self._vectors, então as distâncias são
+        calculadas sobre fatias (views), sem copiar os candidatos.
+        """
+        starts, stops = self._offsets[lists], self._offsets[lists + 1]
+        if int((stops - starts).sum()) < k:
+            # Poucas linhas nas listas sondadas: varrer todas
+            starts, stops = np.array([0]), np.array([self.n_samples])
+
+        dots = np.concatenate([self._vectors[start:stop] @ query for start, stop in zip(starts, stops)])
+        rows = np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops)])
+
+        if self.metric == 'cosine':
+            distances = 1 - dots
+            np.clip(distances, 0, 2, out=distances)
+        else:
+            distances = self._sq_norms[rows] - 2 * dots + query @ query
+            np.maximum(distances, 0, out=distances)
+            np.sqrt(distances, out=distances)
+
+        top = np.argpartition(distances, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+        top = top[np.argsort(distances[top], kind='stable')]
+        return distances[top], self._ids[rows[top]]
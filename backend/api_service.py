@@ -0,0 +1,596 @@
+"""
+DogMatch API Service - Lógica dos endpoints compartilhada entre Flask e ASGI
+
+Este arquivo concentra o que não depende do framework web: o registro de
+versões do predictor (uma ativa por processo), o cache de resultados e o corpo
+de cada endpoint. Cada handler recebe dados já extraídos da requisição e retorna
+(payload, status HTTP); app.py (Flask/WSGI) e asgi_app.py (FastAPI/ASGI) só
+fazem a tradução de/para o framework.
+"""
+
+import atexit
+import datetime
+import hashlib
+import hmac
+import os
+import threading
+import time
+from typing import Dict, Any, Callable, Optional, Tuple
+
+import json_codec
+from dogmatch_predictor import DogMatchPredictor, MissingFieldsError, EXAMPLE_INPUT, BREED_NEIGHBORS_K
+from metrics import MetricsRegistry
+from model_registry import ModelRegistry, ModelVersion
+from request_coalescer import RequestCoalescer
+from result_cache import ResultCache
+from shared_catalog import remove_written_segments
+
+
+API_VERSION = '1.0.0'
+
+# Tamanho máximo de um lote em /api/recommend/batch
+MAX_BATCH_SIZE = int(os.environ.get('DOGMATCH_MAX_BATCH_SIZE', 5000))
+
+# Cache LRU de resultados por entrada normalizada (DOGMATCH_CACHE_SIZE=0 desabilita)
+result_cache = ResultCache(
+    max_size=int(os.environ.get('DOGMATCH_CACHE_SIZE', 1024)),
+    ttl=float(os.environ.get('DOGMATCH_CACHE_TTL', 300))
+)
+
+# Micro-batching opcional de /api/recommend (ativado quando DOGMATCH_COALESCE_WINDOW_MS é definido)
+COALESCE_WINDOW_MS = os.environ.get('DOGMATCH_COALESCE_WINDOW_MS')
+COALESCE_MAX_BATCH = int(os.environ.get('DOGMATCH_COALESCE_MAX_BATCH', 64))
+
+# Métricas no formato do Prometheus em /metrics (DOGMATCH_METRICS=1); desligadas, nada é medido
+metrics_registry: Optional[MetricsRegistry] = MetricsRegistry() if os.environ.get('DOGMATCH_METRICS') == '1' else None
+
+# Índice de similaridade: 'exact', 'ivf' (aproximado) ou 'auto'; parâmetros do IVF opcionais
+SIMILARITY_OPTIONS = {
+    option: int(os.environ[var])
+    for option, var in (('n_lists', 'DOGMATCH_IVF_LISTS'), ('n_probe', 'DOGMATCH_IVF_NPROBE'))
+    if os.environ.get(var)
+}
+
+# Rotas administrativas (/api/admin/*): exigem o header X-Admin-Token; sem DOGMATCH_ADMIN_TOKEN ficam desabilitadas
+ADMIN_TOKEN = os.environ.get('DOGMATCH_ADMIN_TOKEN')
+
+# Cache HTTP de /api/breeds/<nome>/similar (revalidado por ETag depois de expirar)
+SIMILAR_CACHE_CONTROL = 'public, max-age=300'
+
+Payload = Tuple[Dict[str, Any], int]
+
+# Cache HTTP de /api/breeds, /api/features e /api/model-info (revalidado por ETag depois de expirar)
+STATIC_CACHE_CONTROL = f"public, max-age={int(os.environ.get('DOGMATCH_STATIC_MAX_AGE', 60))}"
+
+# Resposta com headers: (payload, JSON já codificado em bytes ou None para corpo vazio, status, headers)
+HeadersPayload = Tuple[Any, int, Dict[str, str]]
+
+# Respostas estáticas pré-serializadas: endpoint -> ((versão do modelo, versão do catálogo), corpo, ETag)
+_static_responses: Dict[str, Tuple[Tuple[int, int], bytes, str]] = {}
+
+# Criado sob demanda em cada processo (threads não sobrevivem ao fork do gunicorn)
+coalescer: Optional[RequestCoalescer] = None
+_coalescer_lock = threading.Lock()
+
+
+def load_predictor() -> DogMatchPredictor:
+    """Carregar um novo predictor a partir da configuração do ambiente"""
+    # Bundle único (model_bundle.py), tabela de lookup (lookup_table.py) e catálogo
+    # compartilhado entre processos (shared_catalog.py) opcionais
+    return DogMatchPredictor(
+        lookup_table_path=os.environ.get('DOGMATCH_LOOKUP_TABLE'),
+        bundle_path=os.environ.get('DOGMATCH_BUNDLE'),
+        metrics=metrics_registry,
+        similarity_backend=os.environ.get('DOGMATCH_SIMILARITY_BACKEND', 'exact'),
+        similarity_options=SIMILARITY_OPTIONS,
+        shared_catalog_dir=os.environ.get('DOGMATCH_SHARED_CATALOG')
+    )
+
+
+# Segmentos do catálogo compartilhado gravados por este processo são removidos na
+# saída (Flask, uvicorn; sob o gunicorn, o on_exit do master remove todos)
+if os.environ.get('DOGMATCH_SHARED_CATALOG'):
+    atexit.register(remove_written_segments)
+
+
+def _on_model_swap(version: ModelVersion) -> None:
+    """Resultados em cache foram calculados com a versão anterior do modelo"""
+    result_cache.clear()
+
+
+# Versão ativa do modelo (uma por processo); a origem pode ser observada para recarga a quente
+model_registry = ModelRegistry(
+    load_predictor,
+    source=os.environ.get('DOGMATCH_BUNDLE') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'),
+    poll_interval=float(os.environ.get('DOGMATCH_MODEL_WATCH_INTERVAL', 0)),
+    drain_timeout=float(os.environ.get('DOGMATCH_MODEL_DRAIN_TIMEOUT', 30)),
+    on_swap=_on_model_swap
+)
+
+
+def get_predictor() -> DogMatchPredictor:
+    """Predictor da versão ativa (carregado e aquecido na primeira chamada)"""
+    try:
+        return model_registry.get().predictor
+    except Exception as e:
+        print(f"❌ Erro ao carregar predictor: {e}")
+        raise e
+
+
+def get_coalescer() -> Optional[RequestCoalescer]:
+    """Coalescer de requisições do processo atual (None se desabilitado)"""
+    global coalescer
+    if COALESCE_WINDOW_MS is None:
+        return None
+    if coalescer is None:
+        with _coalescer_lock:
+            if coalescer is None:
+                coalescer = RequestCoalescer(get_predictor, max_wait_ms=float(COALESCE_WINDOW_MS),
+                                             max_batch=COALESCE_MAX_BATCH)
+                print(f"🧺 Coalescer ativo: janela {COALESCE_WINDOW_MS} ms, lote máximo {COALESCE_MAX_BATCH}")
+    return coalescer
+
+
+def predict_with_cache(model: ModelVersion, user_input: Dict[str, Any], top_k: int = 5,
+                       filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Predição com cache de resultados (apenas predições bem-sucedidas são armazenadas).
+
+    Requisições com filtros têm os filtros na chave e não passam pelo coalescer
+    (cada uma restringe o catálogo de um jeito).
+    """
+    predictor = model.predictor
+    # Versões do modelo e do catálogo na chave: nada calculado antes de uma troca é servido depois
+    key = result_cache.make_key(user_input, predictor.feature_columns, top_k) + (model.number, predictor.catalog_version)
+    if filters is not None:
+        key += (json_codec.dumps(filters, sort_keys=True),)
+    results = result_cache.get(key)
+    if results is None:
+        if filters is not None:
+            results = predictor.predict(user_input, top_k, filters=filters)
+        else:
+            batcher = get_coalescer()
+            if batcher:
+                results = batcher.predict(user_input, top_k, predictor=predictor)
+            else:
+                results = predictor.predict(user_input, top_k)
+        result_cache.put(key, results)
+
+    # Cópia rasa: os endpoints adicionam metadados ao dicionário retornado
+    return dict(results)
+
+
+if metrics_registry is not None:
+    _http_requests = metrics_registry.counter(
+        'dogmatch_http_requests_total', 'Requisições HTTP por rota, método e status', ('method', 'route', 'status')
+    )
+    _http_duration = metrics_registry.histogram(
+        'dogmatch_http_request_duration_seconds', 'Duração das requisições HTTP por rota', ('method', 'route')
+    )
+    metrics_registry.gauge('dogmatch_predictor_loaded', 'Predictor carregado e aquecido (1) ou não (0)',
+                           lambda: model_registry.active is not None)
+    metrics_registry.gauge('dogmatch_model_version', 'Número da versão ativa do modelo neste processo',
+                           lambda: model_registry.active.number if model_registry.active else 0)
+    metrics_registry.gauge('dogmatch_cache_size', 'Entradas no cache de resultados', lambda: len(result_cache._entries))
+    # Contagens que só crescem: counters (_total), para rate()/increase() tratarem reinícios
+    metrics_registry.callback_counter('dogmatch_model_reloads_total', 'Recargas do modelo concluídas',
+                                      lambda: model_registry.reloads)
+    metrics_registry.callback_counter('dogmatch_model_failed_reloads_total', 'Recargas do modelo rejeitadas',
+                                      lambda: model_registry.failed_reloads)
+    metrics_registry.callback_counter('dogmatch_cache_hits_total', 'Hits do cache de resultados',
+                                      lambda: result_cache.hits)
+    metrics_registry.callback_counter('dogmatch_cache_misses_total', 'Misses do cache de resultados',
+                                      lambda: result_cache.misses)
+    metrics_registry.callback_counter('dogmatch_coalescer_batches_total', 'Lotes executados pelo coalescer',
+                                      lambda: coalescer.batches if coalescer else 0)
+    metrics_registry.callback_counter('dogmatch_coalescer_requests_total', 'Requisições atendidas pelo coalescer',
+                                      lambda: coalescer.requests if coalescer else 0)
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    """Registrar uma requisição nas métricas por rota (chamado pelos apps Flask/ASGI)"""
+    _http_requests.inc(method, route, str(status))
+    _http_duration.observe(seconds, method, route)
+
+
+def render_metrics() -> Tuple[Optional[str], int]:
+    """Métricas em texto do Prometheus, ou (None, 404) se desabilitadas"""
+    if metrics_registry is None:
+        return None, 404
+    return metrics_registry.render(), 200
+
+
+def timestamp() -> str:
+    """Data/hora local das respostas (mesmo formato de str(pd.Timestamp.now()), sem pandas)"""
+    return str(datetime.datetime.now())
+
+
+def home() -> Payload:
+    """Página inicial da API"""
+    return {
+        "message": "🐕 DogMatch API - Sistema Híbrido de Recomendação",
+        "version": API_VERSION,
+        "status": "online",
+        "endpoints": {
+            "POST /api/recommend": "Recomendar raças de cães",
+            "POST /api/recommend/batch": "Recomendar raças para vários usuários",
+            "GET /api/breeds": "Listar todas as raças",
+            "GET /api/breeds/<nome>/similar": "Raças parecidas com uma raça do catálogo",
+            "GET /api/health": "Status da API",
+            "GET /api/health/live": "Liveness (processo respondendo)",
+            "GET /api/health/ready": "Readiness (modelo carregado e aquecido)",
+            "GET /api/stats": "Estatísticas do cache e do coalescer",
+            "GET /api/features": "Informações das features",
+            "GET /api/model-info": "Informações do modelo",
+            "GET /metrics": "Métricas no formato do Prometheus (DOGMATCH_METRICS=1)",
+            "POST /api/admin/catalog": "Inserir, atualizar ou remover raças (DOGMATCH_ADMIN_TOKEN)",
+            "POST /api/admin/reload": "Recarregar os modelos sem downtime (DOGMATCH_ADMIN_TOKEN)"
+        }
+    }, 200
+
+
+def health_check() -> Payload:
+    """Verificar saúde da API"""
+    try:
+        get_predictor()
+        return {
+            "status": "healthy",
+            "model_loaded": True,
+            "message": "API funcionando corretamente"
+        }, 200
+    except Exception as e:
+        return {
+            "status": "unhealthy",
+            "model_loaded": False,
+            "error": str(e)
+        }, 500
+
+
+def liveness_check() -> Payload:
+    """Liveness: o processo está respondendo (não carrega o modelo)"""
+    return {"status": "alive"}, 200
+
+
+def readiness_check() -> Payload:
+    """Readiness: modelo carregado e aquecido (não dispara o carregamento)"""
+    if model_registry.active is None:
+        return {
+            "status": "not_ready",
+            "model_loaded": False
+        }, 503
+
+    return {
+        "status": "ready",
+        "model_loaded": True
+    }, 200
+
+
+def get_stats() -> Payload:
+    """Estatísticas do cache de resultados, do coalescer e das versões do modelo"""
+    return {
+        "cache": result_cache.stats(),
+        "coalescer": coalescer.stats() if coalescer else {"enabled": COALESCE_WINDOW_MS is not None},
+        "models": model_registry.stats(),
+        "api_version": API_VERSION
+    }, 200
+
+
+def recommend_breeds(user_input: Any) -> Payload:
+    """
+    Endpoint principal para recomendar raças.
+
+    Args:
+        user_input: Corpo JSON já decodificado (None se ausente ou inválido); o
+            campo opcional 'filters' restringe as raças antes do ranking
+            (formato em attribute_index.py)
+    """
+    try:
+        # Validar entrada
+        if not user_input:
+            return {"error": "JSON body é obrigatório"}, 400
+        if not isinstance(user_input, dict):
+            return {"error": "JSON body deve ser um objeto com as preferências"}, 400
+
+        # Fazer predição (a versão do modelo fica reservada até o fim da requisição);
+        # campos obrigatórios e valores são validados pelo predictor, em uma única passada
+        with model_registry.lease() as model:
+            results = predict_with_cache(model, user_input, filters=user_input.get('filters'))
+
+        # Adicionar metadados
+        results['api_version'] = API_VERSION
+        results['timestamp'] = timestamp()
+
+        return results, 200
+
+    except MissingFieldsError as e:
+        return {
+            "error": f"Campos obrigatórios ausentes: {e.fields}",
+            "required_fields": e.required
+        }, 400
+    except ValueError as e:
+        return {"error": f"Erro de validação: {str(e)}"}, 400
+    except Exception as e:
+        return {"error": f"Erro interno: {str(e)}"}, 500
+
+
+def recommend_breeds_batch(body: Any) -> Payload:
+    """
+    Endpoint para recomendar raças para vários usuários em uma única chamada.
+
+    Args:
+        body: Corpo JSON já decodificado ({"inputs": [...], "top_k": 5})
+    """
+    try:
+        # Validar entrada
+        if not body:
+            return {"error": "JSON body é obrigatório"}, 400
+
+        inputs = body.get('inputs') if isinstance(body, dict) else None
+        if not isinstance(inputs, list) or not inputs:
+            return {"error": "Campo 'inputs' deve ser uma lista não vazia de preferências"}, 400
+
+        if len(inputs) > MAX_BATCH_SIZE:
+            return {
+                "error": f"Lote muito grande: {len(inputs)} entradas (máximo: {MAX_BATCH_SIZE})"
+            }, 400
+
+        top_k = body.get('top_k', 5)
+        if not isinstance(top_k, int) or isinstance(top_k, bool) or top_k < 1:
+            return {"error": "Campo 'top_k' deve ser um inteiro positivo"}, 400
+
+        # Fazer predição em lote (erros por entrada não abortam o lote)
+        with model_registry.lease() as model:
+            batch_results = model.predictor.predict_batch(inputs, top_k=top_k)
+
+        results = [{'index': i, **result} for i, result in enumerate(batch_results)]
+        failed = sum(1 for result in batch_results if 'error' in result)
+
+        return {
+            "results": results,
+            "total": len(results),
+            "succeeded": len(results) - failed,
+            "failed": failed,
+            "api_version": API_VERSION,
+            "timestamp": timestamp()
+        }, 200
+
+    except Exception as e:
+        return {"error": f"Erro interno: {str(e)}"}, 500
+
+
+def get_breeds(if_none_match: Optional[str] = None) -> HeadersPayload:
+    """Listar todas as raças disponíveis (resposta pré-serializada por versão)"""
+    try:
+        return static_response('breeds', _breeds_payload, if_none_match)
+    except Exception as e:
+        return {"error": f"Erro ao listar raças: {str(e)}"}, 500, {}
+
+
+def _breeds_payload(model: ModelVersion) -> Dict[str, Any]:
+    feature_info = model.predictor.get_feature_info()
+    return {
+        "breeds": feature_info['breed_names'],
+        "total_breeds": len(feature_info['breed_names']),
+        "api_version": API_VERSION
+    }
+
+
+def static_response(name: str, build: Callable[[ModelVersion], Dict[str, Any]],
+                    if_none_match: Optional[str] = None,
+                    etag_fields: Optional[Callable[[ModelVersion], Dict[str, Any]]] = None) -> HeadersPayload:
+    """
+    Resposta de um endpoint cujo conteúdo só muda com o modelo ou o catálogo.
+
+    O payload é montado e serializado uma vez por versão (na primeira requisição
+    depois de uma troca) e servido como bytes, com ETag e Cache-Control;
+    If-None-Match igual ao ETag atual recebe 304 sem corpo.
+
+    Args:
+        name: Identificador do endpoint no cache
+        build: Monta o payload a partir da versão ativa do modelo
+        if_none_match: Header If-None-Match da requisição
+        etag_fields: Para payloads com dados de cada processo (ex.: horário de
+            carga): campos estáveis da versão dos quais sai um ETag fraco, igual
+            em todos os workers; None usa um ETag forte do corpo
+    """
+    with model_registry.lease() as model:
+        version = (model.number, model.predictor.catalog_version)
+        cached = _static_responses.get(name)
+        if cached is None or cached[0] != version:
+            body = json_codec.dumps(build(model))
+            if etag_fields is None:
+                etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+            else:
+                etag = 'W/' + json_etag({'endpoint': name, **etag_fields(model)})
+            cached = (version, body, etag)
+            _static_responses[name] = cached
+
+    _, body, etag = cached
+    headers = {'ETag': etag, 'Cache-Control': STATIC_CACHE_CONTROL}
+    if etag_matches(if_none_match, etag):
+        return None, 304, headers
+    return body, 200, headers
+
+
+def json_etag(payload: Dict[str, Any]) -> str:
+    """ETag forte derivado do conteúdo JSON"""
+    body = json_codec.dumps(payload, sort_keys=True)
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Se o header If-None-Match da requisição inclui o ETag atual (comparação fraca)"""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(',')]
+    opaque = etag[2:] if etag.startswith('W/') else etag
+    return '*' in candidates or opaque in [candidate[2:] if candidate.startswith('W/') else candidate
+                                           for candidate in candidates]
+
+
+def get_similar_breeds(name: str, top_k: Any = None, if_none_match: Optional[str] = None) -> HeadersPayload:
+    """
+    Raças parecidas com uma raça do catálogo (vizinhos pré-calculados, O(top_k)).
+
+    Args:
+        name: Nome da raça (sem diferenciar maiúsculas/minúsculas)
+        top_k: Parâmetro top_k da query string (padrão: 5)
+        if_none_match: Header If-None-Match (304 se o ETag não mudou)
+    """
+    try:
+        try:
+            top_k = 5 if top_k is None else int(top_k)
+        except (TypeError, ValueError):
+            top_k = 0
+        if not 1 <= top_k <= BREED_NEIGHBORS_K:
+            return {"error": f"Parâmetro 'top_k' deve ser um inteiro entre 1 e {BREED_NEIGHBORS_K}"}, 400, {}
+
+        predictor = get_predictor()
+        result = predictor.similar_to_breed(name, top_k)
+        if result is None:
+            return {"error": f"Raça não encontrada: {name}"}, 404, {}
+
+        result['api_version'] = API_VERSION
+        headers = {'ETag': json_etag(result), 'Cache-Control': SIMILAR_CACHE_CONTROL}
+        if etag_matches(if_none_match, headers['ETag']):
+            return None, 304, headers
+        return result, 200, headers
+
+    except Exception as e:
+        return {"error": f"Erro ao buscar raças similares: {str(e)}"}, 500, {}
+
+
+def get_features(if_none_match: Optional[str] = None) -> HeadersPayload:
+    """Informações sobre as features do modelo (resposta pré-serializada por versão)"""
+    try:
+        return static_response('features', _features_payload, if_none_match)
+    except Exception as e:
+        return {"error": f"Erro ao obter features: {str(e)}"}, 500, {}
+
+
+def _features_payload(model: ModelVersion) -> Dict[str, Any]:
+    feature_info = model.predictor.get_feature_info()
+    return {
+        "features": {
+            "categorical": feature_info['categorical_columns'],
+            "numeric": feature_info['numeric_columns'],
+            "total": len(feature_info['feature_columns'])
+        },
+        "categorical_values": feature_info['categorical_values'],
+        "api_version": API_VERSION
+    }
+
+
+def get_model_info(if_none_match: Optional[str] = None) -> HeadersPayload:
+    """Informações sobre o modelo (resposta pré-serializada por versão)"""
+    try:
+        return static_response('model-info', _model_info_payload, if_none_match, _model_info_etag_fields)
+    except Exception as e:
+        return {"error": f"Erro ao obter informações do modelo: {str(e)}"}, 500, {}
+
+
+def _model_info_payload(model: ModelVersion) -> Dict[str, Any]:
+    return {
+        "model": model.predictor.get_model_info(),
+        "model_version": model.info(),
+        "api_version": API_VERSION
+    }
+
+
+def _model_info_etag_fields(model: ModelVersion) -> Dict[str, Any]:
+    # loaded_at/load_seconds mudam de um worker para outro: fora do ETag
+    return {
+        "checksum": model.checksum,
+        "version": model.number,
+        "catalog_version": model.predictor.catalog_version,
+        "api_version": API_VERSION
+    }
+
+
+def get_example() -> Payload:
+    """Exemplo de entrada para a API"""
+    return {
+        "example_input": dict(EXAMPLE_INPUT),
+        "description": "Exemplo de entrada para o endpoint /api/recommend",
+        "usage": "POST /api/recommend com este JSON no body"
+    }, 200
+
+
+def check_admin_token(token: Optional[str]) -> Optional[Payload]:
+    """Resposta de erro se o token administrativo for inválido (None se autorizado)"""
+    if not ADMIN_TOKEN:
+        return {"error": "Rotas administrativas desabilitadas (defina DOGMATCH_ADMIN_TOKEN)"}, 404
+    if not token or not hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+        return {"error": "Token administrativo inválido"}, 401
+    return None
+
+
+def update_catalog(body: Any, token: Optional[str]) -> Payload:
+    """
+    Inserir, atualizar ou remover raças do catálogo sem reiniciar a API.
+
+    Args:
+        body: Corpo JSON já decodificado ({"upsert": [...], "remove": [...]})
+        token: Valor do header X-Admin-Token
+    """
+    denied = check_admin_token(token)
+    if denied is not None:
+        return denied
+
+    try:
+        if not body or not isinstance(body, dict):
+            return {"error": "JSON body é obrigatório"}, 400
+
+        upserts = body.get('upsert', [])
+        removals = body.get('remove', [])
+        if not isinstance(upserts, list) or not isinstance(removals, list):
+            return {"error": "Campos 'upsert' e 'remove' devem ser listas"}, 400
+
+        with model_registry.lease() as model:
+            # Sem o journal compartilhado, só o worker que atendeu a requisição veria a alteração
+            workers = int(os.environ.get('DOGMATCH_WORKERS', 1))
+            if workers > 1 and model.predictor.catalog_journal is None:
+                return {"error": f"Atualização do catálogo com {workers} workers requer "
+                                 f"DOGMATCH_SHARED_CATALOG (alterações publicadas para todos os workers)"}, 409
+            summary = model.predictor.update_catalog(upserts, removals)
+
+        # Resultados em cache foram calculados com o catálogo anterior
+        result_cache.clear()
+
+        return {
+            "catalog": summary,
+            "api_version": API_VERSION,
+            "timestamp": timestamp()
+        }, 200
+
+    except ValueError as e:
+        return {"error": f"Erro de validação: {str(e)}"}, 400
+    except Exception as e:
+        return {"error": f"Erro interno: {str(e)}"}, 500
+
+
+def reload_models(body: Any, token: Optional[str]) -> Payload:
+    """
+    Recarregar os modelos da origem e trocar a versão ativa sem downtime.
+
+    Args:
+        body: Corpo JSON opcional ({"wait": true} espera a recarga terminar)
+        token: Valor do header X-Admin-Token
+    """
+    denied = check_admin_token(token)
+    if denied is not None:
+        return denied
+
+    try:
+        wait = bool(body.get('wait', False)) if isinstance(body, dict) else False
+        model_registry.get()
+        state, started = model_registry.reload(wait=wait)
+        if not started:
+            return {"error": "Recarga já em andamento", "models": state}, 409
+
+        if wait and state['last_error']:
+            return {"error": f"Recarga rejeitada: {state['last_error']}", "models": state}, 422
+        return {"models": state, "api_version": API_VERSION}, 200 if wait else 202
+
+    except Exception as e:
+        return {"error": f"Erro interno: {str(e)}"}, 500
@@ -3,182 +3,148 @@ DogMatch Backend API - Flask
 Sistema híbrido de recomendação de raças de cães
 """
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, g, request, jsonify, render_template
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 import os
 import sys
-import pandas as pd
+import time
 
 # Adicionar o diretório atual ao path para importar o predictor
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from dogmatch_predictor import DogMatchPredictor
+import api_service
+import json_codec
+from api_service import get_predictor
+
+class FastJSONProvider(JSONProvider):
+    """JSON do Flask (jsonify, request.get_json) via json_codec: orjson quando instalado"""
+
+    def dumps(self, obj, **kwargs):
+        return json_codec.dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return json_codec.loads(s)
+
+    def response(self, *args, **kwargs):
+        return self._app.response_class(json_codec.dumps(self._prepare_response_obj(args, kwargs)),
+                                        mimetype='application/json')
 
 # Inicializar Flask app
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)  # Permitir CORS para frontend
 
-# Carregar modelo uma vez (cache global)
-predictor = None
-
-def get_predictor():
-    """Carregar predictor com cache"""
-    global predictor
-    if predictor is None:
-        try:
-            predictor = DogMatchPredictor()
-            print("✅ DogMatch Predictor carregado com sucesso!")
-        except Exception as e:
-            print(f"❌ Erro ao carregar predictor: {e}")
-            raise e
-    return predictor
+# Carregamento antecipado: com o gunicorn.conf.py (preload_app) o predictor é
+# carregado no processo master antes do fork e compartilhado copy-on-write
+if os.environ.get('DOGMATCH_EAGER_LOAD') == '1':
+    get_predictor()
+
+# Métricas por rota (hooks registrados apenas com DOGMATCH_METRICS=1)
+if api_service.metrics_registry is not None:
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        api_service.observe_request(request.method, route, response.status_code,
+                                    time.perf_counter() - g.request_started)
+        return response
+
+def respond(result):
+    """Converter (payload, status[, headers]) do api_service em resposta Flask"""
+    payload, status, *extra = result
+    headers = extra[0] if extra else {}
+    if payload is None:
+        return Response(status=status, headers=headers)
+    if not isinstance(payload, bytes):
+        payload = json_codec.dumps(payload)
+    return Response(payload, status=status, headers=headers, mimetype='application/json')
+
+def request_body():
+    """Corpo JSON da requisição (None se ausente ou inválido)"""
+    return request.get_json(silent=True)
 
 @app.route('/')
 def home():
     """Página inicial da API"""
-    return jsonify({
-        "message": "🐕 DogMatch API - Sistema Híbrido de Recomendação",
-        "version": "1.0.0",
-        "status": "online",
-        "endpoints": {
-            "POST /api/recommend": "Recomendar raças de cães",
-            "GET /api/breeds": "Listar todas as raças",
-            "GET /api/health": "Status da API",
-            "GET /api/features": "Informações das features",
-            "GET /api/model-info": "Informações do modelo"
-        }
-    })
+    return respond(api_service.home())
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Verificar saúde da API"""
-    try:
-        predictor = get_predictor()
-        return jsonify({
-            "status": "healthy",
-            "model_loaded": True,
-            "message": "API funcionando corretamente"
-        })
-    except Exception as e:
-        return jsonify({
-            "status": "unhealthy",
-            "model_loaded": False,
-            "error": str(e)
-        }), 500
+    return respond(api_service.health_check())
+
+@app.route('/api/health/live', methods=['GET'])
+def liveness_check():
+    """Liveness: o processo está respondendo (não carrega o modelo)"""
+    return respond(api_service.liveness_check())
+
+@app.route('/api/health/ready', methods=['GET'])
+def readiness_check():
+    """Readiness: modelo carregado e aquecido (não dispara o carregamento)"""
+    return respond(api_service.readiness_check())
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Estatísticas do cache de resultados e do coalescer"""
+    return respond(api_service.get_stats())
 
 @app.route('/api/recommend', methods=['POST'])
 def recommend_breeds():
     """Endpoint principal para recomendar raças"""
-    try:
-        # Validar entrada
-        if not request.json:
-            return jsonify({"error": "JSON body é obrigatório"}), 400
-        
-        user_input = request.json
-        
-        # Validar campos obrigatórios
-        required_fields = [
-            'Size', 'Exercise Requirements (hrs/day)', 'Good with Children',
-            'Intelligence Rating (1-10)', 'Training Difficulty (1-10)',
-            'Shedding Level', 'Health Issues Risk', 'Type',
-            'Friendly Rating (1-10)', 'Life Span', 'Average Weight (kg)'
-        ]
-        
-        missing_fields = [field for field in required_fields if field not in user_input]
-        if missing_fields:
-            return jsonify({
-                "error": f"Campos obrigatórios ausentes: {missing_fields}",
-                "required_fields": required_fields
-            }), 400
-        
-        # Fazer predição
-        predictor = get_predictor()
-        results = predictor.predict(user_input)
-        
-        # Adicionar metadados
-        results['api_version'] = '1.0.0'
-        results['timestamp'] = str(pd.Timestamp.now())
-        
-        return jsonify(results)
-        
-    except ValueError as e:
-        return jsonify({"error": f"Erro de validação: {str(e)}"}), 400
-    except Exception as e:
-        return jsonify({"error": f"Erro interno: {str(e)}"}), 500
+    return respond(api_service.recommend_breeds(request_body()))
+
+@app.route('/api/recommend/batch', methods=['POST'])
+def recommend_breeds_batch():
+    """Endpoint para recomendar raças para vários usuários em uma única chamada"""
+    return respond(api_service.recommend_breeds_batch(request_body()))
 
 @app.route('/api/breeds', methods=['GET'])
 def get_breeds():
     """Listar todas as raças disponíveis"""
-    try:
-        predictor = get_predictor()
-        feature_info = predictor.get_feature_info()
-        
-        return jsonify({
-            "breeds": feature_info['breed_names'],
-            "total_breeds": len(feature_info['breed_names']),
-            "api_version": "1.0.0"
-        })
-        
-    except Exception as e:
-        return jsonify({"error": f"Erro ao listar raças: {str(e)}"}), 500
+    return respond(api_service.get_breeds(request.headers.get('If-None-Match')))
+
+@app.route('/api/breeds/<name>/similar', methods=['GET'])
+def get_similar_breeds(name):
+    """Raças parecidas com uma raça do catálogo (com ETag)"""
+    return respond(api_service.get_similar_breeds(name, request.args.get('top_k'),
+                                                  request.headers.get('If-None-Match')))
 
 @app.route('/api/features', methods=['GET'])
 def get_features():
     """Informações sobre as features do modelo"""
-    try:
-        predictor = get_predictor()
-        feature_info = predictor.get_feature_info()
-        
-        return jsonify({
-            "features": {
-                "categorical": feature_info['categorical_columns'],
-                "numeric": feature_info['numeric_columns'],
-                "total": len(feature_info['feature_columns'])
-            },
-            "categorical_values": feature_info['categorical_values'],
-            "api_version": "1.0.0"
-        })
-        
-    except Exception as e:
-        return jsonify({"error": f"Erro ao obter features: {str(e)}"}), 500
+    return respond(api_service.get_features(request.headers.get('If-None-Match')))
 
 @app.route('/api/model-info', methods=['GET'])
 def get_model_info():
     """Informações sobre o modelo"""
-    try:
-        predictor = get_predictor()
-        model_info = predictor.get_model_info()
-        
-        return jsonify({
-            "model": model_info,
-            "api_version": "1.0.0"
-        })
-        
-    except Exception as e:
-        return jsonify({"error": f"Erro ao obter informações do modelo: {str(e)}"}), 500
+    return respond(api_service.get_model_info(request.headers.get('If-None-Match')))
 
 @app.route('/api/example', methods=['GET'])
 def get_example():
     """Exemplo de entrada para a API"""
-    example_input = {
-        "Size": "Medium",
-        "Exercise Requirements (hrs/day)": 2.0,
-        "Good with Children": "Yes",
-        "Intelligence Rating (1-10)": 7,
-        "Training Difficulty (1-10)": 3,
-        "Shedding Level": "Moderate",
-        "Health Issues Risk": "Low",
-        "Type": "Herding",
-        "Friendly Rating (1-10)": 8,
-        "Life Span": 12,
-        "Average Weight (kg)": 20
-    }
-    
-    return jsonify({
-        "example_input": example_input,
-        "description": "Exemplo de entrada para o endpoint /api/recommend",
-        "usage": "POST /api/recommend com este JSON no body"
-    })
+    return respond(api_service.get_example())
+
+@app.route('/api/admin/catalog', methods=['POST'])
+def update_catalog():
+    """Inserir, atualizar ou remover raças do catálogo (requer X-Admin-Token)"""
+    return respond(api_service.update_catalog(request_body(), request.headers.get('X-Admin-Token')))
+
+@app.route('/api/admin/reload', methods=['POST'])
+def reload_models():
+    """Recarregar os modelos sem downtime (requer X-Admin-Token)"""
+    return respond(api_service.reload_models(request_body(), request.headers.get('X-Admin-Token')))
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Métricas no formato de texto do Prometheus"""
+    text, status = api_service.render_metrics()
+    if text is None:
+        return jsonify({"error": "Métricas desabilitadas (defina DOGMATCH_METRICS=1)"}), status
+    return Response(text, status=status, content_type=api_service.MetricsRegistry.CONTENT_TYPE)
 
 # Error handlers
 @app.errorhandler(404)
@@ -197,7 +163,7 @@ if __name__ == '__main__':
     # Configurações para desenvolvimento e produção
     port = int(os.environ.get('PORT', 5000))
     debug = os.environ.get('FLASK_ENV') == 'development'
-    
+
     app.run(
         host='0.0.0.0',
         port=port,
@@ -0,0 +1,206 @@
+"""
+DogMatch Backend API - ASGI (FastAPI + uvicorn)
+Sistema híbrido de recomendação de raças de cães
+
+Alternativa ao app.py (Flask + gunicorn sync) com as mesmas rotas e respostas
+(a lógica fica em api_service.py). Um único processo atende milhares de
+conexões simultâneas no event loop e compartilha uma única instância do
+DogMatchPredictor; a inferência (CPU) roda em um pool de threads limitado,
+para não bloquear o loop nem criar uma thread por requisição.
+
+Uso:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 8080
+    python asgi_app.py
+
+Variáveis de ambiente:
+    DOGMATCH_ASGI_THREADS: threads de inferência (padrão: min(8, núcleos), ou 64
+        com DOGMATCH_COALESCE_WINDOW_MS definido)
+"""
+
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from starlette.exceptions import HTTPException as StarletteHTTPException
+
+# Adicionar o diretório atual ao path para importar o predictor
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import api_service
+import json_codec
+
+# Pool limitado de threads para inferência (compartilham o mesmo predictor). Com o
+# coalescer ativo as threads só esperam o lote, então o padrão é maior
+DEFAULT_THREADS = 64 if api_service.COALESCE_WINDOW_MS is not None else min(8, os.cpu_count() or 1)
+INFERENCE_THREADS = int(os.environ.get('DOGMATCH_ASGI_THREADS', DEFAULT_THREADS))
+inference_pool = ThreadPoolExecutor(max_workers=INFERENCE_THREADS, thread_name_prefix='dogmatch-inference')
+
+
+async def run_inference(func, *args):
+    """Executar um handler do api_service no pool de inferência"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(inference_pool, func, *args)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Carregar e aquecer o predictor antes de aceitar requisições"""
+    await run_inference(api_service.get_predictor)
+    print(f"🚀 DogMatch ASGI pronto ({INFERENCE_THREADS} threads de inferência, pid {os.getpid()})")
+    yield
+    inference_pool.shutdown(wait=True)
+
+
+# Inicializar FastAPI app (documentação automática desabilitada: rotas espelham o app Flask)
+app = FastAPI(title="DogMatch API", lifespan=lifespan, docs_url=None, redoc_url=None, openapi_url=None)
+app.add_middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])
+
+
+# Métricas por rota (middleware registrado apenas com DOGMATCH_METRICS=1)
+if api_service.metrics_registry is not None:
+    @app.middleware('http')
+    async def record_request_metrics(request: Request, call_next):
+        started = time.perf_counter()
+        response = await call_next(request)
+        route = getattr(request.scope.get('route'), 'path', 'unmatched')
+        api_service.observe_request(request.method, route, response.status_code, time.perf_counter() - started)
+        return response
+
+
+def respond(result) -> Response:
+    """Converter (payload, status[, headers]) do api_service em resposta JSON"""
+    payload, status, *extra = result
+    headers = extra[0] if extra else None
+    if payload is None:
+        return Response(status_code=status, headers=headers)
+    if not isinstance(payload, bytes):
+        payload = json_codec.dumps(payload)
+    return Response(payload, status_code=status, headers=headers, media_type='application/json')
+
+
+async def request_body(request: Request):
+    """Corpo JSON da requisição (None se ausente ou inválido)"""
+    try:
+        return json_codec.loads(await request.body())
+    except ValueError:
+        return None
+
+
+@app.get('/')
+async def home():
+    """Página inicial da API"""
+    return respond(api_service.home())
+
+
+@app.get('/api/health')
+async def health_check():
+    """Verificar saúde da API"""
+    return respond(await run_inference(api_service.health_check))
+
+
+@app.get('/api/health/live')
+async def liveness_check():
+    """Liveness: o processo está respondendo (não carrega o modelo)"""
+    return respond(api_service.liveness_check())
+
+
+@app.get('/api/health/ready')
+async def readiness_check():
+    """Readiness: modelo carregado e aquecido (não dispara o carregamento)"""
+    return respond(api_service.readiness_check())
+
+
+@app.get('/api/stats')
+async def get_stats():
+    """Estatísticas do cache de resultados e do coalescer"""
+    return respond(api_service.get_stats())
+
+
+@app.post('/api/recommend')
+async def recommend_breeds(request: Request):
+    """Endpoint principal para recomendar raças"""
+    return respond(await run_inference(api_service.recommend_breeds, await request_body(request)))
+
+
+@app.post('/api/recommend/batch')
+async def recommend_breeds_batch(request: Request):
+    """Endpoint para recomendar raças para vários usuários em uma única chamada"""
+    return respond(await run_inference(api_service.recommend_breeds_batch, await request_body(request)))
+
+
+@app.get('/api/breeds')
+async def get_breeds(request: Request):
+    """Listar todas as raças disponíveis (bytes pré-serializados: atendido direto no event loop)"""
+    return respond(api_service.get_breeds(request.headers.get('If-None-Match')))
+
+
+@app.get('/api/breeds/{name}/similar')
+async def get_similar_breeds(name: str, request: Request):
+    """Raças parecidas com uma raça do catálogo (com ETag)"""
+    return respond(await run_inference(api_service.get_similar_breeds, name, request.query_params.get('top_k'),
+                                       request.headers.get('If-None-Match')))
+
+
+@app.get('/api/features')
+async def get_features(request: Request):
+    """Informações sobre as features do modelo (bytes pré-serializados: atendido direto no event loop)"""
+    return respond(api_service.get_features(request.headers.get('If-None-Match')))
+
+
+@app.get('/api/model-info')
+async def get_model_info(request: Request):
+    """Informações sobre o modelo (bytes pré-serializados: atendido direto no event loop)"""
+    return respond(api_service.get_model_info(request.headers.get('If-None-Match')))
+
+
+@app.get('/api/example')
+async def get_example():
+    """Exemplo de entrada para a API"""
+    return respond(api_service.get_example())
+
+
+@app.post('/api/admin/catalog')
+async def update_catalog(request: Request):
+    """Inserir, atualizar ou remover raças do catálogo (requer X-Admin-Token)"""
+    body = await request_body(request)
+    return respond(await run_inference(api_service.update_catalog, body, request.headers.get('X-Admin-Token')))
+
+
+@app.post('/api/admin/reload')
+async def reload_models(request: Request):
+    """Recarregar os modelos sem downtime (requer X-Admin-Token)"""
+    body = await request_body(request)
+    return respond(await run_inference(api_service.reload_models, body, request.headers.get('X-Admin-Token')))
+
+
+@app.get('/metrics')
+async def get_metrics():
+    """Métricas no formato de texto do Prometheus"""
+    text, status = api_service.render_metrics()
+    if text is None:
+        return JSONResponse({"error": "Métricas desabilitadas (defina DOGMATCH_METRICS=1)"}, status_code=status)
+    return Response(text, status_code=status, media_type=api_service.MetricsRegistry.CONTENT_TYPE)
+
+
+# Error handlers (mesmas mensagens do app Flask)
+@app.exception_handler(StarletteHTTPException)
+async def http_error(request: Request, exc: StarletteHTTPException):
+    messages = {404: "Endpoint não encontrado", 405: "Método não permitido"}
+    return JSONResponse({"error": messages.get(exc.status_code, exc.detail)}, status_code=exc.status_code)
+
+
+@app.exception_handler(Exception)
+async def internal_error(request: Request, exc: Exception):
+    return JSONResponse({"error": "Erro interno do servidor"}, status_code=500)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    uvicorn.run(app, host='0.0.0.0', port=int(os.environ.get('PORT', 8080)))
@@ -0,0 +1,192 @@
+"""
+DogMatch Attribute Index - Índices de atributos do catálogo para filtros
+
+Permite restringir uma recomendação a raças que atendem restrições rígidas
+(ex.: só Small ou Medium, Good with Children = Yes, até 15 kg) antes do ranking
+por similaridade. Os índices são montados uma única vez por snapshot do
+catálogo:
+
+- colunas categóricas: um bitmap por valor (1 bit por linha do catálogo, bits
+  empacotados); uma lista de valores aceitos é a união (OR) dos bitmaps
+- colunas numéricas: índice invertido ordenado (valores crescentes e a linha de
+  cada um); uma faixa [min, max] vira um intervalo contíguo por busca binária
+- filtros de colunas diferentes são intersectados (AND) sobre os bitmaps, e só
+  as linhas que sobram são ranqueadas
+
+Formato dos filtros (campos do questionário):
+    {
+        "Size": ["Small", "Medium"],            # um valor ou lista de valores aceitos
+        "Good with Children": "Yes",
+        "Average Weight (kg)": {"max": 15}      # faixa inclusiva (min e/ou max) ou um número
+    }
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class AttributeIndex:
+    """
+    Bitmaps (categóricas) e índices ordenados (numéricas) sobre as linhas do catálogo.
+    """
+
+    def __init__(self, categorical: Dict[str, Tuple[Any, List[str]]], numeric: Dict[str, Any]):
+        """
+        Args:
+            categorical: {coluna: (código de cada linha, classes do label encoder)}
+            numeric: {coluna: valor bruto de cada linha (NaN quando desconhecido)}
+        """
+        arrays = {}
+        for col, (codes, classes) in categorical.items():
+            codes = np.asarray(codes, dtype=np.intp)
+            arrays[f'codes/{col}'] = codes
+            arrays[f'bitmap/{col}'] = np.packbits(codes == np.arange(len(classes))[:, np.newaxis], axis=1)
+        for col, values in numeric.items():
+            values = np.asarray(values, dtype=np.float64)
+            order = np.argsort(values, kind='stable')[:np.count_nonzero(~np.isnan(values))]
+            arrays[f'values/{col}'] = values
+            arrays[f'sorted/{col}'] = values[order]
+            arrays[f'order/{col}'] = order
+        self._set_arrays(arrays, {col: classes for col, (codes, classes) in categorical.items()})
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], classes: Dict[str, List[str]]) -> 'AttributeIndex':
+        """
+        Índice a partir de arrays já calculados (ex.: mapeados de um segmento compartilhado).
+
+        Args:
+            arrays: Saída de arrays()
+            classes: Classes do label encoder de cada coluna categórica
+        """
+        index = cls.__new__(cls)
+        index._set_arrays(arrays, classes)
+        return index
+
+    def _set_arrays(self, arrays: Dict[str, np.ndarray], classes: Dict[str, List[str]]) -> None:
+        self._arrays = arrays
+        self._classes = {col: list(values) for col, values in classes.items()}
+        self._codes = {col: {value: code for code, value in enumerate(values)}
+                       for col, values in self._classes.items()}
+        self.numeric_columns = [name[len('values/'):] for name in arrays if name.startswith('values/')]
+        self.n_rows = len(next(array for name, array in arrays.items() if name.startswith(('codes/', 'values/'))))
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Arrays do índice (bitmaps, códigos e índices ordenados), para gravar em um segmento."""
+        return dict(self._arrays)
+
+    @property
+    def columns(self) -> List[str]:
+        """Colunas filtráveis."""
+        return list(self._classes) + self.numeric_columns
+
+    def values(self, col: str) -> np.ndarray:
+        """Valores brutos de uma coluna numérica, na ordem das linhas do catálogo."""
+        return self._arrays[f'values/{col}']
+
+    def parse(self, filters: Any) -> List[Tuple[str, Any]]:
+        """
+        Valida e normaliza os filtros.
+
+        Returns:
+            [(coluna, condição)], com a condição como lista de valores (categóricas)
+            ou {'min': ..., 'max': ...} (numéricas, só os limites informados)
+
+        Raises:
+            ValueError: Se os filtros não forem um objeto, a coluna não for
+                filtrável ou a condição for inválida para a coluna
+        """
+        if not isinstance(filters, dict):
+            raise ValueError("Campo 'filters' deve ser um objeto {campo: condição}")
+
+        parsed = []
+        for col, condition in filters.items():
+            if col in self._codes:
+                values = condition if isinstance(condition, list) else [condition]
+                if not values:
+                    raise ValueError(f"Filtro '{col}': informe ao menos um valor")
+                for value in values:
+                    if not isinstance(value, str) or value not in self._codes[col]:
+                        raise ValueError(f"Filtro '{col}': valor inválido {value}. "
+                                         f"Valores aceitos: {self._classes[col]}")
+                parsed.append((col, list(dict.fromkeys(values))))
+            elif col in self.numeric_columns:
+                parsed.append((col, self._parse_range(col, condition)))
+            else:
+                raise ValueError(f"Filtro em campo desconhecido: {col}. Campos filtráveis: {self.columns}")
+        return parsed
+
+    @staticmethod
+    def _parse_range(col: str, condition: Any) -> Dict[str, float]:
+        """Faixa de um filtro numérico: {'min': x, 'max': y} (inclusiva) ou um número exato."""
+        def is_number(value: Any) -> bool:
+            return isinstance(value, (int, float)) and not isinstance(value, bool) and value == value
+
+        if is_number(condition):
+            return {'min': float(condition), 'max': float(condition)}
+        if not isinstance(condition, dict) or not condition or set(condition) - {'min', 'max'}:
+            raise ValueError(f"Filtro '{col}': use um número ou um objeto com 'min' e/ou 'max'")
+
+        bounds = {}
+        for key, value in condition.items():
+            if not is_number(value):
+                raise ValueError(f"Filtro '{col}': '{key}' deve ser um número. Recebido: {value}")
+            bounds[key] = float(value)
+        if bounds.get('min', -np.inf) > bounds.get('max', np.inf):
+            raise ValueError(f"Filtro '{col}': 'min' maior que 'max'")
+        return bounds
+
+    def _bitmap(self, col: str, condition: Any) -> np.ndarray:
+        """Bitmap empacotado das linhas que atendem um filtro já normalizado."""
+        if col in self._codes:
+            codes = [self._codes[col][value] for value in condition]
+            return np.bitwise_or.reduce(self._arrays[f'bitmap/{col}'][codes], axis=0)
+
+        sorted_values = self._arrays[f'sorted/{col}']
+        start = np.searchsorted(sorted_values, condition.get('min', -np.inf), side='left')
+        stop = np.searchsorted(sorted_values, condition.get('max', np.inf), side='right')
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self._arrays[f'order/{col}'][start:stop]] = True
+        return np.packbits(mask)
+
+    def candidates(self, filters: Any) -> Tuple[np.ndarray, List[Dict[str, Any]]]:
+        """
+        Linhas do catálogo que atendem todos os filtros.
+
+        Args:
+            filters: Filtros no formato do docstring do módulo
+
+        Returns:
+            (linhas em ordem crescente, [{'field', 'condition', 'matches'}] com
+            quantas linhas atendem cada filtro isoladamente)
+
+        Raises:
+            ValueError: Se algum filtro for inválido (ver parse())
+        """
+        mask: Optional[np.ndarray] = None
+        applied = []
+        for col, condition in self.parse(filters):
+            bitmap = self._bitmap(col, condition)
+            applied.append({
+                'field': col,
+                'condition': condition,
+                'matches': int(np.unpackbits(bitmap, count=self.n_rows).sum())
+            })
+            mask = bitmap if mask is None else mask & bitmap
+
+        if mask is None:
+            return np.arange(self.n_rows), applied
+        return np.flatnonzero(np.unpackbits(mask, count=self.n_rows)), applied
+
+    def describe(self, row: int, columns: List[str]) -> Dict[str, Any]:
+        """
+        Valores brutos de uma linha nas colunas informadas (explicação dos filtros).
+        """
+        described = {}
+        for col in columns:
+            if col in self._classes:
+                described[col] = self._classes[col][self._arrays[f'codes/{col}'][row]]
+            else:
+                value = float(self._arrays[f'values/{col}'][row])
+                described[col] = None if np.isnan(value) else value
+        return described
@@ -0,0 +1,341 @@
+"""
+DogMatch Batch Score - Pontuação offline de questionários em grandes volumes
+
+Este arquivo é um ponto de entrada de linha de comando que pontua exportações
+de questionários (milhões de linhas) sem passar pela API HTTP:
+
+- leitura em blocos de CSV, JSONL ou Parquet (o formato vem da extensão);
+  nenhum arquivo é carregado inteiro na memória
+- cada bloco é pontuado com DogMatchPredictor.predict_batch (uma passada
+  vetorizada) em um pool de processos, cada um com o seu predictor
+- no máximo 2 blocos por processo ficam em andamento; os resultados são
+  gravados na ordem da entrada assim que ficam prontos, então a memória é
+  limitada pelo tamanho do bloco, não pelo tamanho do arquivo
+- progresso periódico (linhas, linhas/s, erros) em stderr e relatório final
+
+Saída em CSV/Parquet: uma coluna por campo (raça prevista, top_k raças
+similares e perfil); em JSONL: o resultado completo de predict() por linha.
+Linhas inválidas não interrompem a execução: recebem a coluna/campo "error".
+Parquet requer o pyarrow (opcional).
+
+Uso:
+    python batch_score.py ENTRADA SAIDA [--workers 4] [--chunk-size 10000] [--top-k 5]
+                          [--id-column user_id] [--bundle models/dogmatch_bundle.dmb]
+"""
+
+import os
+
+# Uma thread de BLAS por processo: o paralelismo vem do pool (antes de importar numpy)
+for _var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(_var, '1')
+
+import csv
+import json
+import resource
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+import numpy as np
+
+from dogmatch_predictor import DogMatchPredictor, PROFILE_FIELDS
+
+# Formatos suportados (pela extensão do arquivo)
+FORMATS = {'.csv': 'csv', '.jsonl': 'jsonl', '.ndjson': 'jsonl', '.parquet': 'parquet'}
+
+# Intervalo entre linhas de progresso (segundos)
+PROGRESS_INTERVAL = 2.0
+
+Chunk = Tuple[int, List[Dict[str, Any]], List[Any]]
+
+
+def detect_format(path: str) -> str:
+    """
+    Formato do arquivo pela extensão.
+
+    Raises:
+        ValueError: Se a extensão não for suportada
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Formato não suportado: '{extension}'. Formatos aceitos: {sorted(FORMATS)}")
+    return FORMATS[extension]
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ImportError("Leitura/escrita de Parquet requer o pyarrow (pip install pyarrow)")
+
+
+def read_chunks(path: str, chunk_size: int, id_column: Optional[str] = None) -> Iterator[Chunk]:
+    """
+    Lê o arquivo em blocos.
+
+    Yields:
+        (número da primeira linha do bloco, registros, ids) — ids vêm de
+        id_column, ou são None
+    """
+    file_format = detect_format(path)
+    start = 0
+
+    def split(records: List[Dict[str, Any]]) -> Chunk:
+        # Linha JSON que não é objeto (ex.: [1, 2]) fica sem id e recebe erro de validação na saída
+        ids = ([record.get(id_column) if isinstance(record, dict) else None for record in records]
+               if id_column else [None] * len(records))
+        return start, records, ids
+
+    if file_format == 'csv':
+        import pandas as pd
+        for frame in pd.read_csv(path, chunksize=chunk_size):
+            # NaN (célula vazia) vira None para cair na validação de campos
+            records = frame.astype(object).where(frame.notna(), None).to_dict('records')
+            yield split(records)
+            start += len(records)
+
+    elif file_format == 'jsonl':
+        records: List[Dict[str, Any]] = []
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    records.append(json.loads(line))
+                except ValueError as e:
+                    # Linha ilegível: entrada inválida (recebe erro na saída)
+                    records.append({'__parse_error__': f"JSON inválido: {e}"})
+                if len(records) >= chunk_size:
+                    yield split(records)
+                    start += len(records)
+                    records = []
+        if records:
+            yield split(records)
+
+    else:
+        pyarrow = _require_pyarrow()
+        parquet_file = pyarrow.parquet.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=chunk_size):
+            records = batch.to_pylist()
+            yield split(records)
+            start += len(records)
+
+
+def output_columns(top_k: int, id_column: Optional[str] = None) -> List[Tuple[str, str]]:
+    """
+    Colunas da saída tabular (CSV/Parquet): (nome, tipo 'int'/'str'/'float').
+    """
+    columns = [('row', 'int')]
+    if id_column:
+        columns.append((id_column, 'str'))
+    columns += [('predicted_breed', 'str'), ('predicted_score', 'float')]
+    for rank in range(1, top_k + 1):
+        columns += [(f'similar_{rank}_breed', 'str'), (f'similar_{rank}_similarity', 'float')]
+    columns += [(key, 'float') for key, _, _ in PROFILE_FIELDS]
+    columns.append(('error', 'str'))
+    return columns
+
+
+def flatten_result(row: int, result: Dict[str, Any], top_k: int, id_column: Optional[str] = None,
+                   record_id: Any = None) -> Dict[str, Any]:
+    """Resultado de predict_batch como uma linha da saída tabular."""
+    flat: Dict[str, Any] = {'row': row}
+    if id_column:
+        flat[id_column] = None if record_id is None else str(record_id)
+    if 'error' in result:
+        flat['error'] = result['error']
+        return flat
+
+    flat['predicted_breed'] = str(result['predictions'][0]['breed'])
+    flat['predicted_score'] = float(result['predictions'][0]['score'])
+    for similar in result['similar_breeds'][:top_k]:
+        flat[f"similar_{similar['rank']}_breed"] = str(similar['breed'])
+        flat[f"similar_{similar['rank']}_similarity"] = float(similar['similarity'])
+    for key, value in result['user_profile'].items():
+        flat[key] = float(value)
+    return flat
+
+
+def _json_default(value: Any) -> Any:
+    """Tipos NumPy nos resultados (np.float64, np.str_) para JSON."""
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+class ResultWriter:
+    """
+    Grava os resultados em blocos no formato da extensão do arquivo de saída.
+    """
+
+    def __init__(self, path: str, top_k: int, id_column: Optional[str] = None):
+        self.path = path
+        self.format = detect_format(path)
+        self.top_k = top_k
+        self.id_column = id_column
+        self.columns = output_columns(top_k, id_column)
+        self._parquet_writer = None
+
+        if self.format == 'parquet':
+            pyarrow = _require_pyarrow()
+            types = {'int': pyarrow.int64(), 'str': pyarrow.string(), 'float': pyarrow.float64()}
+            self._schema = pyarrow.schema([(name, types[kind]) for name, kind in self.columns])
+            self._parquet_writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+        else:
+            self._file = open(path, 'w', encoding='utf-8', newline='')
+            if self.format == 'csv':
+                self._csv = csv.DictWriter(self._file, fieldnames=[name for name, _ in self.columns])
+                self._csv.writeheader()
+
+    def write(self, start: int, results: List[Dict[str, Any]], ids: List[Any]) -> None:
+        if self.format == 'jsonl':
+            for offset, (result, record_id) in enumerate(zip(results, ids)):
+                line = {'row': start + offset}
+                if self.id_column:
+                    line[self.id_column] = record_id
+                line.update(result)
+                self._file.write(json.dumps(line, ensure_ascii=False, default=_json_default) + '\n')
+            return
+
+        rows = [
+            flatten_result(start + offset, result, self.top_k, self.id_column, record_id)
+            for offset, (result, record_id) in enumerate(zip(results, ids))
+        ]
+        if self.format == 'csv':
+            self._csv.writerows(rows)
+        else:
+            import pyarrow
+            columns = {name: [row.get(name) for row in rows] for name, _ in self.columns}
+            self._parquet_writer.write_table(pyarrow.Table.from_pydict(columns, schema=self._schema))
+
+    def close(self) -> None:
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+        else:
+            self._file.close()
+
+
+# Predictor de cada processo do pool (carregado uma vez no initializer)
+_worker_predictor: Optional[DogMatchPredictor] = None
+
+
+def _init_worker(bundle_path: Optional[str], models_dir: Optional[str]) -> None:
+    global _worker_predictor
+    _worker_predictor = DogMatchPredictor(bundle_path=bundle_path, models_dir=models_dir)
+
+
+def score_records(records: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+    """Pontua um bloco no predictor do processo atual."""
+    results = _worker_predictor.predict_batch(records, top_k=top_k)
+    for position, record in enumerate(records):
+        if isinstance(record, dict) and '__parse_error__' in record:
+            results[position] = {'error': record['__parse_error__']}
+    return results
+
+
+def _peak_rss_mb() -> float:
+    """Pico de memória residente (MB) deste processo e dos filhos já encerrados."""
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return usage / 1024 if sys.platform != 'darwin' else usage / (1024 * 1024)
+
+
+def score_file(input_path: str, output_path: str, workers: int = 1, chunk_size: int = 10_000, top_k: int = 5,
+               id_column: Optional[str] = None, bundle_path: Optional[str] = None,
+               models_dir: Optional[str] = None, progress: bool = True) -> Dict[str, Any]:
+    """
+    Pontua um arquivo inteiro em streaming.
+
+    Args:
+        input_path: CSV, JSONL ou Parquet com um questionário por linha
+        output_path: Arquivo de saída (CSV, JSONL ou Parquet)
+        workers: Processos de inferência (1 = no processo atual)
+        chunk_size: Linhas por bloco (define o pico de memória)
+        top_k: Raças similares por linha
+        id_column: Coluna copiada da entrada para a saída (ex.: id do usuário)
+        bundle_path / models_dir: Origem dos modelos (como no DogMatchPredictor)
+        progress: Mostrar o progresso em stderr
+
+    Returns:
+        Resumo: linhas, erros, segundos, linhas/s e pico de memória (MB)
+    """
+    detect_format(input_path)
+    writer = ResultWriter(output_path, top_k, id_column)
+    started = time.perf_counter()
+    last_report = started
+    rows = errors = 0
+
+    def record(start: int, results: List[Dict[str, Any]], ids: List[Any]) -> None:
+        nonlocal rows, errors, last_report
+        writer.write(start, results, ids)
+        rows += len(results)
+        errors += sum(1 for result in results if 'error' in result)
+        now = time.perf_counter()
+        if progress and now - last_report >= PROGRESS_INTERVAL:
+            last_report = now
+            print(f"⏳ {rows:,} linhas | {rows / (now - started):,.0f} linhas/s | {errors:,} erros",
+                  file=sys.stderr, flush=True)
+
+    try:
+        chunks = read_chunks(input_path, chunk_size, id_column)
+        if workers <= 1:
+            _init_worker(bundle_path, models_dir)
+            for start, records, ids in chunks:
+                record(start, score_records(records, top_k), ids)
+        else:
+            # Janela limitada de blocos em andamento: a leitura não se adianta à inferência
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                     initargs=(bundle_path, models_dir)) as pool:
+                pending: 'deque[Tuple[int, List[Any], Future]]' = deque()
+                for start, records, ids in chunks:
+                    pending.append((start, ids, pool.submit(score_records, records, top_k)))
+                    if len(pending) >= 2 * workers:
+                        start, ids, future = pending.popleft()
+                        record(start, future.result(), ids)
+                while pending:
+                    start, ids, future = pending.popleft()
+                    record(start, future.result(), ids)
+    finally:
+        writer.close()
+
+    seconds = time.perf_counter() - started
+    return {
+        'rows': rows,
+        'errors': errors,
+        'seconds': round(seconds, 3),
+        'rows_per_second': round(rows / seconds, 1) if seconds else 0.0,
+        'peak_rss_mb': round(_peak_rss_mb(), 1)
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pontuação offline de questionários do DogMatch")
+    parser.add_argument('input', help='Arquivo de entrada (.csv, .jsonl/.ndjson ou .parquet)')
+    parser.add_argument('output', help='Arquivo de saída (.csv, .jsonl/.ndjson ou .parquet)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Processos de inferência')
+    parser.add_argument('--chunk-size', type=int, default=10_000, help='Linhas por bloco')
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--id-column', help='Coluna da entrada copiada para a saída')
+    parser.add_argument('--bundle', help='Bundle dos modelos (model_bundle.py)')
+    parser.add_argument('--models-dir', help='Diretório dos .pkl (padrão: backend/models)')
+    args = parser.parse_args()
+
+    try:
+        summary = score_file(args.input, args.output, workers=args.workers, chunk_size=args.chunk_size,
+                             top_k=args.top_k, id_column=args.id_column, bundle_path=args.bundle,
+                             models_dir=args.models_dir)
+    except Exception as e:
+        print(f"❌ Erro: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"\n✅ {summary['rows']:,} linhas pontuadas em {summary['seconds']:.1f}s "
+          f"({summary['rows_per_second']:,.0f} linhas/s) | {summary['errors']:,} erros | "
+          f"pico de memória {summary['peak_rss_mb']:.0f} MB")
+    print(f"📄 Saída: {args.output}")
@@ -0,0 +1,163 @@
+"""
+Benchmark: recall x latência do índice aproximado (IVF) em um catálogo grande
+
+Gera um catálogo sintético (padrão: 100 mil perfis de cães) no mesmo espaço de
+features do modelo — categorias dos label encoders e faixas numéricas do
+dataset, passadas pelo mesmo pré-processamento — e compara, para vários
+valores de n_probe, o IVFIndex com a busca exata:
+
+- referência: NearestNeighbors (sklearn, mesma métrica do modelo de similaridade)
+  treinado no catálogo sintético; o SimilarityIndex exato também é medido
+- recall@k por índice (vizinhos idênticos) e com empates (vizinho retornado a
+  uma distância <= à k-ésima distância exata conta como acerto)
+- latência de consultas únicas (p50/p99) e throughput em lote
+
+Uso:
+    python benchmarks/bench_ann_recall.py [--catalog 100000] [--queries 1000] [--top-k 5]
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, Any
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from dogmatch_predictor import DogMatchPredictor
+from similarity_index import SimilarityIndex
+from ann_index import IVFIndex
+from bench_suite import numeric_ranges, DEFAULT_CSV
+
+
+def synthetic_catalog(predictor: DogMatchPredictor, csv_path: str, n: int, seed: int) -> np.ndarray:
+    """
+    Matriz pré-processada (n, n_features) de perfis aleatórios válidos.
+    """
+    rng = np.random.default_rng(seed)
+    pipeline = predictor.fast_pipeline
+    ranges = numeric_ranges(csv_path, pipeline.input_numeric_columns)
+
+    blocks, total = [], 0
+    while total < n:
+        size = n - total + n // 4
+        columns = {col: rng.integers(0, len(classes), size) for col, classes in pipeline.encoder_classes.items()}
+        for col, spec in ranges.items():
+            if spec['integer']:
+                columns[col] = rng.integers(spec['min'], spec['max'] + 1, size).astype(np.float64)
+            else:
+                columns[col] = np.round(rng.uniform(spec['min'], spec['max'], size), 1)
+        matrix = pipeline.transform_encoded(columns)
+        matrix = matrix[np.isfinite(matrix).all(axis=1)]
+        blocks.append(matrix)
+        total += len(matrix)
+    return np.concatenate(blocks)[:n]
+
+
+def recall(reference_distances: np.ndarray, reference_indices: np.ndarray,
+           distances: np.ndarray, indices: np.ndarray) -> Dict[str, float]:
+    """recall@k por índice e considerando empates na k-ésima distância."""
+    k = reference_indices.shape[1]
+    same_ids = np.mean([len(np.intersect1d(a, b)) / k for a, b in zip(reference_indices, indices)])
+    kth = reference_distances[:, -1:]
+    with_ties = np.mean(np.minimum((distances <= kth + 1e-12).sum(axis=1), k) / k)
+    return {'recall_ids': float(same_ids), 'recall_ties': float(with_ties)}
+
+
+def latency(index: Any, queries: np.ndarray, k: int, **query_options: Any) -> Dict[str, float]:
+    """Latência de consultas únicas (µs) e throughput em lote (consultas/s)."""
+    for row in queries[:20]:
+        index.query(row[np.newaxis, :], k, **query_options)
+
+    samples = []
+    for row in queries:
+        started = time.perf_counter_ns()
+        index.query(row[np.newaxis, :], k, **query_options)
+        samples.append(time.perf_counter_ns() - started)
+    samples = np.asarray(samples) / 1000
+
+    started = time.perf_counter()
+    index.query(queries, k, **query_options)
+    batch_seconds = time.perf_counter() - started
+
+    return {
+        'p50_us': float(np.percentile(samples, 50)),
+        'p99_us': float(np.percentile(samples, 99)),
+        'batch_qps': len(queries) / batch_seconds
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--catalog', type=int, default=100_000, help='Linhas do catálogo sintético')
+    parser.add_argument('--queries', type=int, default=1000, help='Consultas avaliadas')
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--n-lists', type=int, default=None, help='Listas do IVF (padrão: ~sqrt(catálogo))')
+    parser.add_argument('--probes', default='1,2,4,8,16,32', help='Valores de n_probe avaliados')
+    parser.add_argument('--min-recall', type=float, default=0.95,
+                        help='Recall (com empates) mínimo esperado no n_probe padrão do índice')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--csv', default=DEFAULT_CSV)
+    args = parser.parse_args()
+
+    predictor = DogMatchPredictor()
+    from sklearn.neighbors import NearestNeighbors
+
+    data = synthetic_catalog(predictor, args.csv, args.catalog, args.seed)
+    queries = synthetic_catalog(predictor, args.csv, args.queries, args.seed + 1)
+    k = args.top_k
+
+    # Referência: NearestNeighbors do sklearn com a métrica do modelo de similaridade
+    params = predictor.similarity_model.get_params()
+    sklearn_model = NearestNeighbors(metric=params['metric'], p=params['p'], metric_params=params['metric_params'],
+                                     algorithm='brute').fit(data)
+    ref_distances, ref_indices = sklearn_model.kneighbors(queries, n_neighbors=k)
+
+    exact = SimilarityIndex.from_estimator(sklearn_model, data)
+    exact_distances, exact_indices = exact.query(queries, k)
+
+    started = time.perf_counter()
+    ivf = IVFIndex.from_estimator(sklearn_model, data, n_lists=args.n_lists)
+    build_seconds = time.perf_counter() - started
+
+    print(f"\n🔍 Catálogo sintético: {data.shape[0]:,} linhas x {data.shape[1]} features | "
+          f"{len(queries)} consultas | top_k={k} | métrica={ivf.metric}")
+    print(f"🏗️ IVF: {ivf.n_lists} listas, n_probe padrão {ivf.n_probe}, construído em {build_seconds:.2f}s")
+    print("=" * 92)
+    print(f"{'índice':<22}{'recall ids':>12}{'recall empates':>16}{'p50 µs':>12}{'p99 µs':>12}{'lote q/s':>14}")
+
+    def report(name: str, distances: np.ndarray, indices: np.ndarray, timing: Dict[str, float]) -> Dict[str, float]:
+        scores = recall(ref_distances, ref_indices, distances, indices)
+        print(f"{name:<22}{scores['recall_ids']:>12.4f}{scores['recall_ties']:>16.4f}"
+              f"{timing['p50_us']:>12.1f}{timing['p99_us']:>12.1f}{timing['batch_qps']:>14,.0f}")
+        return scores
+
+    sklearn_timing = latency(type('SklearnIndex', (), {
+        'query': staticmethod(lambda X, k: sklearn_model.kneighbors(X, n_neighbors=k))
+    })(), queries[:200], k)
+    report('sklearn (referência)', ref_distances, ref_indices, sklearn_timing)
+    report('exato (SimilarityIndex)', exact_distances, exact_indices, latency(exact, queries, k))
+
+    default_scores = None
+    probes = sorted({int(value) for value in args.probes.split(',')} | {ivf.n_probe})
+    for n_probe in probes:
+        if n_probe > ivf.n_lists:
+            continue
+        distances, indices = ivf.query(queries, k, n_probe=n_probe)
+        name = f"IVF n_probe={n_probe}" + (' *' if n_probe == ivf.n_probe else '')
+        scores = report(name, distances, indices, latency(ivf, queries, k, n_probe=n_probe))
+        if n_probe == ivf.n_probe:
+            default_scores = scores
+
+    print("\n* n_probe padrão do índice")
+    ok = default_scores is not None and default_scores['recall_ties'] >= args.min_recall
+    print(f"{'✅' if ok else '❌'} recall com empates no n_probe padrão: "
+          f"{default_scores['recall_ties']:.4f} (mínimo {args.min_recall})")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Benchmark: memória por worker com e sem o catálogo compartilhado
+
+Sobe N processos (como workers do gunicorn que carregam o modelo por conta
+própria: sem preload, ou depois de uma recarga) com um catálogo sintético de
+--rows raças, adicionado por update_catalog(), e mede em cada um:
+
+- USS (memória privada: Private_Clean + Private_Dirty de /proc/<pid>/smaps_rollup)
+- PSS (memória proporcional: páginas compartilhadas divididas entre os processos)
+
+Cenários: catálogo montado em cada processo e catálogo em um segmento
+compartilhado (shared_catalog.py), criado pelo primeiro processo e mapeado
+pelos demais. O ganho cresce com o tamanho do catálogo e o número de workers.
+
+Uso:
+    python benchmarks/bench_shared_catalog.py [--rows 20000] [--workers 4] [--bundle models/dogmatch_bundle.dmb]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Adicionar o diretório do backend ao path para importar o predictor
+sys.path.append(BACKEND_DIR)
+
+# Executado em cada processo: carrega, aplica o catálogo sintético e espera o pai medir
+CHILD_SCRIPT = r"""
+import gc, json, sys
+from dogmatch_predictor import DogMatchPredictor, EXAMPLE_INPUT
+bundle_path, shared_dir, rows_path = sys.argv[1:4]
+predictor = DogMatchPredictor(bundle_path=bundle_path or None, shared_catalog_dir=shared_dir or None)
+with open(rows_path, encoding='utf-8') as f:
+    predictor.update_catalog(upserts=json.load(f))
+predictor.predict(dict(EXAMPLE_INPUT))
+gc.collect()
+print('ready', flush=True)
+sys.stdin.read()
+"""
+
+
+def synthetic_rows(predictor: Any, n: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """Raças sintéticas válidas (categorias dos encoders e números aleatórios)."""
+    rng = np.random.default_rng(seed)
+    pipeline = predictor.fast_pipeline
+    rows = []
+    while len(rows) < n:
+        row = {'Name': f'Synthetic {len(rows):06d}'}
+        for col in predictor.feature_columns:
+            if col in pipeline.encoder_classes:
+                row[col] = str(rng.choice(pipeline.encoder_classes[col]))
+            else:
+                row[col] = int(rng.integers(1, 11))
+        if np.isfinite(pipeline.transform_one(row)).all():
+            rows.append(row)
+    return rows
+
+
+def memory_kb(pid: int) -> Dict[str, int]:
+    """Campos de /proc/<pid>/smaps_rollup, em KB."""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == 'kB':
+                values[parts[0].rstrip(':')] = int(parts[1])
+    return values
+
+
+def start_child(bundle_path: Optional[str], shared_dir: Optional[str], rows_path: str) -> subprocess.Popen:
+    """Inicia um processo e espera o catálogo ficar pronto."""
+    child = subprocess.Popen(
+        [sys.executable, '-c', CHILD_SCRIPT, bundle_path or '', shared_dir or '', rows_path],
+        cwd=BACKEND_DIR, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    for line in child.stdout:
+        if line.strip() == 'ready':
+            return child
+    raise RuntimeError(f"Processo terminou antes de carregar o catálogo (código {child.wait()})")
+
+
+def run_scenario(workers: int, bundle_path: Optional[str], shared_dir: Optional[str],
+                 rows_path: str) -> Dict[str, float]:
+    """Sobe os processos (o primeiro antes dos demais, como o master) e mede todos juntos."""
+    children = [start_child(bundle_path, shared_dir, rows_path)]
+    children += [start_child(bundle_path, shared_dir, rows_path) for _ in range(workers - 1)]
+    try:
+        usage = [memory_kb(child.pid) for child in children]
+    finally:
+        for child in children:
+            child.stdin.close()
+            child.wait()
+
+    uss = [entry['Private_Clean'] + entry['Private_Dirty'] for entry in usage]
+    return {
+        'uss_mb': float(np.median(uss)) / 1024,
+        'pss_total_mb': sum(entry['Pss'] for entry in usage) / 1024,
+        'rss_mb': float(np.median([entry['Rss'] for entry in usage])) / 1024,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=20_000, help='Raças sintéticas adicionadas ao catálogo')
+    parser.add_argument('--workers', type=int, default=4, help='Número de processos')
+    parser.add_argument('--bundle', help='Bundle dos modelos (padrão: .pkl)')
+    args = parser.parse_args()
+
+    from dogmatch_predictor import DogMatchPredictor
+    predictor = DogMatchPredictor(bundle_path=args.bundle)
+    rows = synthetic_rows(predictor, args.rows)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        rows_path = os.path.join(tmp_dir, 'rows.json')
+        with open(rows_path, 'w', encoding='utf-8') as f:
+            json.dump(rows, f)
+
+        results = {
+            'por processo': run_scenario(args.workers, args.bundle, None, rows_path),
+            'compartilhado': run_scenario(args.workers, args.bundle, os.path.join(tmp_dir, 'segments'), rows_path),
+        }
+
+    print(f"\n🧩 Memória com {args.workers} processos e {len(predictor.breed_names) + args.rows:,} raças no catálogo")
+    print("=" * 64)
+    print(f"{'catálogo':<16}{'USS/worker MB':>16}{'RSS/worker MB':>16}{'PSS total MB':>16}")
+    for name, result in results.items():
+        print(f"{name:<16}{result['uss_mb']:>16.1f}{result['rss_mb']:>16.1f}{result['pss_total_mb']:>16.1f}")
+
+    saved = results['por processo']['pss_total_mb'] - results['compartilhado']['pss_total_mb']
+    print(f"\n{'✅' if saved > 0 else '❌'} Economia total: {saved:.1f} MB")
+    return 0 if saved > 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
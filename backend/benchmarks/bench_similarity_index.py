@@ -0,0 +1,83 @@
+"""
+Benchmark: SimilarityIndex vs NearestNeighbors.kneighbors (sklearn)
+
+Compara latência e resultados do índice pré-calculado com o modelo de
+similaridade treinado, para consultas únicas e em lote.
+
+Uso:
+    python benchmarks/bench_similarity_index.py [--repeat 2000] [--batch 5000]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Adicionar o diretório do backend ao path para importar o predictor
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dogmatch_predictor import DogMatchPredictor
+
+
+def time_per_call(func, repeat: int) -> float:
+    """Tempo médio por chamada, em microssegundos."""
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=2000, help='Repetições das consultas únicas')
+    parser.add_argument('--batch', type=int, default=5000, help='Tamanho do lote de consultas')
+    parser.add_argument('--top-k', type=int, default=5, help='Número de vizinhos')
+    args = parser.parse_args()
+
+    predictor = DogMatchPredictor()
+    index = predictor.similarity_index
+    sklearn_model = predictor._similarity_nd
+    catalog = index.data
+
+    # Consultas: linhas do catálogo com ruído (mesma escala das features pré-processadas)
+    rng = np.random.default_rng(42)
+    queries = catalog[rng.integers(0, len(catalog), args.batch)]
+    queries = queries + rng.normal(0, 0.5, queries.shape)
+
+    # Paridade dos resultados
+    ref_dist, ref_ind = sklearn_model.kneighbors(queries, n_neighbors=args.top_k)
+    dist, ind = index.query(queries, args.top_k)
+    same_indices = np.array_equal(ref_ind, ind)
+    max_abs_diff = float(np.max(np.abs(ref_dist - dist)))
+
+    single = queries[:1]
+    sklearn_single = time_per_call(lambda: sklearn_model.kneighbors(single, n_neighbors=args.top_k), args.repeat)
+    index_single = time_per_call(lambda: index.query(single, args.top_k), args.repeat)
+
+    batch_repeat = max(1, args.repeat // 200)
+    sklearn_batch = time_per_call(lambda: sklearn_model.kneighbors(queries, n_neighbors=args.top_k), batch_repeat)
+    index_batch = time_per_call(lambda: index.query(queries, args.top_k), batch_repeat)
+
+    index32 = type(index)(catalog, metric=index.metric, p=index.p, dtype=np.float32)
+    index32_batch = time_per_call(lambda: index32.query(queries, args.top_k), batch_repeat)
+    _, ind32 = index32.query(queries, args.top_k)
+
+    print(f"\n🔍 Catálogo: {catalog.shape[0]} linhas x {catalog.shape[1]} features, métrica={index.metric}, top_k={args.top_k}")
+    print("=" * 60)
+    print(f"Índices idênticos ao sklearn:      {same_indices}")
+    print(f"Maior diferença de distância:      {max_abs_diff:.2e}")
+    print(f"float32: índices iguais ao sklearn: {np.mean(np.all(ind32 == ref_ind, axis=1)):.2%} das consultas")
+    print("-" * 60)
+    print(f"Consulta única  sklearn: {sklearn_single:9.1f} µs")
+    print(f"Consulta única  índice:  {index_single:9.1f} µs  ({sklearn_single / index_single:.1f}x)")
+    print(f"Lote {args.batch:<6} sklearn: {sklearn_batch / 1000:9.1f} ms")
+    print(f"Lote {args.batch:<6} índice:  {index_batch / 1000:9.1f} ms  ({sklearn_batch / index_batch:.1f}x)")
+    print(f"Lote {args.batch:<6} float32: {index32_batch / 1000:9.1f} ms  ({sklearn_batch / index32_batch:.1f}x)")
+
+    return 0 if same_indices else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
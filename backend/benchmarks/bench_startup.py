@@ -0,0 +1,109 @@
+"""
+Benchmark: tempo de import, carga do modelo e memória (RSS) de um worker
+
+Cada cenário roda em um interpretador novo (como um worker do gunicorn) e mede:
+
+- import do app Flask (app.py)
+- carga e aquecimento do predictor (.pkl ou bundle de DOGMATCH_BUNDLE)
+- uma requisição POST /api/recommend pelo test client
+- RSS e pico de RSS do processo, e se pandas/sklearn foram importados
+
+Uso:
+    python benchmarks/bench_startup.py [--bundle models/dogmatch_bundle.dmb] [--repeat 3]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Dict, Any, Optional
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executado no processo filho; imprime uma linha JSON com as medidas
+CHILD_SCRIPT = r"""
+import json, resource, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.get_predictor()
+loaded = time.perf_counter()
+from dogmatch_predictor import EXAMPLE_INPUT
+response = app.app.test_client().post('/api/recommend', json=dict(EXAMPLE_INPUT))
+served = time.perf_counter()
+with open('/proc/self/status') as f:
+    rss_kb = next(int(line.split()[1]) for line in f if line.startswith('VmRSS'))
+print(json.dumps({
+    'import_s': imported - started,
+    'load_s': loaded - imported,
+    'first_request_s': served - loaded,
+    'status': response.status_code,
+    'rss_mb': rss_kb / 1024,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'pandas': 'pandas' in sys.modules,
+    'sklearn': 'sklearn' in sys.modules,
+    'modules': len(sys.modules),
+}))
+"""
+
+
+def run_child(bundle_path: Optional[str]) -> Dict[str, Any]:
+    """Mede um cenário em um processo novo."""
+    env = dict(os.environ)
+    env.pop('DOGMATCH_BUNDLE', None)
+    env.pop('DOGMATCH_EAGER_LOAD', None)
+    if bundle_path:
+        env['DOGMATCH_BUNDLE'] = bundle_path
+    output = subprocess.run([sys.executable, '-c', CHILD_SCRIPT], cwd=BACKEND_DIR, env=env,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def median(values: list) -> float:
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bundle', default=os.path.join(BACKEND_DIR, 'models', 'dogmatch_bundle.dmb'),
+                        help='Bundle medido (gerado em um diretório temporário se não existir)')
+    parser.add_argument('--repeat', type=int, default=3, help='Execuções por cenário (mediana)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bundle_path = args.bundle
+        if not os.path.exists(bundle_path):
+            bundle_path = os.path.join(tmp_dir, 'dogmatch_bundle.dmb')
+            subprocess.run([sys.executable, 'model_bundle.py', 'export', '--output', bundle_path],
+                           cwd=BACKEND_DIR, capture_output=True, check=True)
+
+        # Primeira execução só aquece o cache de bytecode e o page cache
+        run_child(None)
+        scenarios = {'.pkl': None, 'bundle': bundle_path}
+        results = {name: [run_child(path) for _ in range(args.repeat)] for name, path in scenarios.items()}
+
+    print(f"\n🚀 Startup de um worker (mediana de {args.repeat} execuções)")
+    print("=" * 96)
+    print(f"{'origem':<10}{'import app':>12}{'carga':>10}{'1ª req.':>10}{'RSS MB':>10}{'pico MB':>10}"
+          f"{'módulos':>10}{'pandas':>8}{'sklearn':>9}")
+    ok = True
+    for name, runs in results.items():
+        row = {key: median([run[key] for run in runs]) for key in
+               ('import_s', 'load_s', 'first_request_s', 'rss_mb', 'peak_rss_mb', 'modules')}
+        pandas_loaded, sklearn_loaded = runs[0]['pandas'], runs[0]['sklearn']
+        ok = ok and all(run['status'] == 200 for run in runs)
+        print(f"{name:<10}{row['import_s'] * 1000:>10.0f}ms{row['load_s'] * 1000:>8.0f}ms"
+              f"{row['first_request_s'] * 1000:>8.1f}ms{row['rss_mb']:>10.1f}{row['peak_rss_mb']:>10.1f}"
+              f"{row['modules']:>10}{'sim' if pandas_loaded else 'não':>8}{'sim' if sklearn_loaded else 'não':>9}")
+
+    bundle_runs = results['bundle']
+    lean = not bundle_runs[0]['pandas'] and not bundle_runs[0]['sklearn']
+    print(f"\n{'✅' if lean else '❌'} Bundle servindo sem pandas/sklearn: {lean}")
+    return 0 if ok and lean else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,399 @@
+"""
+Suíte de benchmark do DogMatch: latência do predictor por etapa e throughput HTTP
+
+Gera questionários realistas (categorias dos label encoders, faixas numéricas
+do dataset ml/data/Dog_Breads_Filtered.csv) e mede:
+
+- predictor, por etapa (caminho NumPy e caminho pandas): validate, encode,
+  derive, scale, predict, similarity, profile
+- predictor, ponta a ponta: predict() por entrada e predict_batch() por linha
+- HTTP, via test client local (Flask e, se instalado, ASGI): /api/recommend e
+  /api/recommend/batch, com o cache de resultados desligado
+
+O resultado é gravado em JSON (--output) e pode ser comparado com uma execução
+anterior (--compare): latências que pioram ou throughputs que caem mais que
+--threshold (e, para latências, mais que --min-delta-us) são marcados como
+regressão (código de saída 1).
+
+Uso:
+    python benchmarks/bench_suite.py --output bench.json
+    python benchmarks/bench_suite.py --output novo.json --compare bench.json
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Dict, List, Any, Callable
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CSV = os.path.join(BACKEND_DIR, '..', 'ml', 'data', 'Dog_Breads_Filtered.csv')
+
+# Adicionar o diretório do backend ao path para importar o predictor
+sys.path.append(BACKEND_DIR)
+
+STAGES = ('validate', 'encode', 'derive', 'scale', 'predict', 'similarity', 'profile')
+
+
+def numeric_ranges(csv_path: str, columns: List[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Faixa (mín/máx) de cada coluna numérica no dataset e se os valores são inteiros.
+    """
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+
+    ranges = {}
+    for col in columns:
+        values = [float(row[col]) for row in rows]
+        ranges[col] = {
+            'min': min(values),
+            'max': max(values),
+            'integer': all(value.is_integer() for value in values)
+        }
+    return ranges
+
+
+def generate_payloads(predictor: Any, csv_path: str, n: int, seed: int = 42) -> List[Dict[str, Any]]:
+    """
+    Questionários aleatórios válidos: categorias dos label encoders e números nas faixas do dataset.
+
+    Combinações que o modelo não consegue pontuar (features derivadas NaN, ex.:
+    tamanhos sem score) são descartadas, para medir apenas predições bem-sucedidas.
+    """
+    rng = np.random.default_rng(seed)
+    pipeline = predictor.fast_pipeline
+    ranges = numeric_ranges(csv_path, pipeline.input_numeric_columns)
+
+    payloads = []
+    while len(payloads) < n:
+        payload = {}
+        for col in predictor.feature_columns:
+            if col in pipeline.encoder_classes:
+                payload[col] = str(rng.choice(pipeline.encoder_classes[col]))
+            else:
+                spec = ranges[col]
+                if spec['integer']:
+                    payload[col] = int(rng.integers(spec['min'], spec['max'] + 1))
+                else:
+                    payload[col] = round(float(rng.uniform(spec['min'], spec['max'])), 1)
+        if np.isfinite(pipeline.transform_one(payload)).all():
+            payloads.append(payload)
+    return payloads
+
+
+def summarize(samples_ns: List[int]) -> Dict[str, float]:
+    """Estatísticas de latência em microssegundos."""
+    values = np.asarray(samples_ns, dtype=np.float64) / 1000
+    return {
+        'n': int(values.size),
+        'mean_us': round(float(values.mean()), 2),
+        'p50_us': round(float(np.percentile(values, 50)), 2),
+        'p90_us': round(float(np.percentile(values, 90)), 2),
+        'p99_us': round(float(np.percentile(values, 99)), 2),
+        'max_us': round(float(values.max()), 2)
+    }
+
+
+def time_stages(payloads: List[Dict[str, Any]], stages: Dict[str, Callable[[Dict[str, Any], Dict[str, Any]], None]],
+                warmup: int = 20) -> Dict[str, Dict[str, float]]:
+    """
+    Executa as etapas em sequência para cada entrada, medindo cada uma separadamente.
+
+    Cada etapa recebe a entrada e um dicionário de estado compartilhado com as
+    etapas seguintes (linha pré-processada, DataFrame...).
+    """
+    samples = {name: [] for name in stages}
+    for i, payload in enumerate(payloads[:warmup] + payloads):
+        state: Dict[str, Any] = {}
+        for name, stage in stages.items():
+            started = time.perf_counter_ns()
+            stage(payload, state)
+            elapsed = time.perf_counter_ns() - started
+            if i >= warmup:
+                samples[name].append(elapsed)
+
+    results = {name: summarize(values) for name, values in samples.items()}
+    total = np.sum([samples[name] for name in stages], axis=0)
+    results['total'] = summarize(total.tolist())
+    return results
+
+
+def predict_stage(predictor: Any, features: Any, top_k: int, state: Dict[str, Any]) -> None:
+    """Busca de vizinhos compartilhada e ranking da predição principal."""
+    probabilities, state['distances'], state['indices'] = predictor._infer_matrix(features, top_k)
+    predictor._format_predictions(probabilities[0], top_k)
+
+
+def similarity_stage(predictor: Any, top_k: int, state: Dict[str, Any]) -> None:
+    """Raças similares a partir dos vizinhos já encontrados em predict_stage."""
+    predictor._format_similar_breeds(state['distances'][0], state['indices'][0], top_k)
+
+
+def fast_path_stages(predictor: Any, top_k: int) -> Dict[str, Callable]:
+    """Etapas do caminho NumPy (_predict_fast)."""
+    pipeline = predictor.fast_pipeline
+    row = np.empty((1, len(pipeline.enhanced_columns)), dtype=np.float64)
+
+    return {
+        'validate': lambda payload, state: predictor._validate_input(payload),
+        'encode': lambda payload, state: pipeline._encode_row(row, payload),
+        'derive': lambda payload, state: pipeline._apply_derived(row),
+        'scale': lambda payload, state: pipeline._apply_scaler(row),
+        'predict': lambda payload, state: predict_stage(predictor, row, top_k, state),
+        'similarity': lambda payload, state: similarity_stage(predictor, top_k, state),
+        'profile': lambda payload, state: predictor._calculate_user_profile(row)
+    }
+
+
+def pandas_path_stages(predictor: Any, top_k: int) -> Dict[str, Callable]:
+    """Etapas do caminho pandas (_predict_live com fast_path=False)."""
+    import pandas as pd
+
+    def encode(payload, state):
+        user_df = pd.DataFrame([payload])
+        for col in predictor.categorical_columns:
+            user_df[col] = predictor.label_encoders[col].transform(user_df[col])
+        state['df'] = user_df
+
+    def derive(payload, state):
+        state['df'] = predictor._create_derived_features(state['df'])
+
+    def scale(payload, state):
+        user_df = state['df']
+        user_df[predictor.numeric_columns] = predictor.robust_scaler.transform(user_df[predictor.numeric_columns])
+
+    return {
+        'validate': lambda payload, state: predictor._validate_input(payload),
+        'encode': encode,
+        'derive': derive,
+        'scale': scale,
+        'predict': lambda payload, state: predict_stage(predictor, state['df'], top_k, state),
+        'similarity': lambda payload, state: similarity_stage(predictor, top_k, state),
+        'profile': lambda payload, state: predictor._calculate_user_profile(state['df'])
+    }
+
+
+def bench_end_to_end(predictor: Any, payloads: List[Dict[str, Any]], top_k: int) -> Dict[str, Any]:
+    """predict() por entrada e predict_batch() por linha."""
+    for payload in payloads[:20]:
+        predictor.predict(payload, top_k)
+
+    samples = []
+    for payload in payloads:
+        started = time.perf_counter_ns()
+        predictor.predict(payload, top_k)
+        samples.append(time.perf_counter_ns() - started)
+
+    started = time.perf_counter()
+    predictor.predict_batch(payloads, top_k)
+    batch_seconds = time.perf_counter() - started
+
+    return {
+        'predict': summarize(samples),
+        'predict_batch': {
+            'rows': len(payloads),
+            'total_ms': round(batch_seconds * 1000, 2),
+            'per_row_us': round(batch_seconds / len(payloads) * 1e6, 2)
+        }
+    }
+
+
+def bench_http(post: Callable[[str, Any], int], payloads: List[Dict[str, Any]],
+               batch_size: int) -> Dict[str, Any]:
+    """
+    Latência e throughput (sequencial) de /api/recommend e /api/recommend/batch.
+
+    Args:
+        post: Função (rota, corpo JSON) -> status HTTP, sobre um test client
+    """
+    for payload in payloads[:20]:
+        post('/api/recommend', payload)
+
+    samples = []
+    errors = 0
+    started = time.perf_counter()
+    for payload in payloads:
+        request_started = time.perf_counter_ns()
+        status = post('/api/recommend', payload)
+        samples.append(time.perf_counter_ns() - request_started)
+        errors += status != 200
+    elapsed = time.perf_counter() - started
+
+    batches = [payloads[i:i + batch_size] for i in range(0, len(payloads), batch_size)]
+    batch_started = time.perf_counter()
+    for batch in batches:
+        errors += post('/api/recommend/batch', {'inputs': batch}) != 200
+    batch_elapsed = time.perf_counter() - batch_started
+
+    return {
+        'recommend': {
+            **summarize(samples),
+            'throughput_rps': round(len(payloads) / elapsed, 1)
+        },
+        'recommend_batch': {
+            'batch_size': batch_size,
+            'rows_per_second': round(len(payloads) / batch_elapsed, 1)
+        },
+        'errors': errors
+    }
+
+
+def environment_info() -> Dict[str, Any]:
+    """Versões e máquina, para contextualizar a comparação entre execuções."""
+    import sklearn
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                                capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+
+    return {
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__,
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count()
+    }
+
+
+def flatten_metrics(results: Dict[str, Any], prefix: str = '') -> Dict[str, float]:
+    """Métricas comparáveis ({caminho: valor}): latências em µs e throughputs."""
+    metrics = {}
+    for key, value in results.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            metrics.update(flatten_metrics(value, path))
+        elif key in ('mean_us', 'p50_us', 'p99_us', 'per_row_us', 'throughput_rps', 'rows_per_second'):
+            metrics[path] = float(value)
+    return metrics
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float, min_delta_us: float) -> int:
+    """
+    Imprime a variação de cada métrica e retorna o número de regressões.
+
+    Latências só contam como regressão se, além da piora relativa, piorarem
+    mais que min_delta_us em valor absoluto (etapas de poucos µs são ruidosas).
+    """
+    before = flatten_metrics(baseline['results'])
+    after = flatten_metrics(current['results'])
+    regressions = 0
+
+    print(f"\n📈 Comparação com {baseline['environment'].get('git_commit')} "
+          f"({baseline['environment'].get('timestamp')}), limite {threshold:.0%}")
+    print("=" * 90)
+    for path in sorted(set(before) & set(after)):
+        old, new = before[path], after[path]
+        change = (new - old) / old if old else 0.0
+        higher_is_better = path.endswith(('throughput_rps', 'rows_per_second'))
+        regressed = (-change if higher_is_better else change) > threshold
+        if not higher_is_better and new - old <= min_delta_us:
+            regressed = False
+        regressions += regressed
+        print(f"{'❌' if regressed else '  '} {path:<55} {old:>10.1f} → {new:>10.1f}  ({change:+.1%})")
+
+    print(f"\n{'❌' if regressions else '✅'} {regressions} regressão(ões)")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=2000, help='Questionários gerados (caminho NumPy e HTTP)')
+    parser.add_argument('--pandas-requests', type=int, default=200, help='Questionários medidos no caminho pandas')
+    parser.add_argument('--top-k', type=int, default=5)
+    parser.add_argument('--batch-size', type=int, default=100, help='Tamanho dos lotes em /api/recommend/batch')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--csv', default=DEFAULT_CSV, help='Dataset com as faixas numéricas')
+    parser.add_argument('--skip-http', action='store_true', help='Medir apenas o predictor')
+    parser.add_argument('--output', help='Arquivo JSON com os resultados')
+    parser.add_argument('--compare', help='JSON de uma execução anterior para comparar')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Piora relativa considerada regressão')
+    parser.add_argument('--min-delta-us', type=float, default=10.0,
+                        help='Piora absoluta mínima (µs) para uma latência contar como regressão')
+    args = parser.parse_args()
+
+    # O benchmark mede inferência, não o cache de resultados
+    os.environ['DOGMATCH_CACHE_SIZE'] = '0'
+    os.environ.pop('DOGMATCH_LOOKUP_TABLE', None)
+
+    import api_service
+
+    predictor = api_service.get_predictor()
+    payloads = generate_payloads(predictor, args.csv, args.requests, args.seed)
+
+    results: Dict[str, Any] = {
+        'predictor_stages': {
+            'fast_path': time_stages(payloads, fast_path_stages(predictor, args.top_k)),
+            'pandas_path': time_stages(payloads[:args.pandas_requests], pandas_path_stages(predictor, args.top_k))
+        },
+        'predictor_end_to_end': bench_end_to_end(predictor, payloads, args.top_k)
+    }
+
+    if not args.skip_http:
+        from app import app as flask_app
+
+        flask_client = flask_app.test_client()
+        results['http'] = {
+            'flask': bench_http(lambda path, body: flask_client.post(path, json=body).status_code,
+                                payloads, args.batch_size)
+        }
+        try:
+            from fastapi.testclient import TestClient
+            import asgi_app
+        except ImportError:
+            print("⚠️ FastAPI não instalado: pulando o benchmark HTTP do modo ASGI")
+        else:
+            with TestClient(asgi_app.app) as asgi_client:
+                results['http']['asgi'] = bench_http(lambda path, body: asgi_client.post(path, json=body).status_code,
+                                                     payloads, args.batch_size)
+
+    report = {
+        'environment': environment_info(),
+        'config': {
+            'requests': len(payloads),
+            'pandas_requests': min(args.pandas_requests, len(payloads)),
+            'top_k': args.top_k,
+            'batch_size': args.batch_size,
+            'seed': args.seed
+        },
+        'results': results
+    }
+
+    print(f"\n⏱️ Latência por etapa ({len(payloads)} questionários, µs)")
+    print("=" * 90)
+    for path_name, stages in results['predictor_stages'].items():
+        print(f"{path_name}:")
+        for stage, stats in stages.items():
+            print(f"  {stage:<11} p50 {stats['p50_us']:>9.1f}  p90 {stats['p90_us']:>9.1f}  p99 {stats['p99_us']:>9.1f}")
+    end_to_end = results['predictor_end_to_end']
+    print(f"predict():       p50 {end_to_end['predict']['p50_us']:.1f} µs | p99 {end_to_end['predict']['p99_us']:.1f} µs")
+    print(f"predict_batch(): {end_to_end['predict_batch']['per_row_us']:.1f} µs por linha")
+    for server, stats in results.get('http', {}).items():
+        print(f"HTTP {server:<6} /api/recommend: {stats['recommend']['throughput_rps']} req/s "
+              f"(p50 {stats['recommend']['p50_us'] / 1000:.2f} ms, p99 {stats['recommend']['p99_us'] / 1000:.2f} ms) | "
+              f"batch: {stats['recommend_batch']['rows_per_second']} linhas/s | erros: {stats['errors']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Resultados gravados em {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        return 1 if compare(baseline, report, args.threshold, args.min_delta_us) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
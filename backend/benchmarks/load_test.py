@@ -0,0 +1,147 @@
+"""
+Teste de carga HTTP para a API do DogMatch (apenas biblioteca padrão)
+
+Abre N conexões simultâneas (asyncio) contra um servidor já em execução e
+envia POST /api/recommend com a entrada de exemplo durante um tempo fixo,
+reportando throughput, latências (p50/p90/p99) e erros. Funciona tanto com o
+app Flask (gunicorn) quanto com o app ASGI (uvicorn); conexões fechadas pelo
+servidor (workers sync não mantêm keep-alive) são reabertas.
+
+Uso:
+    python benchmarks/load_test.py --url http://127.0.0.1:8080 [--connections 100] [--duration 10]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from typing import Dict, List, Any
+from urllib.parse import urlsplit
+
+EXAMPLE_INPUT = {
+    "Size": "Medium",
+    "Exercise Requirements (hrs/day)": 2.0,
+    "Good with Children": "Yes",
+    "Intelligence Rating (1-10)": 7,
+    "Training Difficulty (1-10)": 3,
+    "Shedding Level": "Moderate",
+    "Health Issues Risk": "Low",
+    "Type": "Herding",
+    "Friendly Rating (1-10)": 8,
+    "Life Span": 12,
+    "Average Weight (kg)": 20
+}
+
+
+def build_request(host: str, path: str, body: Dict[str, Any]) -> bytes:
+    """Requisição HTTP/1.1 com keep-alive, pronta para enviar."""
+    payload = json.dumps(body).encode('utf-8')
+    head = (f"POST {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(payload)}\r\nConnection: keep-alive\r\n\r\n")
+    return head.encode('ascii') + payload
+
+
+async def read_response(reader: asyncio.StreamReader):
+    """Lê uma resposta; retorna (status, servidor manteve a conexão aberta)."""
+    head = await reader.readuntil(b'\r\n\r\n')
+    lines = head.decode('latin-1').split('\r\n')
+    status = int(lines[0].split()[1])
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers.get('connection', '').lower() != 'close'
+
+
+async def client(host: str, port: int, request: bytes, deadline: float,
+                 latencies: List[float], errors: Dict[str, int]) -> None:
+    """Uma conexão enviando requisições em sequência até o fim do teste."""
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            started = time.perf_counter()
+            writer.write(request)
+            status, keep_alive = await read_response(reader)
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors[f'HTTP {status}'] = errors.get(f'HTTP {status}', 0) + 1
+            if not keep_alive:
+                writer.close()
+                writer = None
+        except (OSError, asyncio.IncompleteReadError) as e:
+            errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+            if writer is not None:
+                writer.close()
+            writer = None
+            await asyncio.sleep(0.01)
+    if writer is not None:
+        writer.close()
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return float('nan')
+    return sorted_values[min(len(sorted_values) - 1, int(q / 100 * len(sorted_values)))]
+
+
+async def run(url: str, connections: int, duration: float, path: str) -> Dict[str, Any]:
+    parts = urlsplit(url)
+    host, port = parts.hostname, parts.port or 80
+    request = build_request(f"{host}:{port}", path, EXAMPLE_INPUT)
+
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*[client(host, port, request, deadline, latencies, errors)
+                           for _ in range(connections)])
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'url': url + path,
+        'connections': connections,
+        'duration_s': round(elapsed, 2),
+        'requests': len(latencies),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'latency_ms': {
+            'p50': round(percentile(latencies, 50) * 1000, 2),
+            'p90': round(percentile(latencies, 90) * 1000, 2),
+            'p99': round(percentile(latencies, 99) * 1000, 2),
+            'max': round(latencies[-1] * 1000, 2) if latencies else None
+        },
+        'errors': errors
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--url', default='http://127.0.0.1:8080', help='Endereço do servidor')
+    parser.add_argument('--path', default='/api/recommend', help='Rota (POST com a entrada de exemplo)')
+    parser.add_argument('--connections', type=int, default=100, help='Conexões simultâneas')
+    parser.add_argument('--duration', type=float, default=10.0, help='Duração do teste, em segundos')
+    parser.add_argument('--json', action='store_true', help='Imprimir o resultado em JSON')
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args.url, args.connections, args.duration, args.path))
+
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        latency = result['latency_ms']
+        print(f"\n🌐 {result['url']} | {result['connections']} conexões | {result['duration_s']}s")
+        print("=" * 60)
+        print(f"Requisições:  {result['requests']}  ({result['throughput_rps']} req/s)")
+        print(f"Latência:     p50 {latency['p50']} ms | p90 {latency['p90']} ms | p99 {latency['p99']} ms | max {latency['max']} ms")
+        print(f"Erros:        {result['errors'] or 'nenhum'}")
+
+    return 0 if result['requests'] and not result['errors'] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,11 +6,104 @@ no backend (Flask/FastAPI) para fazer predições de raças de cães.
 Sistema híbrido otimizado com feature engineering e busca por similaridade.
 """
 
-import joblib
-import pandas as pd
 import numpy as np
+import contextlib
+import copy
 import os
-from typing import Dict, List, Any
+import threading
+from typing import TYPE_CHECKING, Dict, List, Any, Optional, NamedTuple, Tuple
+
+from fast_pipeline import (
+    FastFeaturePipeline, CHILDREN_SCORE_MAP, SHEDDING_SCORE_MAP, HEALTH_SCORE_MAP, SIZE_SCORE_MAP
+)
+from similarity_index import SimilarityIndex, build_similarity_index, effective_metric
+from lookup_table import LookupTable, model_fingerprint
+from shared_catalog import (
+    CatalogJournal, CatalogSegment, catalog_key, journal_path, release_segment, segment_path, write_segment
+)
+from attribute_index import AttributeIndex
+import numpy_models
+from metrics import stage_timer
+
+# pandas/joblib/sklearn são importados só quando usados (.pkl, caminho pandas,
+# update_catalog com modelos do sklearn): servindo de um bundle com o caminho
+# NumPy, nenhum deles é carregado
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Entrada de exemplo (usada no aquecimento do predictor)
+EXAMPLE_INPUT = {
+    'Size': 'Medium',
+    'Exercise Requirements (hrs/day)': 2.0,
+    'Good with Children': 'Yes',
+    'Intelligence Rating (1-10)': 7,
+    'Training Difficulty (1-10)': 3,
+    'Shedding Level': 'Moderate',
+    'Health Issues Risk': 'Low',
+    'Type': 'Herding',
+    'Friendly Rating (1-10)': 8,
+    'Life Span': 12,
+    'Average Weight (kg)': 20
+}
+
+# Campos do perfil do usuário: (chave no resultado, coluna, casas decimais)
+PROFILE_FIELDS = [
+    ('family_friendly', 'Family_Compatibility_Score', 2),
+    ('energy_level', 'Energy_Score', 2),
+    ('maintenance_level', 'Maintenance_Score', 2),
+    ('intelligence_level', 'Intelligence Rating (1-10)', 1),
+    ('size_preference', 'Size_Score', 1),
+]
+
+# Vizinhos pré-calculados por raça do catálogo (/api/breeds/<nome>/similar)
+BREED_NEIGHBORS_K = 10
+
+# Valores brutos das colunas numéricas do questionário para cada raça do catálogo
+# (X_enhanced.pkl só tem os valores após o scaling); usados pelos filtros
+BREED_ATTRIBUTES_FILE = 'breed_attributes.csv'
+
+
+class MissingFieldsError(ValueError):
+    """
+    Entrada sem um ou mais campos obrigatórios.
+    
+    Attributes:
+        fields: Campos ausentes (na ordem de feature_columns)
+        required: Todos os campos obrigatórios
+    """
+    
+    def __init__(self, fields: List[str], required: List[str]):
+        super().__init__(f"Features ausentes: {fields}")
+        self.fields = fields
+        self.required = required
+
+
+class CatalogSnapshot(NamedTuple):
+    """
+    Estado do catálogo usado nas predições (imutável).
+    
+    Tudo o que depende das linhas do catálogo fica junto e é trocado de uma só
+    vez por update_catalog(); cada requisição lê o snapshot uma única vez e usa
+    a mesma versão do início ao fim.
+    """
+    version: int
+    data: np.ndarray
+    breed_labels: np.ndarray
+    breed_names: List[str]
+    model: Any
+    similarity_model: Any
+    model_nd: Any
+    similarity_nd: Any
+    similarity_index: Any
+    row_classes: Optional[np.ndarray]
+    label_classes: np.ndarray
+    lookup_table: Optional[LookupTable]
+    breed_positions: Dict[str, int]
+    neighbor_indices: np.ndarray
+    neighbor_similarities: np.ndarray
+    attribute_index: AttributeIndex
+    segment: Optional[CatalogSegment] = None
 
 
 class DogMatchPredictor:
@@ -22,46 +115,755 @@ class DogMatchPredictor:
     - Modelo de similaridade (NearestNeighbors)
     - Feature engineering avançado
     - RobustScaler para normalização
+    
+    Por padrão a inferência usa o caminho NumPy (FastFeaturePipeline), que
+    produz os mesmos resultados do caminho pandas sem o overhead de criar
+    DataFrames. Use fast_path=False para o caminho pandas original.
     """
     
-    def __init__(self):
+    def __init__(self, fast_path: bool = True, lookup_table_path: Optional[str] = None,
+                 models_dir: Optional[str] = None, bundle_path: Optional[str] = None,
+                 metrics: Optional[Any] = None, similarity_backend: str = 'exact',
+                 similarity_options: Optional[Dict[str, Any]] = None,
+                 shared_catalog_dir: Optional[str] = None):
         """
         Inicializa o preditor carregando todos os modelos e preprocessadores.
+        
+        Args:
+            fast_path: Usar o pré-processamento NumPy em vez do pandas (padrão: True)
+            lookup_table_path: Tabela pré-calculada (lookup_table.py) para responder
+                entradas da grade em O(1); None desabilita
+            models_dir: Diretório com os .pkl (padrão: backend/models)
+            bundle_path: Bundle único gerado por model_bundle.py; quando informado,
+                substitui os .pkl (arrays mapeados em memória, checksum conferido)
+            metrics: MetricsRegistry (metrics.py) para medir a duração de cada
+                etapa da inferência; None desabilita a instrumentação
+            similarity_backend: Índice usado na busca por similares: 'exact'
+                (SimilarityIndex), 'ivf' (aproximado, para catálogos grandes) ou 'auto'
+            similarity_options: Parâmetros do índice IVF (n_lists, n_probe, seed)
+            shared_catalog_dir: Diretório dos segmentos compartilhados (shared_catalog.py);
+                quando informado, matriz do catálogo, índice e vizinhos por raça são
+                mapeados somente leitura de um segmento único por catálogo, criado
+                pelo primeiro processo que o carregar (apenas com o índice 'exact'),
+                e update_catalog() publica as alterações para os demais processos
         """
         try:
-            # Obter caminho absoluto do diretório atual
-            current_dir = os.path.dirname(os.path.abspath(__file__))
-            models_dir = os.path.join(current_dir, 'models')
-            
-            # Carregar modelos híbridos otimizados (dataset filtrado)
-            self.model = joblib.load(os.path.join(models_dir, 'dogmatch_optimized_model.pkl'))
-            self.similarity_model = joblib.load(os.path.join(models_dir, 'dogmatch_similarity_model.pkl'))
-            self.robust_scaler = joblib.load(os.path.join(models_dir, 'robust_scaler.pkl'))
-            self.label_encoders = joblib.load(os.path.join(models_dir, 'label_encoders.pkl'))
-            self.feature_info = joblib.load(os.path.join(models_dir, 'feature_info_optimized.pkl'))
-            
-            # Carregar dados processados para similaridade (dataset filtrado)
-            self.X_enhanced = joblib.load(os.path.join(models_dir, 'X_enhanced.pkl'))
-            self.y_processed = joblib.load(os.path.join(models_dir, 'y_processed.pkl'))
+            self.bundle = None
+            self.metrics = metrics
+            self.similarity_backend = similarity_backend
+            self.similarity_options = dict(similarity_options or {})
+            self.shared_catalog_dir = shared_catalog_dir
+            if bundle_path:
+                data, breed_labels, model, similarity_model, attributes = self._load_bundle(bundle_path)
+            else:
+                data, breed_labels, model, similarity_model, attributes = self._load_pickles(models_dir)
             
             # Extrair informações das features
             self.feature_columns = self.feature_info['feature_columns']
             self.categorical_columns = self.feature_info['categorical_columns']
             self.numeric_columns = self.feature_info['numeric_columns']
-            self.breed_names = self.feature_info['breed_names']
+            
+            # Caminho NumPy: encoders/scaler compilados e modelos sem feature names
+            # (evita o aviso do sklearn ao receber ndarray em vez de DataFrame)
+            self.fast_path = fast_path
+            self._enhanced_position = {col: i for i, col in enumerate(self.enhanced_columns)}
+            self.fast_pipeline = FastFeaturePipeline(
+                self.enhanced_columns, self.categorical_columns, self.numeric_columns,
+                self.label_encoders, self.robust_scaler
+            )
+            
+            # Schema de entrada: (campo, {valor: código} se categórico, se numérico)
+            self._input_schema = [
+                (col, self.fast_pipeline.encoders.get(col) if col in self.categorical_columns else None,
+                 col in self.numeric_columns)
+                for col in self.feature_columns
+            ]
+            
+            # Journal das atualizações do catálogo, compartilhado pelos processos com o mesmo catálogo base
+            self.catalog_journal = CatalogJournal(journal_path(
+                shared_catalog_dir, catalog_key(data, breed_labels, model, similarity_model, attributes)
+            )) if shared_catalog_dir else None
+            
+            # Catálogo (modelos KNN, índice top-k e labels); substituído por update_catalog()
+            self._catalog_lock = threading.Lock()
+            self._catalog = self._new_catalog(
+                data, breed_labels, model, similarity_model, attributes,
+                version=1, breed_names=self.feature_info['breed_names']
+            )
+            
+            # Tabela de lookup opcional (precisa ter sido gerada para estes mesmos modelos)
+            if lookup_table_path:
+                lookup_table = LookupTable(lookup_table_path, model_fingerprint(self))
+                self._catalog = self._catalog._replace(lookup_table=lookup_table)
+                print(f"📇 Tabela de lookup: {len(lookup_table):,} entradas")
+            
+            # Atualizações do catálogo já publicadas por outros processos
+            self.sync_catalog()
             
             print("✅ DogMatch Predictor (Sistema Híbrido Otimizado) inicializado com sucesso!")
             print(f"📊 Modelo: {type(self.model).__name__}")
             print(f"🔍 Similaridade: {type(self.similarity_model).__name__}")
             print(f"🏷️ Features: {len(self.feature_columns)}")
             print(f"🐕 Raças: {len(self.breed_names)}")
+            if self.bundle is not None:
+                print(f"📦 Bundle: {bundle_path} (versão {self.bundle.version})")
+            if self._catalog.segment is not None:
+                print(f"🧩 Catálogo compartilhado: {self._catalog.segment.path}")
             
         except FileNotFoundError as e:
             raise FileNotFoundError(f"Arquivo não encontrado: {e}. Certifique-se de que todos os arquivos .pkl estão no diretório correto.")
         except Exception as e:
             raise Exception(f"Erro ao inicializar o preditor: {e}")
     
-    def predict(self, user_input: Dict[str, Any], top_k: int = 5) -> Dict[str, Any]:
+    # Atributos do catálogo (somente leitura; use update_catalog() para alterá-los)
+    @property
+    def X_enhanced(self) -> 'pd.DataFrame':
+        """Catálogo pré-processado como DataFrame (montado sob demanda; importa pandas)."""
+        import pandas as pd
+        return pd.DataFrame(self._catalog.data, columns=self.enhanced_columns)
+    
+    @property
+    def y_processed(self) -> 'pd.Series':
+        """Labels do catálogo como Series (montada sob demanda; importa pandas)."""
+        import pandas as pd
+        return pd.Series(self._catalog.breed_labels, name=self._labels_name)
+    
+    @property
+    def breed_names(self) -> List[str]:
+        return self._catalog.breed_names
+    
+    @property
+    def model(self) -> Any:
+        return self._catalog.model
+    
+    @property
+    def similarity_model(self) -> Any:
+        return self._catalog.similarity_model
+    
+    @property
+    def similarity_index(self) -> Any:
+        return self._catalog.similarity_index
+    
+    @property
+    def lookup_table(self) -> Optional[LookupTable]:
+        return self._catalog.lookup_table
+    
+    @property
+    def catalog_version(self) -> int:
+        return self._catalog.version
+    
+    @property
+    def _breed_labels(self) -> np.ndarray:
+        return self._catalog.breed_labels
+    
+    @property
+    def _model_nd(self) -> Any:
+        return self._catalog.model_nd
+    
+    @property
+    def _similarity_nd(self) -> Any:
+        return self._catalog.similarity_nd
+    
+    def _build_catalog(self, data: np.ndarray, breed_labels: np.ndarray, model: Any, similarity_model: Any,
+                       attributes: Dict[str, np.ndarray], version: int,
+                       breed_names: Optional[List[str]] = None) -> CatalogSnapshot:
+        """
+        Monta o snapshot do catálogo: modelos sem feature names, índice top-k,
+        vizinhos por raça e índices de atributos (filtros).
+        
+        Args:
+            data: Matriz pré-processada do catálogo (colunas em enhanced_columns)
+            breed_labels: Nome da raça de cada linha (array para lookup rápido por índice)
+            attributes: Valores brutos das colunas numéricas do questionário, por linha
+        """
+        # Índice top-k sobre o catálogo (substitui o kneighbors por requisição)
+        try:
+            similarity_index = build_similarity_index(
+                similarity_model, data, backend=self.similarity_backend, **self.similarity_options
+            )
+        except ValueError as e:
+            print(f"⚠️ Aviso: Índice de similaridade indisponível, usando kneighbors do sklearn: {e}")
+            similarity_index = None
+        similarity_nd = self._without_feature_names(similarity_model)
+        
+        # Vizinhos de cada raça do catálogo (uma consulta em lote, sem a própria raça)
+        n_breeds = len(breed_labels)
+        n_neighbors = min(BREED_NEIGHBORS_K + 1, n_breeds)
+        if similarity_index is not None:
+            distances, indices = similarity_index.query(data, n_neighbors)
+        else:
+            distances, indices = similarity_nd.kneighbors(data, n_neighbors=n_neighbors)
+        keep = indices != np.arange(n_breeds)[:, np.newaxis]
+        keep[keep.all(axis=1), -1] = False
+        row_classes = self._shared_row_classes(model, data, breed_labels, similarity_index)
+        
+        return CatalogSnapshot(
+            version=version,
+            data=data,
+            breed_labels=breed_labels,
+            breed_names=list(breed_names) if breed_names is not None else [str(label) for label in breed_labels],
+            model=model,
+            similarity_model=similarity_model,
+            model_nd=self._without_feature_names(model),
+            similarity_nd=similarity_nd,
+            similarity_index=similarity_index,
+            row_classes=row_classes,
+            label_classes=row_classes if row_classes is not None else self._label_classes(model, breed_labels),
+            lookup_table=None,
+            breed_positions={str(label).casefold(): position for position, label in enumerate(breed_labels)},
+            neighbor_indices=indices[keep].reshape(n_breeds, n_neighbors - 1).astype(np.int32),
+            neighbor_similarities=(1 - distances[keep].reshape(n_breeds, n_neighbors - 1)).astype(np.float32),
+            attribute_index=AttributeIndex(
+                {col: (data[:, self._enhanced_position[col]], self.fast_pipeline.encoder_classes[col])
+                 for col in self.categorical_columns},
+                attributes
+            )
+        )
+    
+    @staticmethod
+    def _same_metric(estimator: Any, similarity_index: SimilarityIndex) -> bool:
+        """Se o estimador KNN mede distâncias como o índice."""
+        if not isinstance(estimator.metric, str):
+            return False
+        p = (estimator.metric_params or {}).get('p', estimator.p)
+        metric = effective_metric(estimator.metric, p)
+        return metric == similarity_index.metric and (metric != 'minkowski' or p == similarity_index.p)
+    
+    @staticmethod
+    def _shared_row_classes(model: Any, data: np.ndarray, breed_labels: np.ndarray,
+                            similarity_index: Any) -> Optional[np.ndarray]:
+        """
+        Classe (código em model.classes_) de cada linha do catálogo, quando o
+        modelo principal pode reaproveitar a busca do índice de similaridade.
+        
+        Isso vale quando o KNN principal foi treinado sobre as mesmas linhas do
+        catálogo, com a mesma métrica do índice exato e pesos 'uniform'/'distance';
+        caso contrário retorna None e o modelo principal faz a própria busca.
+        """
+        if type(similarity_index) is not SimilarityIndex or similarity_index.dtype != np.float64:
+            return None
+        fit_X = getattr(model, '_fit_X', None)
+        labels = getattr(model, '_y', None)
+        if fit_X is None or labels is None or np.ndim(labels) != 1:
+            return None
+        if getattr(model, 'weights', None) not in (None, 'uniform', 'distance') or model.n_neighbors > len(data):
+            return None
+        
+        if not DogMatchPredictor._same_metric(model, similarity_index):
+            return None
+        
+        row_classes = np.asarray(labels, dtype=np.intp)
+        if not np.array_equal(np.asarray(fit_X), data) or not np.array_equal(model.classes_[row_classes], breed_labels):
+            return None
+        return row_classes
+    
+    @staticmethod
+    def _label_classes(model: Any, breed_labels: np.ndarray) -> np.ndarray:
+        """
+        Código em model.classes_ da raça de cada linha do catálogo (-1 quando o
+        modelo principal não conhece a raça), para restringir as probabilidades
+        às linhas filtradas sem comparar nomes a cada requisição.
+        """
+        classes = np.asarray(model.classes_)
+        codes = np.full(len(breed_labels), -1, dtype=np.intp)
+        if len(classes) == 0:
+            return codes
+        order = np.argsort(classes, kind='stable')
+        positions = np.minimum(np.searchsorted(classes[order], breed_labels), len(classes) - 1)
+        found = classes[order[positions]] == breed_labels
+        codes[found] = order[positions[found]]
+        return codes
+    
+    def _new_catalog(self, data: np.ndarray, breed_labels: np.ndarray, model: Any, similarity_model: Any,
+                     attributes: Dict[str, np.ndarray], version: int,
+                     breed_names: Optional[List[str]] = None) -> CatalogSnapshot:
+        """
+        Snapshot do catálogo: montado no processo ou, com shared_catalog_dir, mapeado
+        de um segmento compartilhado (se o segmento não puder ser usado, montado no processo).
+        """
+        if self.shared_catalog_dir:
+            try:
+                return self._attach_catalog(data, breed_labels, model, similarity_model, attributes,
+                                            version, breed_names)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Aviso: Catálogo compartilhado indisponível, usando cópia do processo: {e}")
+        return self._build_catalog(data, breed_labels, model, similarity_model, attributes, version, breed_names)
+    
+    def _attach_catalog(self, data: np.ndarray, breed_labels: np.ndarray, model: Any, similarity_model: Any,
+                        attributes: Dict[str, np.ndarray], version: int,
+                        breed_names: Optional[List[str]] = None) -> CatalogSnapshot:
+        """
+        Snapshot com os arrays do catálogo mapeados do segmento compartilhado.
+        
+        O primeiro processo a carregar o catálogo monta o snapshot normalmente e
+        grava o segmento; os demais (workers, recargas do modelo) só o mapeiam.
+        Matriz, índice, classes das linhas, vizinhos por raça e índices de
+        atributos passam a ser views
+        somente leitura do segmento, e os modelos KNN usam a mesma matriz como
+        dados de treino em vez de guardar cópias.
+        
+        Raises:
+            ValueError: Se o índice não for o exato ou o segmento for inválido
+            OSError: Se o diretório dos segmentos não puder ser usado
+        """
+        if self.similarity_backend != 'exact':
+            raise ValueError(f"catálogo compartilhado requer o índice 'exact' (atual: {self.similarity_backend})")
+        
+        key = catalog_key(data, breed_labels, model, similarity_model, attributes, neighbors=BREED_NEIGHBORS_K)
+        path = segment_path(self.shared_catalog_dir, key)
+        if not os.path.exists(path):
+            catalog = self._build_catalog(data, breed_labels, model, similarity_model, attributes,
+                                          version, breed_names)
+            if type(catalog.similarity_index) is not SimilarityIndex:
+                raise ValueError("índice de similaridade indisponível para a métrica do modelo")
+            arrays = {f'index/{name}': array for name, array in catalog.similarity_index.arrays().items()}
+            arrays['neighbor_indices'] = catalog.neighbor_indices
+            arrays['neighbor_similarities'] = catalog.neighbor_similarities
+            if catalog.row_classes is not None:
+                arrays['row_classes'] = catalog.row_classes
+            arrays.update({f'attributes/{name}': array for name, array in catalog.attribute_index.arrays().items()})
+            index = catalog.similarity_index
+            write_segment(path, key, arrays, {'metric': index.metric, 'p': index.p})
+        
+        segment = CatalogSegment(path, expected_key=key)
+        arrays = segment.arrays
+        similarity_index = SimilarityIndex.from_arrays(
+            {name[len('index/'):]: array for name, array in arrays.items() if name.startswith('index/')},
+            metric=segment.header['metric'], p=segment.header['p']
+        )
+        model = self._share_fit_data(model, similarity_index)
+        similarity_model = self._share_fit_data(similarity_model, similarity_index)
+        row_classes = arrays.get('row_classes')
+        
+        return CatalogSnapshot(
+            version=version,
+            data=similarity_index.data,
+            breed_labels=breed_labels,
+            breed_names=list(breed_names) if breed_names is not None else [str(label) for label in breed_labels],
+            model=model,
+            similarity_model=similarity_model,
+            model_nd=self._without_feature_names(model),
+            similarity_nd=self._without_feature_names(similarity_model),
+            similarity_index=similarity_index,
+            row_classes=row_classes,
+            label_classes=row_classes if row_classes is not None else self._label_classes(model, breed_labels),
+            lookup_table=None,
+            breed_positions={str(label).casefold(): position for position, label in enumerate(breed_labels)},
+            neighbor_indices=arrays['neighbor_indices'],
+            neighbor_similarities=arrays['neighbor_similarities'],
+            attribute_index=AttributeIndex.from_arrays(
+                {name[len('attributes/'):]: array for name, array in arrays.items() if name.startswith('attributes/')},
+                {col: self.fast_pipeline.encoder_classes[col] for col in self.categorical_columns}
+            ),
+            segment=segment
+        )
+    
+    @classmethod
+    def _share_fit_data(cls, estimator: Any, similarity_index: SimilarityIndex) -> Any:
+        """
+        Cópia rasa do estimador KNN com a matriz do índice como dados de treino
+        (quando são os mesmos dados); os do numpy_models também usam o índice.
+        """
+        fit_X = getattr(estimator, '_fit_X', None)
+        if fit_X is None or not np.array_equal(fit_X, similarity_index.data):
+            return estimator
+        estimator = copy.copy(estimator)
+        if isinstance(estimator, (numpy_models.KNeighborsClassifier, numpy_models.NearestNeighbors)) \
+                and cls._same_metric(estimator, similarity_index):
+            estimator.use_index(similarity_index)
+        else:
+            estimator._fit_X = similarity_index.data
+        return estimator
+    
+    def update_catalog(self, upserts: Optional[List[Dict[str, Any]]] = None,
+                       removals: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Insere, atualiza ou remove raças do catálogo sem retreinar nem reiniciar.
+        
+        Cada linha de upserts tem o campo 'Name' e os campos do questionário
+        (feature_columns) e passa pelo mesmo encoding, features derivadas e
+        scaling das entradas dos usuários. Os estimadores KNN são reajustados
+        sobre o novo catálogo (o "treino" do KNN é apenas guardar os dados) e o
+        índice de similaridade é reconstruído fora do caminho das requisições;
+        o novo snapshot substitui o anterior em uma única atribuição, então
+        requisições em andamento terminam com a versão com que começaram.
+        
+        Com shared_catalog_dir, a atualização também é publicada no journal do
+        catálogo (shared_catalog.py): os outros processos a aplicam em
+        sync_catalog() e mapeiam o segmento gravado aqui, então todos os
+        workers servem a mesma versão do catálogo.
+        
+        A tabela de lookup, gerada para o catálogo anterior, é desativada.
+        
+        Args:
+            upserts: Raças a inserir (nome novo) ou atualizar (nome existente)
+            removals: Nomes das raças a remover
+        
+        Returns:
+            Resumo com inseridas, atualizadas, removidas, total de raças e versão do catálogo
+        
+        Raises:
+            ValueError: Se alguma linha for inválida, uma raça a remover não existir
+                ou o catálogo ficar menor que o n_neighbors do modelo principal
+        """
+        upserts = list(upserts or [])
+        removals = list(removals or [])
+        if not upserts and not removals:
+            raise ValueError("Nenhuma alteração informada (upserts/removals vazios)")
+        
+        # Validar e pré-processar as novas linhas antes de bloquear o catálogo
+        names, rows, raw_values = self._prepare_changes(upserts, removals)
+        
+        journal = self.catalog_journal
+        with journal.lock() if journal is not None else contextlib.nullcontext():
+            with self._catalog_lock:
+                # Atualizações de outros processos entram antes desta (mesma ordem em todos)
+                try:
+                    synced = self._sync_catalog_locked() if journal is not None else None
+                except Exception as e:
+                    raise Exception(f"Erro ao aplicar as atualizações publicadas do catálogo: {e}")
+                current = self._catalog
+                data, labels, attributes, inserted, updated = self._apply_changes(
+                    current.data, list(current.breed_labels),
+                    {col: current.attribute_index.values(col) for col in raw_values},
+                    names, rows, raw_values, removals
+                )
+                catalog = self._changed_catalog(current, data, labels, attributes, current.version + 1)
+                
+                if journal is not None:
+                    try:
+                        journal.append({'version': catalog.version, 'upsert': upserts, 'remove': removals})
+                    except OSError as e:
+                        raise Exception(f"Erro ao publicar a atualização do catálogo: {e}")
+                
+                # Troca atômica: novas requisições passam a usar o novo snapshot
+                self._catalog = catalog
+        
+        if synced is not None:
+            self._release_catalog(synced, current)
+        self._release_catalog(current, catalog)
+        
+        summary = {
+            'inserted': inserted,
+            'updated': updated,
+            'removed': len(removals),
+            'n_breeds': len(labels),
+            'catalog_version': catalog.version
+        }
+        print(f"🗂️ Catálogo atualizado para a versão {catalog.version}: {summary}")
+        return summary
+    
+    def sync_catalog(self) -> bool:
+        """
+        Aplica as atualizações do catálogo publicadas por outros processos e
+        ainda não vistas aqui (chamado a cada requisição pelo ModelRegistry; sem
+        atualizações pendentes, custa um stat do journal).
+        
+        Uma falha mantém o catálogo atual e é tentada de novo na próxima chamada.
+        
+        Returns:
+            Se o catálogo mudou
+        """
+        journal = self.catalog_journal
+        if journal is None or not journal.has_pending():
+            return False
+        try:
+            with self._catalog_lock:
+                previous = self._sync_catalog_locked()
+        except Exception as e:
+            print(f"⚠️ Aviso: Atualizações do catálogo não aplicadas, mantendo a versão {self.catalog_version}: {e}")
+            return False
+        if previous is None:
+            return False
+        self._release_catalog(previous, self._catalog)
+        return True
+    
+    def _sync_catalog_locked(self) -> Optional[CatalogSnapshot]:
+        """
+        Aplica as atualizações pendentes do journal (com _catalog_lock adquirido)
+        em um único snapshot novo.
+        
+        Returns:
+            Snapshot substituído, ou None se não havia atualizações
+        
+        Raises:
+            ValueError: Se o journal estiver fora de ordem ou tiver uma atualização inválida
+        """
+        entries, offset = self.catalog_journal.pending()
+        if not entries:
+            return None
+        
+        current = self._catalog
+        data, labels = current.data, list(current.breed_labels)
+        attributes = {col: current.attribute_index.values(col)
+                      for col in self.fast_pipeline.input_numeric_columns}
+        version = current.version
+        for entry in entries:
+            if entry.get('version') != version + 1:
+                raise ValueError(f"journal do catálogo fora de ordem: versão {entry.get('version')} "
+                                 f"depois da {version}")
+            names, rows, raw_values = self._prepare_changes(entry['upsert'], entry['remove'])
+            data, labels, attributes, _, _ = self._apply_changes(
+                data, labels, attributes, names, rows, raw_values, entry['remove']
+            )
+            version += 1
+        
+        self._catalog = self._changed_catalog(current, data, labels, attributes, version)
+        self.catalog_journal.advance(offset)
+        print(f"🗂️ Catálogo sincronizado para a versão {version} "
+              f"({len(entries)} atualização(ões) publicada(s) por outro processo)")
+        return current
+    
+    def _prepare_changes(self, upserts: List[Dict[str, Any]],
+                         removals: List[str]) -> Tuple[List[str], np.ndarray, Dict[str, List[float]]]:
+        """
+        Valida as linhas de upserts e as pré-processa.
+        
+        Returns:
+            (nomes, matriz pré-processada, valores brutos das colunas numéricas)
+        
+        Raises:
+            ValueError: Se alguma linha for inválida ou houver nomes repetidos/conflitantes
+        """
+        names = []
+        for position, row in enumerate(upserts):
+            if not isinstance(row, dict):
+                raise ValueError(f"Linha {position}: deve ser um objeto JSON")
+            name = row.get('Name')
+            if not isinstance(name, str) or not name.strip():
+                raise ValueError(f"Linha {position}: campo 'Name' é obrigatório")
+            try:
+                self._validate_input(row)
+            except ValueError as e:
+                raise ValueError(f"Linha {position} ({name}): {e}")
+            names.append(name.strip())
+        
+        if len(set(names)) != len(names):
+            raise ValueError("Raças repetidas em upserts")
+        if set(names) & set(removals):
+            raise ValueError(f"Raças não podem ser alteradas e removidas ao mesmo tempo: {sorted(set(names) & set(removals))}")
+        
+        rows = self.fast_pipeline.transform_many(upserts) if upserts else np.empty((0, len(self.enhanced_columns)))
+        invalid = [name for name, is_finite in zip(names, np.isfinite(rows).all(axis=1)) if not is_finite]
+        if invalid:
+            raise ValueError(f"Raças geram features inválidas (NaN) após o pré-processamento: {invalid}")
+        
+        # Valores brutos das colunas numéricas (índices de atributos dos filtros)
+        raw_values = {col: [float(row[col]) for row in upserts] for col in self.fast_pipeline.input_numeric_columns}
+        return names, rows, raw_values
+    
+    def _apply_changes(self, data: np.ndarray, labels: List[str], attributes: Dict[str, np.ndarray],
+                       names: List[str], rows: np.ndarray, raw_values: Dict[str, List[float]],
+                       removals: List[str]) -> Tuple[np.ndarray, List[str], Dict[str, np.ndarray], int, int]:
+        """
+        Novas linhas do catálogo depois de upserts (já pré-processados) e remoções.
+        
+        Returns:
+            (matriz, labels, valores brutos das colunas numéricas, inseridas, atualizadas)
+        
+        Raises:
+            ValueError: Se uma raça a remover não existir ou o catálogo ficar
+                menor que o n_neighbors do modelo principal
+        """
+        data = data.copy()
+        labels = list(labels)
+        attributes = {col: list(values) for col, values in attributes.items()}
+        positions = {label: i for i, label in enumerate(labels)}
+        
+        missing = [name for name in removals if name not in positions]
+        if missing:
+            raise ValueError(f"Raças não encontradas no catálogo: {missing}")
+        
+        # Atualizar linhas existentes e acrescentar as novas no fim
+        new_rows, updated = [], 0
+        for position, (name, row) in enumerate(zip(names, rows)):
+            if name in positions:
+                data[positions[name]] = row
+                for col, values in attributes.items():
+                    values[positions[name]] = raw_values[col][position]
+                updated += 1
+            else:
+                new_rows.append(row)
+                labels.append(name)
+                for col, values in attributes.items():
+                    values.append(raw_values[col][position])
+        if new_rows:
+            data = np.vstack([data, new_rows])
+        attributes = {col: np.asarray(values, dtype=np.float64) for col, values in attributes.items()}
+        
+        if removals:
+            keep = np.ones(len(labels), dtype=bool)
+            keep[[positions[name] for name in removals]] = False
+            data = data[keep]
+            attributes = {col: values[keep] for col, values in attributes.items()}
+            labels = [label for label, kept in zip(labels, keep) if kept]
+        
+        min_rows = getattr(self._catalog.model, 'n_neighbors', 1)
+        if len(labels) < min_rows:
+            raise ValueError(f"Catálogo ficaria com {len(labels)} raças (mínimo: {min_rows})")
+        return data, labels, attributes, len(new_rows), updated
+    
+    def _changed_catalog(self, current: CatalogSnapshot, data: np.ndarray, labels: List[str],
+                         attributes: Dict[str, np.ndarray], version: int) -> CatalogSnapshot:
+        """Snapshot do catálogo alterado, com os modelos KNN reajustados sobre as novas linhas."""
+        breed_labels = np.asarray(labels, dtype=object)
+        try:
+            model = self._refit(current.model, data, breed_labels)
+            similarity_model = self._refit(current.similarity_model, data)
+            return self._new_catalog(data, breed_labels, model, similarity_model, attributes, version=version)
+        except Exception as e:
+            raise Exception(f"Erro ao atualizar o catálogo: {e}")
+    
+    @staticmethod
+    def _release_catalog(previous: CatalogSnapshot, catalog: CatalogSnapshot) -> None:
+        """Libera o que o snapshot substituído usava só para si (segmento, tabela de lookup)."""
+        # Segmento do snapshot anterior, se este processo o gravou e não o usa em
+        # outro snapshot (processos que já o mapearam continuam com as páginas)
+        if previous.segment is not None and (catalog.segment is None or catalog.segment.path != previous.segment.path):
+            release_segment(previous.segment)
+        
+        if previous.lookup_table is not None:
+            print("⚠️ Aviso: Tabela de lookup desativada (gerada para a versão anterior do catálogo)")
+    
+    def _refit(self, estimator: Any, data: np.ndarray, labels: Optional[np.ndarray] = None) -> Any:
+        """
+        Cópia não treinada do estimador ajustada ao novo catálogo.
+        
+        Estimadores do numpy_models são recriados com os mesmos parâmetros; os do
+        sklearn (carregados dos .pkl) passam por clone() e são ajustados com
+        DataFrame, como no treino original.
+        """
+        if isinstance(estimator, (numpy_models.KNeighborsClassifier, numpy_models.NearestNeighbors)):
+            refit = type(estimator)(**estimator.get_params())
+            refit.fit(data, labels)
+            if hasattr(estimator, 'feature_names_in_'):
+                refit.feature_names_in_ = estimator.feature_names_in_
+            return refit
+        
+        import pandas as pd
+        from sklearn.base import clone
+        X = pd.DataFrame(data, columns=self.enhanced_columns)
+        if labels is None:
+            return clone(estimator).fit(X)
+        return clone(estimator).fit(X, pd.Series(labels, name=self._labels_name))
+    
+    def _load_pickles(self, models_dir: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray, Any, Any, Dict[str, np.ndarray]]:
+        """
+        Carrega modelos e preprocessadores dos arquivos .pkl (importa joblib, pandas e sklearn).
+        
+        Returns:
+            (matriz do catálogo, labels do catálogo, modelo principal, modelo de
+            similaridade, atributos brutos das raças)
+        """
+        import joblib
+        
+        if models_dir is None:
+            # Obter caminho absoluto do diretório atual
+            current_dir = os.path.dirname(os.path.abspath(__file__))
+            models_dir = os.path.join(current_dir, 'models')
+        
+        # Carregar modelos híbridos otimizados (dataset filtrado)
+        model = joblib.load(os.path.join(models_dir, 'dogmatch_optimized_model.pkl'))
+        similarity_model = joblib.load(os.path.join(models_dir, 'dogmatch_similarity_model.pkl'))
+        self.robust_scaler = joblib.load(os.path.join(models_dir, 'robust_scaler.pkl'))
+        self.label_encoders = joblib.load(os.path.join(models_dir, 'label_encoders.pkl'))
+        self.feature_info = joblib.load(os.path.join(models_dir, 'feature_info_optimized.pkl'))
+        
+        # Carregar dados processados para similaridade (dataset filtrado)
+        X_enhanced = joblib.load(os.path.join(models_dir, 'X_enhanced.pkl'))
+        y_processed = joblib.load(os.path.join(models_dir, 'y_processed.pkl'))
+        
+        self.enhanced_columns = list(self.feature_info.get('enhanced_features', X_enhanced.columns))
+        self._labels_name = y_processed.name
+        data = X_enhanced[self.enhanced_columns].to_numpy(dtype=np.float64)
+        breed_labels = y_processed.to_numpy()
+        attributes = self._read_breed_attributes(os.path.join(models_dir, BREED_ATTRIBUTES_FILE), breed_labels)
+        
+        return data, breed_labels, model, similarity_model, attributes
+    
+    def _read_breed_attributes(self, path: str, breed_labels: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Valores brutos das colunas numéricas do questionário para cada linha do catálogo.
+        
+        Raças ausentes do arquivo (ou o arquivo inteiro) ficam com NaN: continuam
+        sendo recomendadas, mas não passam em filtros sobre essas colunas.
+        """
+        import csv
+        
+        columns = [col for col in self.feature_info['feature_columns']
+                   if col not in self.feature_info['categorical_columns']]
+        attributes = {col: np.full(len(breed_labels), np.nan) for col in columns}
+        if not os.path.exists(path):
+            print(f"⚠️ Aviso: {path} não encontrado; filtros numéricos não terão resultados")
+            return attributes
+        
+        positions = {str(label): position for position, label in enumerate(breed_labels)}
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                position = positions.get(row.get('Name'))
+                if position is None:
+                    continue
+                for col in columns:
+                    try:
+                        attributes[col][position] = float(row[col])
+                    except (KeyError, TypeError, ValueError):
+                        pass
+        return attributes
+    
+    def _load_bundle(self, bundle_path: str) -> Tuple[np.ndarray, np.ndarray, Any, Any, Dict[str, np.ndarray]]:
+        """
+        Carrega modelos e preprocessadores de um bundle único (model_bundle.py).
+        
+        Os arrays ficam mapeados em memória; os estimadores KNN, o scaler e os
+        encoders são reconstruídos com as classes NumPy de numpy_models (o
+        "treino" do KNN é apenas guardar os dados), sem importar sklearn nem pandas.
+        
+        Returns:
+            (matriz do catálogo, labels do catálogo, modelo principal, modelo de
+            similaridade, atributos brutos das raças)
+        """
+        from model_bundle import load_bundle
+        
+        self.bundle = load_bundle(bundle_path)
+        header, arrays = self.bundle.header, self.bundle.arrays
+        columns = np.asarray(header['enhanced_columns'], dtype=object)
+        
+        self.feature_info = header['feature_info']
+        self.enhanced_columns = list(header['enhanced_columns'])
+        self._labels_name = header['labels_name']
+        
+        model_labels = arrays.get('model_labels', arrays['catalog_labels']).astype(object)
+        model = numpy_models.KNeighborsClassifier(**header['model']['params'])
+        model.fit(arrays.get('model_fit_X', arrays['catalog']), model_labels)
+        model.feature_names_in_ = columns
+        
+        similarity_model = numpy_models.NearestNeighbors(**header['similarity_model']['params'])
+        similarity_model.fit(arrays.get('similarity_model_fit_X', arrays['catalog']))
+        similarity_model.feature_names_in_ = columns
+        
+        scaler_columns = header['scaler']['feature_names']
+        self.robust_scaler = numpy_models.RobustScaler(**header['scaler']['params'])
+        self.robust_scaler.center_ = arrays['scaler_center']
+        self.robust_scaler.scale_ = arrays['scaler_scale']
+        self.robust_scaler.feature_names_in_ = np.asarray(scaler_columns, dtype=object)
+        self.robust_scaler.n_features_in_ = len(scaler_columns)
+        
+        self.label_encoders = {
+            col: numpy_models.LabelEncoder(classes)
+            for col, classes in self.bundle.encoder_classes().items()
+        }
+        
+        # Atributos brutos (bundles gerados antes dos filtros não têm: NaN)
+        n_breeds = len(arrays['catalog'])
+        attributes = {
+            col: arrays.get(f'attribute/{col}', np.full(n_breeds, np.nan))
+            for col in self.feature_info['feature_columns'] if col not in self.feature_info['categorical_columns']
+        }
+        
+        return arrays['catalog'], arrays['catalog_labels'].astype(object), model, similarity_model, attributes
+    
+    def predict(self, user_input: Dict[str, Any], top_k: int = 5,
+                filters: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         Prediz raças de cães baseado nas preferências do usuário.
         Sistema híbrido que combina predição principal + similaridade.
@@ -69,6 +871,8 @@ class DogMatchPredictor:
         Args:
             user_input: Dicionário com as preferências do usuário
             top_k: Número de raças similares a retornar (padrão: 5)
+            filters: Restrições rígidas sobre as raças (formato em attribute_index.py),
+                aplicadas antes do ranking; a resposta ganha a chave 'explanation'
         
         Returns:
             Dicionário com predições, raças similares e perfil do usuário
@@ -92,55 +896,340 @@ class DogMatchPredictor:
             results = predictor.predict(user_preferences)
         """
         try:
+            timer = stage_timer(self.metrics, 'single')
+            catalog = self._catalog
+            
             # Validar entrada
             self._validate_input(user_input)
+            if timer: timer.mark('validate')
             
-            # Criar DataFrame com a entrada do usuário
-            user_df = pd.DataFrame([user_input])
+            if filters is not None:
+                return self._predict_filtered(user_input, top_k, filters, timer, catalog)
             
-            # Aplicar label encoding para variáveis categóricas
-            for col in self.categorical_columns:
-                if col in user_df.columns:
-                    if user_input[col] not in self.label_encoders[col].classes_:
-                        raise ValueError(f"Valor inválido para '{col}': {user_input[col]}. "
-                                       f"Valores aceitos: {list(self.label_encoders[col].classes_)}")
-                    user_df[col] = self.label_encoders[col].transform(user_df[col])
+            # Resposta pré-calculada (O(1)) quando a entrada está na grade da tabela
+            if catalog.lookup_table is not None:
+                results = catalog.lookup_table.lookup(user_input, top_k)
+                if timer: timer.mark('lookup')
+                if results is not None:
+                    results['user_profile'] = self._calculate_user_profile(self.fast_pipeline.transform_one(user_input))
+                    if timer: timer.mark('profile')
+                    return results
             
-            # Criar features derivadas (feature engineering)
-            user_df = self._create_derived_features(user_df)
+            return self._predict_live(user_input, top_k, timer, catalog)
             
-            # Aplicar robust scaling para variáveis numéricas
-            user_df[self.numeric_columns] = self.robust_scaler.transform(user_df[self.numeric_columns])
+        except ValueError:
+            # Entrada inválida (campos, valores ou features NaN): o chamador responde 400
+            raise
+        except Exception as e:
+            raise Exception(f"Erro ao fazer predição: {e}")
+    
+    def warmup(self) -> None:
+        """
+        Executa inferências de aquecimento (modelo principal, índice de similaridade e lote).
+        
+        Chamado na inicialização para que a primeira requisição real não pague
+        custos de primeira execução (imports tardios do sklearn, buffers, caches).
+        """
+        self._predict_live(dict(EXAMPLE_INPUT), top_k=5)
+        self.predict_batch([dict(EXAMPLE_INPUT)], top_k=5)
+    
+    def _predict_live(self, user_input: Dict[str, Any], top_k: int, timer: Optional[Any] = None,
+                      catalog: Optional[CatalogSnapshot] = None) -> Dict[str, Any]:
+        """
+        Inferência completa (sem tabela de lookup) de uma entrada já validada.
+        
+        Args:
+            timer: StageTimer (metrics.py) que registra a duração de cada etapa, ou None
+            catalog: Snapshot do catálogo (padrão: o atual)
+        """
+        if catalog is None:
+            catalog = self._catalog
+        if self.fast_path:
+            return self._predict_fast(user_input, top_k, timer, catalog)
+        
+        import pandas as pd
+        
+        # Criar DataFrame com a entrada do usuário
+        user_df = pd.DataFrame([user_input])
+        
+        # Encoding, features derivadas e scaling
+        user_df = self._preprocess(user_df, timer)
+        
+        # Predição principal e raças similares a partir da mesma busca de vizinhos
+        probabilities, distances, indices = self._infer_matrix(user_df, top_k, timer, catalog)
+        
+        # Calcular perfil do usuário
+        user_profile = self._calculate_user_profile(user_df)
+        if timer: timer.mark('profile')
+        
+        # Preparar resultados
+        results = {
+            'predictions': self._format_predictions(probabilities[0], top_k, catalog),
+            'similar_breeds': self._format_similar_breeds(distances[0], indices[0], top_k, catalog),
+            'user_profile': user_profile
+        }
+        
+        return results
+    
+    def _predict_fast(self, user_input: Dict[str, Any], top_k: int, timer: Optional[Any] = None,
+                      catalog: Optional[CatalogSnapshot] = None) -> Dict[str, Any]:
+        """
+        Caminho NumPy de predict(): sem DataFrame, encoders via dict e scaler pré-calculado.
+        """
+        if catalog is None:
+            catalog = self._catalog
+        user_row = self.fast_pipeline.transform_one(user_input, timer)
+        
+        # Predição principal e raças similares a partir da mesma busca de vizinhos
+        probabilities, distances, indices = self._infer_matrix(user_row, top_k, timer, catalog)
+        
+        user_profile = self._calculate_user_profile(user_row)
+        if timer: timer.mark('profile')
+        
+        return {
+            'predictions': self._format_predictions(probabilities[0], top_k, catalog),
+            'similar_breeds': self._format_similar_breeds(distances[0], indices[0], top_k, catalog),
+            'user_profile': user_profile
+        }
+    
+    def _predict_filtered(self, user_input: Dict[str, Any], top_k: int, filters: Dict[str, Any],
+                          timer: Optional[Any] = None, catalog: Optional[CatalogSnapshot] = None) -> Dict[str, Any]:
+        """
+        predict() restrito às raças que atendem os filtros.
+        
+        Os filtros são resolvidos nos índices de atributos do catálogo (bitmaps
+        e índices ordenados) antes de qualquer busca; a predição principal e as
+        raças similares consideram só as linhas que sobraram. Sem nenhuma raça
+        candidata, as listas voltam vazias e a explicação mostra qual filtro
+        eliminou as raças.
+        
+        Raises:
+            ValueError: Se os filtros forem inválidos
+        """
+        if catalog is None:
+            catalog = self._catalog
+        attribute_index = catalog.attribute_index
+        rows, applied = attribute_index.candidates(filters)
+        if timer: timer.mark('filter')
+        
+        if self.fast_path:
+            features = self.fast_pipeline.transform_one(user_input, timer)
+        else:
+            import pandas as pd
+            features = self._preprocess(pd.DataFrame([user_input]), timer)
+        
+        predictions, similar_breeds = [], []
+        if len(rows):
+            probabilities, distances, indices = self._infer_matrix(features, top_k, timer, catalog, rows)
+            predictions = self._format_predictions(probabilities[0], top_k, catalog)
+            similar_breeds = self._format_similar_breeds(distances[0], indices[0], top_k, catalog)
+        
+        # Valores de cada raça nos campos filtrados
+        columns = [entry['field'] for entry in applied]
+        for entry in predictions + similar_breeds if columns else []:
+            position = catalog.breed_positions.get(str(entry['breed']).casefold())
+            if position is not None:
+                entry['attributes'] = attribute_index.describe(position, columns)
+        
+        user_profile = self._calculate_user_profile(features)
+        if timer: timer.mark('profile')
+        
+        return {
+            'predictions': predictions,
+            'similar_breeds': similar_breeds,
+            'user_profile': user_profile,
+            'explanation': {
+                'catalog_size': attribute_index.n_rows,
+                'candidates': len(rows),
+                'filters': applied
+            }
+        }
+    
+    def predict_batch(self, user_inputs: List[Dict[str, Any]], top_k: int = 5,
+                      return_exceptions: bool = False) -> List[Any]:
+        """
+        Prediz raças para vários usuários de uma vez.
+        
+        Encoding, feature engineering, scaling, predição principal e busca por
+        similaridade são executados uma única vez sobre a matriz com todas as
+        entradas válidas. Entradas inválidas não abortam o lote: cada uma recebe
+        um dicionário {'error': ...} na sua posição.
+        
+        Args:
+            user_inputs: Lista de dicionários com as preferências dos usuários
+            top_k: Número de raças similares a retornar por usuário (padrão: 5)
+            return_exceptions: Devolver, no lugar de {'error': mensagem}, a exceção
+                que predict() levantaria para a entrada (MissingFieldsError e
+                ValueError de validação sem alteração, falhas internas como
+                Exception("Erro ao fazer predição: ...")); usado pelo coalescer
+        
+        Returns:
+            Lista (na mesma ordem da entrada) com o resultado de cada usuário,
+            no mesmo formato de predict(), ou {'error': mensagem} (ou a exceção)
+        """
+        results: List[Any] = [None] * len(user_inputs)
+        timer = stage_timer(self.metrics, 'batch')
+        catalog = self._catalog
+        
+        def failure(error: Exception) -> Any:
+            if not return_exceptions:
+                return {'error': f"Erro ao fazer predição: {error}"}
+            return error if isinstance(error, ValueError) else Exception(f"Erro ao fazer predição: {error}")
+        
+        # Validar cada entrada individualmente
+        valid_positions = []
+        for position, user_input in enumerate(user_inputs):
+            try:
+                self._validate_input(user_input)
+                valid_positions.append(position)
+            except Exception as e:
+                results[position] = failure(e)
+        if timer: timer.mark('validate')
+        
+        if not valid_positions:
+            return results
+        
+        try:
+            # Uma única matriz com todas as entradas válidas (ordem canônica das colunas)
+            valid_inputs = [user_inputs[position] for position in valid_positions]
+            if self.fast_path:
+                features = self.fast_pipeline.transform_many(valid_inputs, timer)
+                finite_mask = np.isfinite(features).all(axis=1)
+            else:
+                import pandas as pd
+                features = pd.DataFrame(valid_inputs, columns=self.feature_columns)
+                input_numeric_columns = [col for col in self.feature_columns if col not in self.categorical_columns]
+                features[input_numeric_columns] = features[input_numeric_columns].astype(float)
+                features = self._preprocess(features, timer)
+                finite_mask = np.isfinite(features.to_numpy(dtype=float)).all(axis=1)
             
-            # Fazer predição principal
-            prediction = self.model.predict(user_df)[0]
+            # Linhas com NaN/inf (ex.: categorias sem mapeamento nas features derivadas)
+            for position, is_finite in zip(valid_positions, finite_mask):
+                if not is_finite:
+                    results[position] = failure(
+                        ValueError("entrada gera features inválidas (NaN) após o pré-processamento")
+                    )
             
-            # Encontrar raças similares
-            similar_breeds = self._find_similar_breeds(user_df, top_k)
+            finite_features = features[finite_mask]
+            finite_positions = [position for position, is_finite in zip(valid_positions, finite_mask) if is_finite]
+            if not finite_positions:
+                return results
             
-            # Calcular perfil do usuário
-            user_profile = self._calculate_user_profile(user_df)
+            # Predição principal e similaridade em uma única passada
+            probabilities, distances, indices = self._infer_matrix(finite_features, top_k, timer, catalog)
             
-            # Preparar resultados
-            results = {
-                'predictions': [{'breed': prediction, 'score': 1.0}],
-                'similar_breeds': similar_breeds,
-                'user_profile': user_profile
-            }
+            user_profiles = self._calculate_user_profiles(finite_features)
             
-            return results
+            for row, position in enumerate(finite_positions):
+                results[position] = {
+                    'predictions': self._format_predictions(probabilities[row], top_k, catalog),
+                    'similar_breeds': self._format_similar_breeds(distances[row], indices[row], top_k, catalog),
+                    'user_profile': user_profiles[row]
+                }
+            if timer: timer.mark('profile')
             
         except Exception as e:
-            raise Exception(f"Erro ao fazer predição: {e}")
+            for position in valid_positions:
+                if results[position] is None:
+                    results[position] = failure(e)
+        
+        return results
+    
+    def _infer_matrix(self, features: Any, top_k: int, timer: Optional[Any] = None,
+                      catalog: Optional[CatalogSnapshot] = None, rows: Optional[np.ndarray] = None):
+        """
+        Predição principal e busca de similares sobre uma matriz já pré-processada.
+        
+        Quando o catálogo permite (row_classes), uma única consulta ao índice
+        traz max(top_k, n_neighbors) vizinhos: os n_neighbors primeiros votam nas
+        probabilidades do modelo principal (mesma regra do predict_proba do KNN)
+        e os top_k primeiros são as raças similares. Caso contrário, o modelo
+        principal e o índice fazem buscas separadas.
+        
+        Com rows (raças que passaram nos filtros), a busca considera só essas
+        linhas e o voto usa no máximo len(rows) vizinhos; sem row_classes, as
+        probabilidades do modelo principal ficam restritas às classes de rows
+        (renormalizadas).
+        
+        Args:
+            features: Matriz NumPy (caminho rápido) ou DataFrame (caminho pandas), sem NaN
+            top_k: Número de raças similares
+            timer: StageTimer para medir as etapas, ou None
+            catalog: Snapshot do catálogo (padrão: o atual)
+            rows: Linhas candidatas do catálogo (não vazias), ou None para o catálogo inteiro
+        
+        Returns:
+            (probabilidades, distâncias, índices) com uma linha por entrada; as
+            probabilidades seguem a ordem de model.classes_
+        """
+        if catalog is None:
+            catalog = self._catalog
+        if not isinstance(features, np.ndarray):
+            features = features[self.enhanced_columns].to_numpy(dtype=np.float64)
+        
+        model = catalog.model_nd
+        n_rows = len(catalog.breed_labels) if rows is None else len(rows)
+        if catalog.row_classes is not None:
+            n_similar = min(top_k, n_rows)
+            n_neighbors = min(model.n_neighbors, n_rows)
+            distances, indices = catalog.similarity_index.query(features, max(n_similar, n_neighbors), rows)
+            if timer: timer.mark('similarity')
+            probabilities = numpy_models.neighbor_probabilities(
+                catalog.row_classes[indices[:, :n_neighbors]],
+                numpy_models.neighbor_weights(distances[:, :n_neighbors], model.weights),
+                len(model.classes_)
+            )
+            if timer: timer.mark('predict')
+            return probabilities, distances[:, :n_similar], indices[:, :n_similar]
+        
+        if hasattr(model, 'predict_proba'):
+            probabilities = model.predict_proba(features)
+        else:
+            probabilities = (model.predict(features)[:, np.newaxis] == model.classes_).astype(np.float64)
+        if rows is not None:
+            codes = catalog.label_classes[rows]
+            allowed = np.zeros(len(model.classes_), dtype=bool)
+            allowed[codes[codes >= 0]] = True
+            probabilities = probabilities * allowed
+            totals = probabilities.sum(axis=1, keepdims=True)
+            probabilities = np.divide(probabilities, totals, out=np.zeros_like(probabilities), where=totals > 0)
+        if timer: timer.mark('predict')
+        distances, indices = self._kneighbors(features, top_k, catalog, rows)
+        if timer: timer.mark('similarity')
+        return probabilities, distances, indices
     
-    def _create_derived_features(self, user_df: pd.DataFrame) -> pd.DataFrame:
+    def _preprocess(self, user_df: 'pd.DataFrame', timer: Optional[Any] = None) -> 'pd.DataFrame':
+        """
+        Aplica label encoding, features derivadas e robust scaling.
+        """
+        # Aplicar label encoding para variáveis categóricas
+        for col in self.categorical_columns:
+            if col in user_df.columns:
+                invalid_values = set(user_df[col]) - set(self.label_encoders[col].classes_)
+                if invalid_values:
+                    raise ValueError(f"Valor inválido para '{col}': {invalid_values.pop()}. "
+                                   f"Valores aceitos: {list(self.label_encoders[col].classes_)}")
+                user_df[col] = self.label_encoders[col].transform(user_df[col])
+        if timer: timer.mark('encode')
+        
+        # Criar features derivadas (feature engineering)
+        user_df = self._create_derived_features(user_df)
+        if timer: timer.mark('derive')
+        
+        # Aplicar robust scaling para variáveis numéricas
+        user_df[self.numeric_columns] = self.robust_scaler.transform(user_df[self.numeric_columns])
+        if timer: timer.mark('scale')
+        
+        return user_df
+    
+    def _create_derived_features(self, user_df: 'pd.DataFrame') -> 'pd.DataFrame':
         """
         Cria features derivadas usando feature engineering avançado.
         """
         try:
             # Family_Compatibility_Score
             if 'Good with Children' in user_df.columns and 'Friendly Rating (1-10)' in user_df.columns and 'Training Difficulty (1-10)' in user_df.columns:
-                children_score = user_df['Good with Children'].map({0: 0, 1: 1, 2: 0.5})  # No=0, Yes=1, With Training=0.5
+                children_score = user_df['Good with Children'].map(CHILDREN_SCORE_MAP)
                 user_df['Family_Compatibility_Score'] = (
                     children_score * 0.4 + 
                     user_df['Friendly Rating (1-10)'] * 0.1 + 
@@ -149,8 +1238,8 @@ class DogMatchPredictor:
             
             # Maintenance_Score
             if 'Shedding Level' in user_df.columns and 'Exercise Requirements (hrs/day)' in user_df.columns and 'Health Issues Risk' in user_df.columns:
-                shedding_score = user_df['Shedding Level'].map({0: 0, 1: 0.5, 2: 1, 3: 1.5})  # Low=0, Moderate=0.5, High=1, Very High=1.5
-                health_score = user_df['Health Issues Risk'].map({0: 0, 1: 0.5, 2: 1})  # Low=0, Moderate=0.5, High=1
+                shedding_score = user_df['Shedding Level'].map(SHEDDING_SCORE_MAP)
+                health_score = user_df['Health Issues Risk'].map(HEALTH_SCORE_MAP)
                 user_df['Maintenance_Score'] = (
                     shedding_score * 0.3 + 
                     user_df['Exercise Requirements (hrs/day)'] * 0.2 + 
@@ -172,7 +1261,7 @@ class DogMatchPredictor:
             
             # Size_Score
             if 'Size' in user_df.columns:
-                user_df['Size_Score'] = user_df['Size'].map({0: 1, 1: 2, 2: 3, 3: 4})  # Small=1, Medium=2, Large=3, Giant=4
+                user_df['Size_Score'] = user_df['Size'].map(SIZE_SCORE_MAP)
             
             return user_df
             
@@ -180,86 +1269,199 @@ class DogMatchPredictor:
             print(f"⚠️ Aviso: Erro ao criar features derivadas: {e}")
             return user_df
     
-    def _find_similar_breeds(self, user_df: pd.DataFrame, top_k: int = 5) -> List[Dict[str, Any]]:
+    def _kneighbors(self, features: Any, top_k: int, catalog: Optional[CatalogSnapshot] = None,
+                    rows: Optional[np.ndarray] = None):
         """
-        Encontra raças similares usando o modelo de similaridade.
+        Busca os top_k vizinhos no catálogo (índice pré-calculado ou sklearn como fallback).
+        
+        Args:
+            features: Matriz NumPy ou DataFrame já pré-processados
+            top_k: Número de vizinhos
+            catalog: Snapshot do catálogo (padrão: o atual)
+            rows: Linhas candidatas (filtros), ou None para o catálogo inteiro
+        
+        Returns:
+            (distâncias, índices) no formato do kneighbors do sklearn
         """
-        try:
-            # Encontrar raças mais similares
-            distances, indices = self.similarity_model.kneighbors(user_df, n_neighbors=min(top_k, len(self.X_enhanced)))
-            
-            similar_breeds = []
-            for i, (dist, idx) in enumerate(zip(distances[0], indices[0])):
-                if i < top_k:
-                    breed_name = self.y_processed.iloc[idx]
-                    similarity = 1 - dist  # Converter distância em similaridade
-                    similar_breeds.append({
-                        'breed': breed_name,
-                        'similarity': round(similarity, 3),
-                        'rank': i + 1
-                    })
-            
-            return similar_breeds
-            
-        except Exception as e:
-            print(f"⚠️ Aviso: Erro ao encontrar raças similares: {e}")
-            return []
+        if catalog is None:
+            catalog = self._catalog
+        if not isinstance(features, np.ndarray):
+            features = features[self.enhanced_columns].to_numpy(dtype=np.float64)
+        
+        n_neighbors = min(top_k, len(catalog.breed_labels) if rows is None else len(rows))
+        if rows is not None and not isinstance(catalog.similarity_index, SimilarityIndex):
+            # IVF/sklearn: busca exata só sobre as linhas candidatas
+            try:
+                subset = SimilarityIndex.from_estimator(catalog.similarity_nd, catalog.data[rows])
+            except ValueError:
+                distances, indices = catalog.similarity_nd.kneighbors(features, n_neighbors=len(catalog.breed_labels))
+                keep = np.isin(indices, rows)
+                shape = (len(indices), len(rows))
+                return distances[keep].reshape(shape)[:, :n_neighbors], indices[keep].reshape(shape)[:, :n_neighbors]
+            distances, indices = subset.query(features, n_neighbors)
+            return distances, rows[indices]
+        if catalog.similarity_index is not None:
+            return catalog.similarity_index.query(features, n_neighbors, rows)
+        return catalog.similarity_nd.kneighbors(features, n_neighbors=n_neighbors)
     
-    def _calculate_user_profile(self, user_df: pd.DataFrame) -> Dict[str, float]:
+    def _format_predictions(self, probabilities: np.ndarray, top_k: int,
+                            catalog: Optional[CatalogSnapshot] = None) -> List[Dict[str, Any]]:
+        """
+        Converte uma linha de probabilidades do modelo principal no ranking de raças previstas.
+        
+        Só entram classes com probabilidade > 0 (com o KNN, no máximo n_neighbors);
+        empates ficam com a menor classe, então a primeira é a mesma do predict().
+        """
+        classes = (catalog or self._catalog).model.classes_
+        order = np.argsort(-probabilities, kind='stable')[:top_k]
+        order = order[probabilities[order] > 0]
+        scores = np.round(probabilities[order], 3).tolist()
+        
+        return [
+            {'breed': classes[idx], 'score': score, 'rank': i + 1}
+            for i, (idx, score) in enumerate(zip(order, scores))
+        ]
+    
+    def _format_similar_breeds(self, distances: np.ndarray, indices: np.ndarray, top_k: int,
+                               catalog: Optional[CatalogSnapshot] = None) -> List[Dict[str, Any]]:
+        """
+        Converte uma linha de (distâncias, índices) do kneighbors na lista de raças similares.
+        """
+        breed_labels = (catalog or self._catalog).breed_labels
+        
+        # Converter distância em similaridade (arredondamento vetorizado, mesmo resultado do round())
+        similarities = np.round(1 - np.asarray(distances[:top_k], dtype=np.float64), 3).tolist()
+        
+        return [
+            {'breed': breed_labels[idx], 'similarity': similarity, 'rank': i + 1}
+            for i, (idx, similarity) in enumerate(zip(indices[:top_k], similarities))
+        ]
+    
+    def _calculate_user_profile(self, user_df: Any) -> Dict[str, float]:
         """
         Calcula o perfil do usuário baseado nas características.
         """
+        profiles = self._calculate_user_profiles(user_df)
+        return profiles[0] if profiles else {}
+    
+    def _calculate_user_profiles(self, user_df: Any) -> List[Dict[str, float]]:
+        """
+        Calcula o perfil de cada linha (versão vetorizada para lotes).
+        
+        Aceita tanto o DataFrame do caminho pandas quanto a matriz do caminho NumPy.
+        """
         try:
-            profile = {}
-            
-            # Family Friendly Score
-            if 'Family_Compatibility_Score' in user_df.columns:
-                profile['family_friendly'] = round(user_df['Family_Compatibility_Score'].iloc[0], 2)
-            
-            # Energy Level
-            if 'Energy_Score' in user_df.columns:
-                profile['energy_level'] = round(user_df['Energy_Score'].iloc[0], 2)
-            
-            # Maintenance Level
-            if 'Maintenance_Score' in user_df.columns:
-                profile['maintenance_level'] = round(user_df['Maintenance_Score'].iloc[0], 2)
-            
-            # Intelligence Level
-            if 'Intelligence Rating (1-10)' in user_df.columns:
-                profile['intelligence_level'] = round(user_df['Intelligence Rating (1-10)'].iloc[0], 1)
-            
-            # Size Preference
-            if 'Size_Score' in user_df.columns:
-                profile['size_preference'] = round(user_df['Size_Score'].iloc[0], 1)
+            # Extrair e arredondar as colunas do perfil uma única vez
+            if isinstance(user_df, np.ndarray):
+                columns = [
+                    (key, user_df[:, self._enhanced_position[column]], decimals)
+                    for key, column, decimals in PROFILE_FIELDS
+                    if column in self._enhanced_position
+                ]
+            else:
+                columns = [
+                    (key, user_df[column].to_numpy(), decimals)
+                    for key, column, decimals in PROFILE_FIELDS
+                    if column in user_df.columns
+                ]
+            columns = [(key, np.round(np.asarray(values, dtype=np.float64), decimals).tolist())
+                       for key, values, decimals in columns]
             
-            return profile
+            return [
+                {key: values[row] for key, values in columns}
+                for row in range(len(user_df))
+            ]
             
         except Exception as e:
             print(f"⚠️ Aviso: Erro ao calcular perfil do usuário: {e}")
-            return {}
+            return [{} for _ in range(len(user_df))]
     
     def _validate_input(self, user_input: Dict[str, Any]) -> None:
         """
-        Valida a entrada do usuário.
+        Valida a entrada do usuário em uma única passada pelo schema de entrada.
+        
+        Confere, campo a campo, se cada feature obrigatória está presente, se as
+        numéricas são números e se as categóricas são valores conhecidos pelos
+        label encoders (lookup em dicionário).
         
         Args:
             user_input: Dicionário com as preferências do usuário
             
         Raises:
-            ValueError: Se a entrada for inválida
+            MissingFieldsError: Se faltarem campos (tem precedência sobre valores inválidos)
+            ValueError: Se a entrada não for um dicionário ou algum valor for inválido
         """
-        # Verificar se todas as features necessárias estão presentes
-        missing_features = set(self.feature_columns) - set(user_input.keys())
-        if missing_features:
-            raise ValueError(f"Features ausentes: {missing_features}")
+        if not isinstance(user_input, dict):
+            raise ValueError("Entrada deve ser um objeto JSON")
         
-        # Verificar tipos de dados para variáveis numéricas
-        for col in self.numeric_columns:
-            if col in user_input:
+        missing, error = [], None
+        for col, categories, numeric in self._input_schema:
+            try:
+                value = user_input[col]
+            except KeyError:
+                missing.append(col)
+                continue
+            if error is not None:
+                continue
+            
+            if categories is not None:
+                try:
+                    known = value in categories
+                except TypeError:
+                    known = False
+                if not known:
+                    error = f"Valor inválido para '{col}': {value}. Valores aceitos: {list(categories)}"
+            elif numeric:
                 try:
-                    float(user_input[col])
+                    float(value)
                 except (ValueError, TypeError):
-                    raise ValueError(f"'{col}' deve ser um número. Recebido: {user_input[col]}")
+                    error = f"'{col}' deve ser um número. Recebido: {value}"
+        
+        if missing:
+            raise MissingFieldsError(missing, list(self.feature_columns))
+        if error is not None:
+            raise ValueError(error)
+    
+    @staticmethod
+    def _without_feature_names(estimator: Any) -> Any:
+        """
+        Cópia rasa do estimador sem feature_names_in_ (compartilha os dados de treino).
+        """
+        estimator = copy.copy(estimator)
+        if hasattr(estimator, 'feature_names_in_'):
+            del estimator.feature_names_in_
+        return estimator
+    
+    def similar_to_breed(self, name: str, top_k: int = 5) -> Optional[Dict[str, Any]]:
+        """
+        Raças mais parecidas com uma raça do catálogo, em O(top_k).
+        
+        Usa os vizinhos pré-calculados na carga do catálogo (até BREED_NEIGHBORS_K
+        por raça), sem passar pelo pré-processamento nem pelo modelo.
+        
+        Args:
+            name: Nome da raça (sem diferenciar maiúsculas/minúsculas)
+            top_k: Número de raças similares (limitado a BREED_NEIGHBORS_K)
+        
+        Returns:
+            {'breed': nome no catálogo, 'similar_breeds': [...]} no formato de
+            predict(), ou None se a raça não existir
+        """
+        catalog = self._catalog
+        position = catalog.breed_positions.get(str(name).casefold())
+        if position is None:
+            return None
+        
+        top_k = max(0, min(int(top_k), catalog.neighbor_indices.shape[1]))
+        neighbors = catalog.neighbor_indices[position, :top_k]
+        similarities = np.round(catalog.neighbor_similarities[position, :top_k].astype(np.float64), 3).tolist()
+        return {
+            'breed': catalog.breed_labels[position],
+            'similar_breeds': [
+                {'breed': catalog.breed_labels[idx], 'similarity': similarity, 'rank': rank}
+                for rank, (idx, similarity) in enumerate(zip(neighbors, similarities), start=1)
+            ]
+        }
     
     def get_feature_info(self) -> Dict[str, Any]:
         """
@@ -276,7 +1478,7 @@ class DogMatchPredictor:
                 col: list(encoder.classes_) 
                 for col, encoder in self.label_encoders.items()
             },
-            'breed_names': self.breed_names
+            'breed_names': self._catalog.breed_names
         }
     
     def get_model_info(self) -> Dict[str, Any]:
@@ -286,12 +1488,19 @@ class DogMatchPredictor:
         Returns:
             Dicionário com informações do modelo
         """
+        catalog = self._catalog
         return {
-            'model_type': type(self.model).__name__,
-            'similarity_model_type': type(self.similarity_model).__name__,
+            'model_type': type(catalog.model).__name__,
+            'similarity_model_type': type(catalog.similarity_model).__name__,
             'n_features': len(self.feature_columns),
-            'n_breeds': len(self.breed_names),
-            'supports_probabilities': hasattr(self.model, 'predict_proba'),
+            'n_breeds': len(catalog.breed_names),
+            'catalog_version': catalog.version,
+            'supports_probabilities': hasattr(catalog.model, 'predict_proba'),
+            'shared_neighbor_search': catalog.row_classes is not None,
+            'shared_catalog': catalog.segment.path if catalog.segment is not None else None,
+            'catalog_journal': self.catalog_journal.path if self.catalog_journal is not None else None,
+            'filterable_fields': catalog.attribute_index.columns,
+            'similarity_index': type(catalog.similarity_index).__name__ if catalog.similarity_index is not None else 'sklearn',
             'feature_engineering': True,
             'hybrid_system': True
         }
@@ -0,0 +1,281 @@
+"""
+DogMatch Fast Pipeline - Pré-processamento em NumPy puro
+
+Este arquivo contém a classe FastFeaturePipeline, que reproduz exatamente o
+pré-processamento do DogMatchPredictor (label encoding, features derivadas e
+RobustScaler) sem usar pandas: os label encoders viram dicionários, os
+mapeamentos das features derivadas viram tabelas de lookup e o scaler vira
+arrays de center/scale pré-calculados.
+"""
+
+import os
+import threading
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+
+# Mapeamentos das features derivadas (código do label encoder -> score)
+CHILDREN_SCORE_MAP = {0: 0, 1: 1, 2: 0.5}           # No=0, Yes=1, With Training=0.5
+SHEDDING_SCORE_MAP = {0: 0, 1: 0.5, 2: 1, 3: 1.5}   # Low=0, Moderate=0.5, High=1, Very High=1.5
+HEALTH_SCORE_MAP = {0: 0, 1: 0.5, 2: 1}             # Low=0, Moderate=0.5, High=1
+SIZE_SCORE_MAP = {0: 1, 1: 2, 2: 3, 3: 4}           # Small=1, Medium=2, Large=3, Giant=4
+
+
+class FastFeaturePipeline:
+    """
+    Pré-processamento vetorizado em NumPy equivalente ao caminho pandas.
+
+    Produz a mesma matriz (mesma ordem de colunas, mesmos valores float64)
+    que o DogMatchPredictor gera com pd.DataFrame + LabelEncoder +
+    _create_derived_features + RobustScaler.transform.
+    """
+
+    def __init__(self, enhanced_columns: List[str], categorical_columns: List[str],
+                 numeric_columns: List[str], label_encoders: Dict[str, Any], robust_scaler: Any):
+        """
+        Compila encoders e scaler em estruturas NumPy/dict.
+
+        Args:
+            enhanced_columns: Ordem das colunas esperada pelos modelos (features originais + derivadas)
+            categorical_columns: Colunas categóricas (label encoded)
+            numeric_columns: Colunas normalizadas pelo RobustScaler
+            label_encoders: Dicionário {coluna: LabelEncoder} treinado
+            robust_scaler: RobustScaler treinado
+        """
+        self.enhanced_columns = list(enhanced_columns)
+        self.categorical_columns = list(categorical_columns)
+        self.numeric_columns = list(numeric_columns)
+        self._position = {col: i for i, col in enumerate(self.enhanced_columns)}
+
+        # Label encoders -> dicionários {valor: código}
+        self.encoder_classes = {col: list(encoder.classes_) for col, encoder in label_encoders.items()}
+        self.encoders = {
+            col: {value: code for code, value in enumerate(classes)}
+            for col, classes in self.encoder_classes.items()
+        }
+
+        # Colunas numéricas fornecidas diretamente pelo usuário
+        derived = {'Family_Compatibility_Score', 'Maintenance_Score', 'Energy_Score',
+                   'Intelligence_Training_Ratio', 'Size_Score'}
+        self.input_numeric_columns = [
+            col for col in self.enhanced_columns
+            if col not in self.categorical_columns and col not in derived
+        ]
+
+        # Tabelas de lookup (código -> score, NaN para códigos sem mapeamento)
+        self._children_lut = self._build_lut('Good with Children', CHILDREN_SCORE_MAP)
+        self._shedding_lut = self._build_lut('Shedding Level', SHEDDING_SCORE_MAP)
+        self._health_lut = self._build_lut('Health Issues Risk', HEALTH_SCORE_MAP)
+        self._size_lut = self._build_lut('Size', SIZE_SCORE_MAP)
+
+        # RobustScaler -> arrays de center/scale alinhados às colunas numéricas
+        scaler_columns = list(getattr(robust_scaler, 'feature_names_in_', self.numeric_columns))
+        self._scaled_positions = np.array([self._position[col] for col in scaler_columns], dtype=np.intp)
+        n_scaled = len(scaler_columns)
+        self._center = (np.asarray(robust_scaler.center_, dtype=np.float64)
+                        if robust_scaler.center_ is not None else np.zeros(n_scaled))
+        self._scale = (np.asarray(robust_scaler.scale_, dtype=np.float64)
+                       if robust_scaler.scale_ is not None else np.ones(n_scaled))
+
+        # Buffer pré-alocado por thread para inferência de uma única linha
+        self._local = threading.local()
+
+    def _build_lut(self, column: str, score_map: Dict[int, float]) -> np.ndarray:
+        """
+        Cria a tabela de lookup código -> score de uma coluna categórica.
+        """
+        lut = np.full(len(self.encoder_classes.get(column, [])), np.nan)
+        for code, score in score_map.items():
+            if code < len(lut):
+                lut[code] = score
+        return lut
+
+    def encode_value(self, column: str, value: Any) -> int:
+        """
+        Label encoding de um valor categórico via dicionário.
+
+        Raises:
+            ValueError: Se o valor não for conhecido pelo encoder
+        """
+        try:
+            return self.encoders[column][value]
+        except (KeyError, TypeError):
+            raise ValueError(f"Valor inválido para '{column}': {value}. "
+                             f"Valores aceitos: {self.encoder_classes[column]}")
+
+    def transform_one(self, user_input: Dict[str, Any], timer: Optional[Any] = None) -> np.ndarray:
+        """
+        Pré-processa uma única entrada no buffer pré-alocado da thread atual.
+
+        O array retornado (shape (1, n_features)) é reutilizado na próxima
+        chamada da mesma thread: copie-o se precisar guardá-lo.
+
+        Args:
+            user_input: Entrada já validada
+            timer: StageTimer (metrics.py) para medir encode/derive/scale, ou None
+        """
+        row = getattr(self._local, 'row', None)
+        if row is None:
+            row = np.empty((1, len(self.enhanced_columns)), dtype=np.float64)
+            self._local.row = row
+
+        self._encode_row(row, user_input)
+        if timer: timer.mark('encode')
+        self._apply_derived(row)
+        if timer: timer.mark('derive')
+        self._apply_scaler(row)
+        if timer: timer.mark('scale')
+        return row
+
+    def _encode_row(self, row: np.ndarray, user_input: Dict[str, Any]) -> None:
+        """
+        Label encoding e conversão numérica de uma entrada para a linha (1, n_features).
+        """
+        for col in self.categorical_columns:
+            row[0, self._position[col]] = self.encode_value(col, user_input[col])
+        for col in self.input_numeric_columns:
+            row[0, self._position[col]] = float(user_input[col])
+
+    def transform_many(self, user_inputs: List[Dict[str, Any]], timer: Optional[Any] = None) -> np.ndarray:
+        """
+        Pré-processa várias entradas (já validadas) em uma matriz (n, n_features).
+        """
+        matrix = np.empty((len(user_inputs), len(self.enhanced_columns)), dtype=np.float64)
+
+        for col in self.categorical_columns:
+            encoder = self.encoders[col]
+            matrix[:, self._position[col]] = [encoder[user_input[col]] for user_input in user_inputs]
+        for col in self.input_numeric_columns:
+            matrix[:, self._position[col]] = [float(user_input[col]) for user_input in user_inputs]
+        if timer: timer.mark('encode')
+
+        self._apply_derived(matrix)
+        if timer: timer.mark('derive')
+        self._apply_scaler(matrix)
+        if timer: timer.mark('scale')
+        return matrix
+
+    def transform_encoded(self, columns: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Pré-processa colunas já codificadas (categóricas como códigos do encoder).
+
+        Args:
+            columns: {coluna de entrada: array de valores}, todos com o mesmo tamanho
+
+        Returns:
+            Matriz (n, n_features) pronta para os modelos
+        """
+        n_rows = len(next(iter(columns.values())))
+        matrix = np.empty((n_rows, len(self.enhanced_columns)), dtype=np.float64)
+        for col in self.categorical_columns + self.input_numeric_columns:
+            matrix[:, self._position[col]] = columns[col]
+
+        self._derive_and_scale(matrix)
+        return matrix
+
+    def _derive_and_scale(self, matrix: np.ndarray) -> None:
+        """
+        Calcula as features derivadas e aplica o RobustScaler in-place.
+        """
+        self._apply_derived(matrix)
+        self._apply_scaler(matrix)
+
+    def _apply_derived(self, matrix: np.ndarray) -> None:
+        """
+        Calcula as features derivadas in-place.
+
+        As expressões seguem exatamente a ordem das operações de
+        DogMatchPredictor._create_derived_features para garantir resultados
+        idênticos em float64.
+        """
+        pos = self._position
+        size = matrix[:, pos['Size']].astype(np.intp)
+        children = matrix[:, pos['Good with Children']].astype(np.intp)
+        shedding = matrix[:, pos['Shedding Level']].astype(np.intp)
+        health = matrix[:, pos['Health Issues Risk']].astype(np.intp)
+        exercise = matrix[:, pos['Exercise Requirements (hrs/day)']]
+        intelligence = matrix[:, pos['Intelligence Rating (1-10)']]
+        training = matrix[:, pos['Training Difficulty (1-10)']]
+        friendly = matrix[:, pos['Friendly Rating (1-10)']]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            matrix[:, pos['Family_Compatibility_Score']] = (
+                self._children_lut[children] * 0.4 +
+                friendly * 0.1 +
+                (10 - training) * 0.1
+            )
+            matrix[:, pos['Maintenance_Score']] = (
+                self._shedding_lut[shedding] * 0.3 +
+                exercise * 0.2 +
+                self._health_lut[health] * 0.3
+            )
+            matrix[:, pos['Energy_Score']] = exercise * 0.4 + intelligence * 0.1
+            matrix[:, pos['Intelligence_Training_Ratio']] = intelligence / (training + 1)
+            matrix[:, pos['Size_Score']] = self._size_lut[size]
+
+    def _apply_scaler(self, matrix: np.ndarray) -> None:
+        """
+        Aplica o RobustScaler in-place: X = (X - center) / scale.
+        """
+        scaled = matrix[:, self._scaled_positions]
+        scaled -= self._center
+        scaled /= self._scale
+        matrix[:, self._scaled_positions] = scaled
+
+
+def check_parity(predictor: Any, csv_path: str) -> int:
+    """
+    Compara o caminho NumPy com o caminho pandas para cada raça do dataset.
+
+    Args:
+        predictor: DogMatchPredictor com fast_path habilitado
+        csv_path: CSV com as raças (ex.: ml/data/Dog_Breads_Filtered.csv)
+
+    Returns:
+        Número de divergências encontradas
+    """
+    import csv
+
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+
+    numeric_columns = predictor.fast_pipeline.input_numeric_columns
+    mismatches = 0
+    for row in rows:
+        user_input = {
+            col: float(row[col]) if col in numeric_columns else row[col]
+            for col in predictor.feature_columns
+        }
+
+        outcomes = []
+        for fast_path in (True, False):
+            predictor.fast_path = fast_path
+            try:
+                outcomes.append(predictor.predict(user_input))
+            except Exception as e:
+                outcomes.append({'error': str(e)})
+        predictor.fast_path = True
+
+        fast, reference = outcomes
+        same = ('error' in fast) == ('error' in reference) if 'error' in reference else fast == reference
+        if not same:
+            mismatches += 1
+            print(f"❌ {row['Name']}: numpy={fast} pandas={reference}")
+        else:
+            print(f"✅ {row['Name']}")
+
+    return mismatches
+
+
+if __name__ == "__main__":
+    import sys
+    from dogmatch_predictor import DogMatchPredictor
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    default_csv = os.path.join(current_dir, '..', 'ml', 'data', 'Dog_Breads_Filtered.csv')
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else default_csv
+
+    mismatches = check_parity(DogMatchPredictor(), csv_path)
+    print(f"\n{'✅ Paridade OK' if mismatches == 0 else f'❌ {mismatches} divergência(s)'}")
+    sys.exit(1 if mismatches else 0)
@@ -0,0 +1,57 @@
+"""
+Configuração do Gunicorn para o DogMatch Backend
+
+- preload_app: o app (e o DogMatchPredictor, via DOGMATCH_EAGER_LOAD) é
+  carregado e aquecido no processo master antes do fork, então os workers
+  compartilham as páginas dos modelos copy-on-write e nenhum usuário paga o
+  custo de carregamento na primeira requisição
+- gc.freeze() antes do fork evita que o coletor de lixo dos workers toque (e
+  copie) os objetos carregados no master
+- BLAS/OpenMP com 1 thread por worker: evita threads criadas no master antes do
+  fork (não são fork-safe) e disputa de CPU entre workers
+- catálogo compartilhado (DOGMATCH_SHARED_CATALOG, padrão /dev/shm/dogmatch
+  quando existe): matriz do catálogo, índice de similaridade e vizinhos por
+  raça ficam em um único segmento mapeado somente leitura por todos os
+  workers, inclusive depois de recargas do modelo em cada worker; os
+  segmentos são removidos quando o master termina
+- atualizações do catálogo (/api/admin/catalog) são publicadas no journal do
+  mesmo diretório e aplicadas por todos os workers; segmentos e journals de uma
+  execução anterior são removidos antes do carregamento, e sem o diretório as
+  atualizações são recusadas com mais de um worker (DOGMATCH_WORKERS)
+"""
+
+import gc
+import os
+
+# Precisa acontecer antes de importar numpy/sklearn (o app é importado depois deste arquivo)
+os.environ.setdefault('DOGMATCH_EAGER_LOAD', '1')
+for _var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(_var, '1')
+if os.path.isdir('/dev/shm'):
+    os.environ.setdefault('DOGMATCH_SHARED_CATALOG', '/dev/shm/dogmatch')
+
+# Alterações do catálogo não sobrevivem a um reinício: journal de uma execução anterior
+# (master encerrado sem on_exit) não pode ser reaplicado pelo pré-carregamento
+if os.environ.get('DOGMATCH_SHARED_CATALOG'):
+    from shared_catalog import remove_segments
+    remove_segments(os.environ['DOGMATCH_SHARED_CATALOG'])
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8080')}"
+preload_app = True
+
+
+def when_ready(server):
+    """Executado no master depois do carregamento do app e antes de criar os workers."""
+    # Número de workers (herdado por eles): update_catalog sem journal compartilhado é recusado com mais de um
+    os.environ['DOGMATCH_WORKERS'] = str(server.num_workers)
+    gc.collect()
+    gc.freeze()
+    server.log.info("DogMatch: predictor pré-carregado no master; objetos congelados para copy-on-write")
+
+
+def on_exit(server):
+    """Executado no master ao encerrar: remove os segmentos do catálogo compartilhado."""
+    directory = os.environ.get('DOGMATCH_SHARED_CATALOG')
+    if directory:
+        from shared_catalog import remove_segments
+        server.log.info(f"DogMatch: {remove_segments(directory)} segmento(s) do catálogo removido(s)")
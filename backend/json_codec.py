@@ -0,0 +1,68 @@
+"""
+DogMatch JSON Codec - Serialização JSON das requisições e respostas
+
+Este arquivo concentra o encode/decode de JSON usado pelos apps Flask e ASGI
+e pelas respostas pré-serializadas do api_service:
+
+- orjson quando instalado (implementado em Rust, serializa arrays e escalares
+  NumPy nativamente), json da stdlib caso contrário
+- DOGMATCH_JSON=stdlib força a stdlib (ex.: para comparar as duas)
+- as duas implementações geram JSON compacto, UTF-8 sem escapes e com tipos
+  NumPy convertidos para os tipos Python equivalentes
+"""
+
+import json
+import os
+from typing import Any
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# Implementação em uso ('orjson' ou 'stdlib')
+BACKEND = 'orjson' if orjson is not None and os.environ.get('DOGMATCH_JSON', 'auto') != 'stdlib' else 'stdlib'
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    """
+    Tipos sem representação JSON direta: NumPy vira tipo Python, o resto vira str.
+    """
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def dumps(payload: Any, sort_keys: bool = False) -> bytes:
+    """
+    Serializa payload em JSON compacto (UTF-8).
+
+    Args:
+        payload: Objeto a serializar (dict, list, tipos NumPy...)
+        sort_keys: Ordenar as chaves (saída estável, ex.: para ETags)
+    """
+    if BACKEND == 'orjson':
+        option = _ORJSON_OPTIONS | orjson.OPT_SORT_KEYS if sort_keys else _ORJSON_OPTIONS
+        return orjson.dumps(payload, default=_default, option=option)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), sort_keys=sort_keys,
+                      default=_default).encode('utf-8')
+
+
+def loads(data: Any) -> Any:
+    """
+    Decodifica JSON (bytes ou str).
+
+    Raises:
+        ValueError: Se o conteúdo não for JSON válido
+    """
+    if BACKEND == 'orjson':
+        return orjson.loads(data)
+    return json.loads(data)
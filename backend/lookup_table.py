@@ -0,0 +1,339 @@
+"""
+DogMatch Lookup Table - Tabela pré-calculada de recomendações
+
+As entradas do questionário são quase todas discretas (Size, Type, Shedding
+Level, Health Issues Risk, Good with Children e notas inteiras de 1-10), então
+o espaço de requisições realistas é finito. Este arquivo contém:
+
+- build_lookup_table(): etapa offline que enumera uma grade de entradas
+  (categorias completas + valores numéricos em buckets) pelo mesmo pipeline do
+  DogMatchPredictor e grava o resultado em uma tabela compacta (.npy)
+- LookupTable: tabela memory-mapped consultada em O(1) pela chave codificada
+  da entrada; valores numéricos fora da grade voltam para a inferência normal
+
+Uso:
+    python lookup_table.py build --output models/lookup_table.npy [--grid grade.json] [--top-k 5]
+    python lookup_table.py verify --table models/lookup_table.npy [--samples 2000]
+"""
+
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List, Any, Optional
+
+import numpy as np
+
+
+# Versão do formato da tabela (metadados + .npy)
+LOOKUP_FORMAT_VERSION = 2
+
+# Marcador de linha sem resultado (ex.: entrada que gera NaN) -> usar inferência normal
+MISSING = np.iinfo(np.uint16).max
+
+# Grade padrão dos valores numéricos (valores próximos aos padrões do frontend e do /api/example).
+# As colunas categóricas sempre usam todas as classes dos label encoders.
+DEFAULT_NUMERIC_GRID = {
+    'Exercise Requirements (hrs/day)': [1.0, 1.5, 2.0, 2.5, 3.0],
+    'Intelligence Rating (1-10)': [5, 6, 7, 8, 9],
+    'Training Difficulty (1-10)': [3, 4, 5, 6, 7],
+    'Friendly Rating (1-10)': [6, 7, 8, 9, 10],
+    'Life Span': [10, 12, 14],
+    'Average Weight (kg)': [10, 20, 25, 30],
+}
+
+# Linhas processadas por bloco durante a construção
+BUILD_CHUNK_SIZE = 100_000
+
+
+def model_fingerprint(predictor: Any) -> str:
+    """
+    Identifica o conjunto de modelos/preprocessadores de um predictor.
+
+    Uma tabela só é válida para o mesmo catálogo, scaler, encoders e classes
+    do modelo com que foi gerada.
+    """
+    digest = hashlib.sha256()
+    digest.update(np.ascontiguousarray(predictor.similarity_index.data, dtype=np.float64).tobytes())
+    digest.update(json.dumps([str(label) for label in predictor._breed_labels]).encode('utf-8'))
+    digest.update(json.dumps([str(label) for label in predictor.model.classes_]).encode('utf-8'))
+    digest.update(json.dumps(predictor.fast_pipeline.encoder_classes, sort_keys=True).encode('utf-8'))
+    digest.update(predictor.fast_pipeline._center.tobytes())
+    digest.update(predictor.fast_pipeline._scale.tobytes())
+    return digest.hexdigest()
+
+
+def _metadata_path(table_path: str) -> str:
+    return os.path.splitext(table_path)[0] + '.json'
+
+
+def _table_dtype(top_k: int, n_predictions: int) -> np.dtype:
+    return np.dtype([
+        ('prediction', np.uint16, (n_predictions,)),  # índices em model.classes_ (ranking; MISSING sobra)
+        ('score', np.int16, (n_predictions,)),        # probabilidade * 1000 (já arredondada)
+        ('similar', np.uint16, (top_k,)),     # índices das linhas do catálogo
+        ('similarity', np.int16, (top_k,)),   # similaridade * 1000 (já arredondada)
+    ])
+
+
+def build_lookup_table(predictor: Any, output_path: str, numeric_grid: Optional[Dict[str, List[float]]] = None,
+                       top_k: int = 5, chunk_size: int = BUILD_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Enumera a grade de entradas pelo pipeline do predictor e grava a tabela.
+
+    Args:
+        predictor: DogMatchPredictor carregado
+        output_path: Caminho do .npy (os metadados vão para um .json ao lado)
+        numeric_grid: {coluna numérica: valores}; padrão DEFAULT_NUMERIC_GRID
+        top_k: Número de raças similares (e no máximo de predições) armazenadas por entrada
+        chunk_size: Linhas processadas por bloco
+
+    Returns:
+        Metadados gravados
+    """
+    pipeline = predictor.fast_pipeline
+    numeric_grid = numeric_grid or DEFAULT_NUMERIC_GRID
+    top_k = min(top_k, len(predictor.similarity_index))
+    # Com o KNN, só os n_neighbors vizinhos votam: no máximo essa quantidade de classes com score > 0
+    n_predictions = min(top_k, getattr(predictor.model, 'n_neighbors', top_k), len(predictor.model.classes_))
+
+    missing_columns = set(pipeline.input_numeric_columns) - set(numeric_grid)
+    if missing_columns:
+        raise ValueError(f"Grade sem valores para: {sorted(missing_columns)}")
+
+    # Ordem das colunas da chave e valores da grade de cada uma
+    columns = list(predictor.feature_columns)
+    grid = {
+        col: list(pipeline.encoder_classes[col]) if col in pipeline.categorical_columns
+        else sorted({float(value) for value in numeric_grid[col]})
+        for col in columns
+    }
+    radices = np.array([len(grid[col]) for col in columns], dtype=np.int64)
+    n_rows = int(np.prod(radices))
+
+    table = np.lib.format.open_memmap(output_path, mode='w+', dtype=_table_dtype(top_k, n_predictions), shape=(n_rows,))
+    grid_arrays = {col: np.asarray(grid[col]) for col in pipeline.input_numeric_columns}
+
+    started = time.perf_counter()
+    for start in range(0, n_rows, chunk_size):
+        stop = min(start + chunk_size, n_rows)
+
+        # Decompor o número da linha (mixed radix) nas posições da grade
+        keys = np.arange(start, stop, dtype=np.int64)
+        encoded = {}
+        for col, radix in zip(reversed(columns), reversed(radices)):
+            positions = keys % radix
+            keys //= radix
+            encoded[col] = positions if col in pipeline.categorical_columns else grid_arrays[col][positions]
+
+        features = pipeline.transform_encoded(encoded)
+        finite_mask = np.isfinite(features).all(axis=1)
+
+        chunk = table[start:stop]
+        chunk['prediction'] = MISSING
+        chunk['score'] = 0
+        chunk['similar'] = MISSING
+        chunk['similarity'] = 0
+
+        if finite_mask.any():
+            probabilities, distances, indices = predictor._infer_matrix(features[finite_mask], top_k)
+            # Mesmo ranking de _format_predictions: ordem estável, só classes com probabilidade > 0
+            order = np.argsort(-probabilities, axis=1, kind='stable')[:, :n_predictions]
+            scores = np.take_along_axis(probabilities, order, axis=1)
+            chunk['prediction'][finite_mask] = np.where(scores > 0, order, MISSING)
+            chunk['score'][finite_mask] = np.rint(np.round(scores, 3) * 1000)
+            chunk['similar'][finite_mask] = indices
+            chunk['similarity'][finite_mask] = np.rint((1 - distances) * 1000)
+
+        print(f"⏳ {stop:,}/{n_rows:,} linhas ({time.perf_counter() - started:.1f}s)")
+
+    table.flush()
+    del table
+
+    metadata = {
+        'format_version': LOOKUP_FORMAT_VERSION,
+        'model_fingerprint': model_fingerprint(predictor),
+        'top_k': top_k,
+        'n_predictions': n_predictions,
+        'columns': columns,
+        'grid': grid,
+        'classes': [str(label) for label in predictor.model.classes_],
+        'breeds': [str(label) for label in predictor._breed_labels],
+        'n_rows': n_rows,
+    }
+    with open(_metadata_path(output_path), 'w', encoding='utf-8') as f:
+        json.dump(metadata, f, ensure_ascii=False, indent=2)
+
+    print(f"✅ Tabela gravada: {output_path} ({n_rows:,} linhas, {os.path.getsize(output_path) / 1e6:.1f} MB)")
+    return metadata
+
+
+class LookupTable:
+    """
+    Tabela de recomendações memory-mapped com consulta O(1).
+
+    A chave de cada entrada é a posição mixed-radix dos seus valores na grade;
+    lookup() devolve None quando a entrada não está na grade (ex.: valor
+    numérico fora dos buckets, top_k maior que o armazenado) e o predictor
+    segue para a inferência normal.
+    """
+
+    def __init__(self, table_path: str, expected_fingerprint: Optional[str] = None):
+        """
+        Args:
+            table_path: Caminho do .npy gerado por build_lookup_table()
+            expected_fingerprint: model_fingerprint() do predictor em uso
+
+        Raises:
+            ValueError: Se a tabela for de outra versão de formato ou de outro modelo
+        """
+        with open(_metadata_path(table_path), encoding='utf-8') as f:
+            metadata = json.load(f)
+
+        if metadata.get('format_version') != LOOKUP_FORMAT_VERSION:
+            raise ValueError(f"Versão de formato da tabela não suportada: {metadata.get('format_version')}")
+        if expected_fingerprint is not None and metadata['model_fingerprint'] != expected_fingerprint:
+            raise ValueError("Tabela de lookup gerada para outro modelo; reconstrua com 'python lookup_table.py build'")
+
+        self.metadata = metadata
+        self.top_k = metadata['top_k']
+        self.columns = metadata['columns']
+        self.classes = metadata['classes']
+        self.breeds = metadata['breeds']
+        self.table = np.load(table_path, mmap_mode='r')
+
+        if len(self.table) != metadata['n_rows']:
+            raise ValueError("Tabela de lookup incompleta: número de linhas diferente dos metadados")
+
+        # Posição de cada valor na grade e passo (stride) de cada coluna na chave
+        self._positions = []
+        stride = 1
+        strides = []
+        for col in reversed(self.columns):
+            strides.append(stride)
+            stride *= len(metadata['grid'][col])
+        for col, col_stride in zip(self.columns, reversed(strides)):
+            values = metadata['grid'][col]
+            is_numeric = bool(values) and not isinstance(values[0], str)
+            self._positions.append((col, is_numeric, {value: i * col_stride for i, value in enumerate(values)}))
+
+    def __len__(self) -> int:
+        return len(self.table)
+
+    def key(self, user_input: Dict[str, Any]) -> Optional[int]:
+        """
+        Chave (linha da tabela) de uma entrada, ou None se estiver fora da grade.
+        """
+        key = 0
+        try:
+            for col, is_numeric, positions in self._positions:
+                value = float(user_input[col]) if is_numeric else user_input[col]
+                key += positions[value]
+        except (KeyError, TypeError, ValueError):
+            return None
+        return key
+
+    def lookup(self, user_input: Dict[str, Any], top_k: int = 5) -> Optional[Dict[str, Any]]:
+        """
+        Ranking da predição principal e raças similares pré-calculados para a entrada.
+
+        Returns:
+            {'predictions': [...], 'similar_breeds': [...]} ou None se a
+            entrada não puder ser respondida pela tabela
+        """
+        if top_k > self.top_k:
+            return None
+
+        key = self.key(user_input)
+        if key is None:
+            return None
+
+        row = self.table[key]
+        if int(row['prediction'][0]) == MISSING:
+            return None
+
+        predictions = [
+            {'breed': self.classes[idx], 'score': np.float64(score) / 1000, 'rank': rank + 1}
+            for rank, (idx, score) in enumerate(zip(row['prediction'][:top_k].tolist(), row['score'][:top_k].tolist()))
+            if idx != MISSING
+        ]
+
+        similar_breeds = [
+            {
+                'breed': self.breeds[idx],
+                'similarity': np.float64(similarity) / 1000,
+                'rank': rank + 1
+            }
+            for rank, (idx, similarity) in enumerate(zip(row['similar'][:top_k].tolist(), row['similarity'][:top_k].tolist()))
+        ]
+
+        return {
+            'predictions': predictions,
+            'similar_breeds': similar_breeds
+        }
+
+
+def verify_lookup_table(predictor: Any, table: LookupTable, samples: int = 2000, seed: int = 42) -> int:
+    """
+    Compara respostas da tabela com a inferência normal em pontos aleatórios da grade.
+
+    Returns:
+        Número de divergências encontradas
+    """
+    rng = np.random.default_rng(seed)
+    grid = table.metadata['grid']
+    mismatches = 0
+
+    for _ in range(samples):
+        user_input = {col: grid[col][rng.integers(len(grid[col]))] for col in table.columns}
+        top_k = int(rng.integers(1, table.top_k + 1))
+
+        cached = table.lookup(user_input, top_k)
+        try:
+            live = predictor._predict_live(user_input, top_k)
+        except Exception:
+            live = None
+
+        live_part = None if live is None else {k: live[k] for k in ('predictions', 'similar_breeds')}
+        if cached != live_part:
+            mismatches += 1
+            print(f"❌ {user_input} (top_k={top_k}): tabela={cached} inferência={live_part}")
+
+    return mismatches
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    from dogmatch_predictor import DogMatchPredictor
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    default_table = os.path.join(current_dir, 'models', 'lookup_table.npy')
+
+    parser = argparse.ArgumentParser(description="Tabela pré-calculada de recomendações do DogMatch")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Gerar a tabela')
+    build_parser.add_argument('--output', default=default_table)
+    build_parser.add_argument('--grid', help='JSON {coluna numérica: [valores]} (padrão: DEFAULT_NUMERIC_GRID)')
+    build_parser.add_argument('--top-k', type=int, default=5)
+
+    verify_parser = subparsers.add_parser('verify', help='Comparar a tabela com a inferência normal')
+    verify_parser.add_argument('--table', default=default_table)
+    verify_parser.add_argument('--samples', type=int, default=2000)
+
+    args = parser.parse_args()
+    predictor = DogMatchPredictor()
+
+    if args.command == 'build':
+        numeric_grid = None
+        if args.grid:
+            with open(args.grid, encoding='utf-8') as f:
+                numeric_grid = json.load(f)
+        build_lookup_table(predictor, args.output, numeric_grid=numeric_grid, top_k=args.top_k)
+    else:
+        mismatches = verify_lookup_table(
+            predictor, LookupTable(args.table, model_fingerprint(predictor)), samples=args.samples
+        )
+        print(f"\n{'✅ Tabela consistente' if mismatches == 0 else f'❌ {mismatches} divergência(s)'}")
+        sys.exit(1 if mismatches else 0)
@@ -0,0 +1,210 @@
+"""
+DogMatch Metrics - Contadores e histogramas no formato de texto do Prometheus
+
+Este arquivo contém um registro mínimo de métricas (sem dependências externas)
+usado para instrumentar as rotas da API e as etapas do DogMatchPredictor.
+As métricas são exportadas em /metrics quando DOGMATCH_METRICS=1; desligadas,
+nenhum hook é registrado e o predictor não mede nada (custo de um `if` por etapa).
+
+Cada processo tem o seu registro: com vários workers do gunicorn, cada coleta
+do Prometheus vê apenas o worker que atendeu a requisição.
+"""
+
+import threading
+import time
+from typing import Dict, List, Tuple, Optional
+
+# Buckets de latência (segundos): de 25 µs (etapas do predictor) a 2.5 s (rotas)
+DEFAULT_BUCKETS = (0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025,
+                   0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    """
+    Contador monotônico com labels.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}")
+        return lines
+
+
+class CallbackCounter:
+    """
+    Contador monotônico sem labels lido na hora da coleta (valor já contado por
+    outro objeto, ex.: hits do cache de resultados).
+    """
+
+    def __init__(self, name: str, documentation: str, read):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter",
+                f"{self.name} {_format_value(self.read())}"]
+
+
+class Gauge:
+    """
+    Valor instantâneo, lido na hora da coleta.
+    """
+
+    def __init__(self, name: str, documentation: str, read):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge",
+                f"{self.name} {_format_value(self.read())}"]
+
+
+class Histogram:
+    """
+    Histograma com labels (buckets cumulativos na exportação, como no Prometheus).
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [contagem por bucket (+Inf no fim), soma, contagem]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                    cumulative += bucket_count
+                    le = f'le="{_format_value(bound)}"'
+                    lines.append(f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.label_names, labels)} {_format_value(total)}")
+                lines.append(f"{self.name}_count{_format_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class StageTimer:
+    """
+    Mede etapas consecutivas: cada mark() registra o tempo desde o mark anterior.
+    """
+
+    __slots__ = ('_histogram', '_mode', '_last')
+
+    def __init__(self, histogram: Histogram, mode: str):
+        self._histogram = histogram
+        self._mode = mode
+        self._last = time.perf_counter()
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter()
+        self._histogram.observe(now - self._last, self._mode, stage)
+        self._last = now
+
+
+class MetricsRegistry:
+    """
+    Conjunto de métricas de um processo, exportado no formato de texto do Prometheus.
+    """
+
+    CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+        # Etapas do DogMatchPredictor (mode: single = predict(), batch = predict_batch())
+        self.predictor_stages = self.histogram(
+            'dogmatch_predictor_stage_seconds', 'Duração de cada etapa do DogMatchPredictor',
+            ('mode', 'stage')
+        )
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, label_names: Tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(self, name: str, documentation: str, label_names: Tuple[str, ...] = (),
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def gauge(self, name: str, documentation: str, read) -> Gauge:
+        return self._register(Gauge(name, documentation, read))
+
+    def callback_counter(self, name: str, documentation: str, read) -> CallbackCounter:
+        return self._register(CallbackCounter(name, documentation, read))
+
+    def stage_timer(self, mode: str) -> StageTimer:
+        """Novo medidor de etapas para uma chamada do predictor."""
+        return StageTimer(self.predictor_stages, mode)
+
+    def render(self) -> str:
+        """Todas as métricas no formato de texto do Prometheus."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+def stage_timer(registry: Optional[MetricsRegistry], mode: str) -> Optional[StageTimer]:
+    """StageTimer do registro, ou None quando as métricas estão desligadas."""
+    return registry.stage_timer(mode) if registry is not None else None
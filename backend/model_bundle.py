@@ -0,0 +1,297 @@
+"""
+DogMatch Model Bundle - Arquivo único e versionado com os modelos
+
+Substitui os sete .pkl de backend/models/ (e a cópia em ml/models/) e o
+breed_attributes.csv por um único arquivo. Os arrays numéricos (matriz do
+catálogo, parâmetros do scaler, vocabulários dos encoders, labels, atributos
+brutos das raças) são gravados como buffers brutos alinhados,
+mapeados em memória na carga (sem unpickling e compartilhados entre processos
+pelo page cache). Metadados e hiperparâmetros ficam em um cabeçalho JSON.
+
+Formato:
+    MAGIC (8 bytes) | versão do schema (uint32) | tamanho do cabeçalho (uint32)
+    | cabeçalho JSON | padding até 64 bytes | arrays (cada um alinhado a 64 bytes)
+
+O cabeçalho guarda o SHA-256 da região de arrays, conferido na carga.
+
+Uso:
+    python model_bundle.py export [--models-dir models] [--output models/dogmatch_bundle.dmb]
+    python model_bundle.py inspect models/dogmatch_bundle.dmb
+"""
+
+import datetime
+import hashlib
+import json
+import mmap
+import os
+import struct
+from typing import Dict, Any, Tuple
+
+import numpy as np
+
+
+BUNDLE_MAGIC = b'DOGMATCH'
+BUNDLE_SCHEMA_VERSION = 1
+BUNDLE_ALIGNMENT = 64
+
+# Estimadores que o bundle sabe representar
+SUPPORTED_MODELS = ('KNeighborsClassifier',)
+SUPPORTED_SIMILARITY_MODELS = ('NearestNeighbors',)
+
+_PREFIX = struct.Struct('<8sII')
+
+
+def _align(offset: int) -> int:
+    return (offset + BUNDLE_ALIGNMENT - 1) // BUNDLE_ALIGNMENT * BUNDLE_ALIGNMENT
+
+
+def _json_safe(value: Any) -> Any:
+    """
+    Converte tipos NumPy (np.float64, ndarray...) em tipos serializáveis em JSON.
+    """
+    if isinstance(value, dict):
+        return {str(key): _json_safe(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+
+def _string_array(values: Any) -> np.ndarray:
+    """
+    Array unicode de largura fixa (mapeável em memória, ao contrário de dtype=object).
+    """
+    values = [str(value) for value in values]
+    width = max([len(value) for value in values] + [1])
+    return np.array(values, dtype=f'<U{width}')
+
+
+def pack_arrays(arrays: Dict[str, np.ndarray]) -> Tuple[Dict[str, Dict[str, Any]], bytearray]:
+    """
+    Concatena arrays em um buffer, cada um alinhado a BUNDLE_ALIGNMENT bytes.
+
+    Returns:
+        (layout {nome: offset, dtype, shape}, buffer)
+    """
+    layout = {}
+    offset = 0
+    for name, array in arrays.items():
+        offset = _align(offset)
+        layout[name] = {'offset': offset, 'dtype': array.dtype.str, 'shape': list(array.shape)}
+        offset += array.nbytes
+
+    payload = bytearray(offset)
+    for name, array in arrays.items():
+        start = layout[name]['offset']
+        payload[start:start + array.nbytes] = np.ascontiguousarray(array).tobytes()
+    return layout, payload
+
+
+def map_arrays(payload: Any, layout: Dict[str, Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """
+    Arrays de um buffer gravado por pack_arrays(), sem cópia (views do buffer).
+    """
+    arrays = {}
+    for name, spec in layout.items():
+        dtype = np.dtype(spec['dtype'])
+        count = int(np.prod(spec['shape'], dtype=np.int64))
+        arrays[name] = np.frombuffer(payload, dtype=dtype, count=count, offset=spec['offset']).reshape(spec['shape'])
+    return arrays
+
+
+def export_bundle(predictor: Any, output_path: str) -> Dict[str, Any]:
+    """
+    Grava os modelos e preprocessadores de um DogMatchPredictor em um bundle.
+
+    Args:
+        predictor: DogMatchPredictor carregado (dos .pkl ou de outro bundle)
+        output_path: Caminho do arquivo de saída
+
+    Returns:
+        Cabeçalho gravado
+
+    Raises:
+        ValueError: Se algum estimador não puder ser representado no bundle
+    """
+    model, similarity_model = predictor.model, predictor.similarity_model
+    if type(model).__name__ not in SUPPORTED_MODELS:
+        raise ValueError(f"Modelo principal não suportado no bundle: {type(model).__name__}")
+    if type(similarity_model).__name__ not in SUPPORTED_SIMILARITY_MODELS:
+        raise ValueError(f"Modelo de similaridade não suportado no bundle: {type(similarity_model).__name__}")
+    for estimator in (model, similarity_model):
+        params = estimator.get_params()
+        if callable(params.get('metric')) or callable(params.get('weights')):
+            raise ValueError(f"{type(estimator).__name__} com métrica/pesos customizados não é suportado no bundle")
+
+    enhanced_columns = list(predictor.enhanced_columns)
+    catalog = np.ascontiguousarray(predictor.X_enhanced[enhanced_columns].to_numpy(dtype=np.float64))
+    catalog_labels = _string_array(predictor._breed_labels)
+
+    arrays = {
+        'catalog': catalog,
+        'catalog_labels': catalog_labels,
+        'scaler_center': np.asarray(predictor.robust_scaler.center_, dtype=np.float64),
+        'scaler_scale': np.asarray(predictor.robust_scaler.scale_, dtype=np.float64),
+    }
+    for col, encoder in predictor.label_encoders.items():
+        arrays[f'encoder/{col}'] = _string_array(encoder.classes_)
+
+    # Valores brutos das colunas numéricas de cada raça (filtros da recomendação)
+    attribute_index = predictor._catalog.attribute_index
+    for col in attribute_index.numeric_columns:
+        arrays[f'attribute/{col}'] = np.ascontiguousarray(attribute_index.values(col), dtype=np.float64)
+
+    # Os modelos KNN guardam apenas os dados de treino: só gravar se forem diferentes do catálogo
+    for name, estimator in (('model', model), ('similarity_model', similarity_model)):
+        fit_X = np.asarray(estimator._fit_X, dtype=np.float64)
+        if not np.array_equal(fit_X, catalog):
+            arrays[f'{name}_fit_X'] = np.ascontiguousarray(fit_X)
+    model_labels = _string_array(np.asarray(model.classes_)[model._y])
+    if not np.array_equal(model_labels, catalog_labels):
+        arrays['model_labels'] = model_labels
+
+    # Layout dos arrays (offsets relativos ao início da região de dados)
+    layout, payload = pack_arrays(arrays)
+    payload_size = len(payload)
+
+    header = {
+        'schema_version': BUNDLE_SCHEMA_VERSION,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'payload_size': payload_size,
+        'checksum_sha256': hashlib.sha256(payload).hexdigest(),
+        'arrays': layout,
+        'feature_info': _json_safe(predictor.feature_info),
+        'enhanced_columns': enhanced_columns,
+        'scaler': {
+            'type': type(predictor.robust_scaler).__name__,
+            'params': _json_safe(predictor.robust_scaler.get_params()),
+            'feature_names': [str(col) for col in getattr(predictor.robust_scaler, 'feature_names_in_',
+                                                          predictor.numeric_columns)],
+        },
+        'model': {'type': type(model).__name__, 'params': _json_safe(model.get_params())},
+        'similarity_model': {'type': type(similarity_model).__name__, 'params': _json_safe(similarity_model.get_params())},
+        'labels_name': getattr(predictor.y_processed, 'name', None),
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    data_start = _align(_PREFIX.size + len(header_bytes))
+
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    tmp_path = output_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(_PREFIX.pack(BUNDLE_MAGIC, BUNDLE_SCHEMA_VERSION, len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b'\0' * (data_start - f.tell()))
+        f.write(payload)
+    os.replace(tmp_path, output_path)
+
+    return header
+
+
+class ModelBundle:
+    """
+    Bundle carregado: cabeçalho + arrays mapeados em memória (somente leitura).
+    """
+
+    def __init__(self, path: str, verify_checksum: bool = True):
+        """
+        Args:
+            path: Caminho do bundle
+            verify_checksum: Conferir o SHA-256 da região de arrays
+
+        Raises:
+            ValueError: Se o arquivo não for um bundle, tiver outra versão de schema ou estiver corrompido
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < _PREFIX.size:
+            raise ValueError(f"Bundle inválido (arquivo truncado): {path}")
+        magic, schema_version, header_size = _PREFIX.unpack_from(self._mmap, 0)
+        if magic != BUNDLE_MAGIC:
+            raise ValueError(f"Arquivo não é um bundle do DogMatch: {path}")
+        if schema_version != BUNDLE_SCHEMA_VERSION:
+            raise ValueError(f"Versão de schema do bundle não suportada: {schema_version} "
+                             f"(esperada: {BUNDLE_SCHEMA_VERSION})")
+
+        self.header = json.loads(self._mmap[_PREFIX.size:_PREFIX.size + header_size].decode('utf-8'))
+        data_start = _align(_PREFIX.size + header_size)
+        payload_size = self.header['payload_size']
+        if len(self._mmap) < data_start + payload_size:
+            raise ValueError(f"Bundle inválido (arquivo truncado): {path}")
+
+        payload = memoryview(self._mmap)[data_start:data_start + payload_size]
+        if verify_checksum and hashlib.sha256(payload).hexdigest() != self.header['checksum_sha256']:
+            raise ValueError(f"Checksum do bundle não confere (arquivo corrompido?): {path}")
+
+        self.arrays = map_arrays(payload, self.header['arrays'])
+
+    @property
+    def version(self) -> str:
+        """Identificador da versão do bundle (prefixo do checksum)."""
+        return self.header['checksum_sha256'][:12]
+
+    def encoder_classes(self) -> Dict[str, list]:
+        """Vocabulário de cada label encoder."""
+        return {
+            name[len('encoder/'):]: array.tolist()
+            for name, array in self.arrays.items() if name.startswith('encoder/')
+        }
+
+
+def load_bundle(path: str, verify_checksum: bool = True) -> ModelBundle:
+    """
+    Carrega um bundle, conferindo magic, versão do schema e checksum.
+    """
+    return ModelBundle(path, verify_checksum=verify_checksum)
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import time
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(description="Bundle único dos modelos do DogMatch")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help='Gerar o bundle a partir dos .pkl')
+    export_parser.add_argument('--models-dir', default=os.path.join(current_dir, 'models'))
+    export_parser.add_argument('--output', default=os.path.join(current_dir, 'models', 'dogmatch_bundle.dmb'))
+
+    inspect_parser = subparsers.add_parser('inspect', help='Mostrar o conteúdo de um bundle')
+    inspect_parser.add_argument('path')
+
+    args = parser.parse_args()
+
+    if args.command == 'export':
+        from dogmatch_predictor import DogMatchPredictor, EXAMPLE_INPUT
+
+        started = time.perf_counter()
+        source = DogMatchPredictor(models_dir=args.models_dir)
+        pickle_seconds = time.perf_counter() - started
+
+        header = export_bundle(source, args.output)
+
+        started = time.perf_counter()
+        bundled = DogMatchPredictor(bundle_path=args.output)
+        bundle_seconds = time.perf_counter() - started
+
+        # Conferir que o bundle produz os mesmos resultados
+        same = source.predict(EXAMPLE_INPUT) == bundled.predict(EXAMPLE_INPUT)
+        print(f"\n✅ Bundle gravado: {args.output} ({os.path.getsize(args.output) / 1024:.1f} KB)")
+        print(f"🔖 Versão: {header['checksum_sha256'][:12]} (schema {header['schema_version']})")
+        print(f"⏱️ Carga: .pkl {pickle_seconds:.3f}s | bundle {bundle_seconds:.3f}s")
+        print(f"{'✅' if same else '❌'} Predição de exemplo idêntica: {same}")
+        sys.exit(0 if same else 1)
+    else:
+        bundle = load_bundle(args.path)
+        print(f"🔖 Versão: {bundle.version} (schema {bundle.header['schema_version']}, criado em {bundle.header['created_at']})")
+        print(f"📊 Modelo: {bundle.header['model']['type']} {bundle.header['model']['params']}")
+        print(f"🔍 Similaridade: {bundle.header['similarity_model']['type']} {bundle.header['similarity_model']['params']}")
+        for name, array in bundle.arrays.items():
+            print(f"• {name}: {array.dtype} {array.shape}")
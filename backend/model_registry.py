@@ -0,0 +1,338 @@
+"""
+DogMatch Model Registry - Versões do modelo e troca a quente sem downtime
+
+Este arquivo contém a classe ModelRegistry, que mantém a versão ativa do
+DogMatchPredictor de um processo e permite substituí-la sem reiniciar:
+
+- a origem dos modelos (diretório backend/models, com os .pkl e o
+  breed_attributes.csv, ou o bundle de DOGMATCH_BUNDLE) pode ser observada
+  por uma thread que confere tamanho e data de modificação dos arquivos; uma
+  recarga também pode ser pedida pela rota administrativa
+- a nova versão é carregada em segundo plano, aquecida e validada com uma
+  predição de teste (smoke test) antes de entrar em uso
+- a troca é uma única atribuição; requisições em andamento seguram a versão
+  antiga (lease) até terminar, e a versão antiga só sai do registro depois de
+  drenada
+
+Cada processo tem o seu registro: com vários workers do gunicorn, cada worker
+observa os arquivos e recarrega por conta própria. Atualizações do catálogo
+publicadas por outro worker (journal do catálogo compartilhado) são aplicadas
+pela versão ativa no início de cada requisição (lease).
+"""
+
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Any, Callable, Iterator, Optional, Tuple
+
+from dogmatch_predictor import BREED_ATTRIBUTES_FILE, DogMatchPredictor, EXAMPLE_INPUT
+
+# Versões anteriores mantidas no histórico de stats()
+HISTORY_SIZE = 5
+
+
+class ModelVersion:
+    """
+    Uma versão carregada do modelo e o número de requisições usando-a.
+    """
+
+    def __init__(self, number: int, predictor: DogMatchPredictor, source: str, fingerprint: Tuple,
+                 load_seconds: float):
+        self.number = number
+        self.predictor = predictor
+        self.source = source
+        self.fingerprint = fingerprint
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self.retired_at: Optional[float] = None
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self._drained = threading.Event()
+
+        # Identificador do conteúdo: versão do bundle ou hash dos .pkl
+        bundle = getattr(predictor, 'bundle', None)
+        self.checksum = bundle.version if bundle is not None else content_digest(source)
+
+    def acquire(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if self.in_flight == 0 and self.retired_at is not None:
+                self._drained.set()
+
+    def retire(self) -> None:
+        """Marca a versão como substituída (drenada quando a última requisição terminar)."""
+        with self._lock:
+            self.retired_at = time.time()
+            if self.in_flight == 0:
+                self._drained.set()
+
+    def wait_drained(self, timeout: float) -> bool:
+        return self._drained.wait(timeout)
+
+    def info(self) -> Dict[str, Any]:
+        """Identificação da versão (não muda enquanto ela existir)."""
+        return {
+            'version': self.number,
+            'checksum': self.checksum,
+            'source': self.source,
+            'loaded_at': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.loaded_at)),
+            'load_seconds': round(self.load_seconds, 3)
+        }
+
+    def status(self) -> Dict[str, Any]:
+        """info() mais as requisições em andamento."""
+        return {**self.info(), 'in_flight': self.in_flight}
+
+
+def _model_files(source: str) -> List[str]:
+    """
+    Arquivos que compõem a origem: o próprio bundle ou, no diretório, os .pkl e
+    os atributos das raças (breed_attributes.csv, usados nos filtros e no catálogo).
+    """
+    if os.path.isdir(source):
+        return sorted(os.path.join(source, name) for name in os.listdir(source)
+                      if name.endswith('.pkl') or name == BREED_ATTRIBUTES_FILE)
+    return [source]
+
+
+def source_fingerprint(source: str) -> Tuple:
+    """
+    Impressão barata da origem (nome, tamanho e mtime de cada arquivo) para detectar alterações.
+    """
+    fingerprint = []
+    for path in _model_files(source):
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        fingerprint.append((os.path.basename(path), stat.st_size, stat.st_mtime_ns))
+    return tuple(fingerprint)
+
+
+def content_digest(source: str) -> str:
+    """Prefixo do SHA-256 do conteúdo dos arquivos da origem."""
+    digest = hashlib.sha256()
+    for path in _model_files(source):
+        digest.update(os.path.basename(path).encode('utf-8'))
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()[:12]
+
+
+def smoke_test(predictor: DogMatchPredictor, reference: Optional[DogMatchPredictor] = None) -> None:
+    """
+    Aquece o predictor e confere uma predição de exemplo.
+
+    Args:
+        predictor: Versão candidata
+        reference: Versão ativa; a candidata precisa aceitar os mesmos campos de entrada
+
+    Raises:
+        ValueError: Se a predição de teste falhar ou os campos de entrada mudarem
+    """
+    if reference is not None and list(predictor.feature_columns) != list(reference.feature_columns):
+        raise ValueError(f"Campos de entrada incompatíveis com a versão ativa: {predictor.feature_columns}")
+
+    predictor.warmup()
+    results = predictor.predict(dict(EXAMPLE_INPUT))
+    if not results.get('predictions') or not results.get('similar_breeds'):
+        raise ValueError("Predição de teste retornou resultado vazio")
+    if results['predictions'][0]['breed'] not in set(predictor.breed_names):
+        raise ValueError(f"Predição de teste retornou raça fora do catálogo: {results['predictions'][0]['breed']}")
+
+
+class ModelRegistry:
+    """
+    Versão ativa do DogMatchPredictor com recarga em segundo plano e troca atômica.
+    """
+
+    def __init__(self, loader: Callable[[], DogMatchPredictor], source: str, poll_interval: float = 0.0,
+                 drain_timeout: float = 30.0, on_swap: Optional[Callable[[ModelVersion], None]] = None):
+        """
+        Args:
+            loader: Função que carrega um novo DogMatchPredictor a partir de source
+            source: Diretório dos .pkl ou caminho do bundle (observado e usado como versão)
+            poll_interval: Intervalo, em segundos, entre verificações da origem (0 desabilita)
+            drain_timeout: Tempo máximo de espera pelas requisições da versão antiga
+            on_swap: Chamado com a nova versão logo após a troca (ex.: limpar caches)
+        """
+        self.loader = loader
+        self.source = source
+        self.poll_interval = max(0.0, float(poll_interval))
+        self.drain_timeout = max(0.0, float(drain_timeout))
+        self.on_swap = on_swap
+
+        self._active: Optional[ModelVersion] = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._next_number = 1
+        self._watcher_pid: Optional[int] = None
+        self._draining: List[ModelVersion] = []
+        self._history: List[Dict[str, Any]] = []
+        self.reloads = 0
+        self.failed_reloads = 0
+        self.last_error: Optional[str] = None
+
+    @property
+    def active(self) -> Optional[ModelVersion]:
+        return self._active
+
+    def get(self) -> ModelVersion:
+        """
+        Versão ativa (carregada e aquecida na primeira chamada do processo).
+        """
+        active = self._active
+        if active is None:
+            with self._lock:
+                if self._active is None:
+                    self._active = self._load()
+                    print(f"✅ DogMatch Predictor v{self._active.number} carregado e aquecido em "
+                          f"{self._active.load_seconds:.2f}s (pid {os.getpid()})")
+                active = self._active
+        return active
+
+    @contextmanager
+    def lease(self) -> Iterator[ModelVersion]:
+        """
+        Usa a versão ativa durante o bloco; uma troca no meio não a afeta.
+
+        Também inicia o observador da origem no processo que atende requisições
+        (não no master do gunicorn, que só pré-carrega o modelo) e aplica as
+        atualizações do catálogo publicadas por outros processos.
+        """
+        self.ensure_watcher()
+        version = self.get()
+        version.predictor.sync_catalog()
+        version.acquire()
+        try:
+            yield version
+        finally:
+            version.release()
+
+    def _load(self, reference: Optional[DogMatchPredictor] = None) -> ModelVersion:
+        """Carrega e valida uma nova versão (sem ativá-la)."""
+        fingerprint = source_fingerprint(self.source)
+        started = time.perf_counter()
+        predictor = self.loader()
+        smoke_test(predictor, reference)
+        version = ModelVersion(self._next_number, predictor, self.source, fingerprint,
+                               time.perf_counter() - started)
+        self._next_number += 1
+        return version
+
+    def reload(self, wait: bool = False) -> Tuple[Dict[str, Any], bool]:
+        """
+        Carrega a origem novamente e troca a versão ativa se a nova passar no smoke test.
+
+        Args:
+            wait: Esperar a recarga terminar (padrão: roda em segundo plano)
+
+        Returns:
+            (estado do registro, True se a recarga foi iniciada/concluída; False se
+            outra recarga já estava em andamento)
+        """
+        if not self._reload_lock.acquire(blocking=False):
+            return self.stats(), False
+
+        if wait:
+            self._reload_locked()
+        else:
+            threading.Thread(target=self._reload_locked, name='dogmatch-model-reload', daemon=True).start()
+        return self.stats(), True
+
+    def _reload_locked(self) -> None:
+        """Recarga com _reload_lock já adquirido (liberado ao final)."""
+        try:
+            previous = self.get()
+            print(f"🔄 Recarregando modelos de {self.source}...")
+            number = self._next_number
+            try:
+                candidate = self._load(reference=previous.predictor)
+            except Exception as e:
+                self.failed_reloads += 1
+                self.last_error = f"v{number}: {e}"
+                print(f"❌ Recarga rejeitada, mantendo v{previous.number}: {e}")
+                return
+
+            self._swap(previous, candidate)
+        finally:
+            self._reload_lock.release()
+
+    def _swap(self, previous: ModelVersion, candidate: ModelVersion) -> None:
+        """Ativa a nova versão e drena a anterior."""
+        with self._lock:
+            self._active = candidate
+            self.reloads += 1
+            self.last_error = None
+            self._draining.append(previous)
+            self._history.insert(0, previous.info())
+            del self._history[HISTORY_SIZE:]
+        previous.retire()
+        if self.on_swap is not None:
+            self.on_swap(candidate)
+        print(f"✅ Modelo v{candidate.number} ({candidate.checksum}) ativo; "
+              f"drenando v{previous.number} ({previous.in_flight} requisições em andamento)")
+
+        drained = previous.wait_drained(self.drain_timeout)
+        with self._lock:
+            self._draining.remove(previous)
+        if drained:
+            print(f"🧹 Modelo v{previous.number} drenado e liberado")
+        else:
+            print(f"⚠️ Aviso: v{previous.number} ainda tinha {previous.in_flight} requisições após "
+                  f"{self.drain_timeout:.0f}s; liberada quando terminarem")
+
+    def ensure_watcher(self) -> None:
+        """
+        Inicia a thread que observa a origem (uma por processo; threads não sobrevivem ao fork).
+        """
+        if not self.poll_interval or self._watcher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+        threading.Thread(target=self._watch, name='dogmatch-model-watcher', daemon=True).start()
+        print(f"👀 Observando {self.source} a cada {self.poll_interval:g}s (pid {os.getpid()})")
+
+    def _watch(self) -> None:
+        """
+        Recarrega quando a origem muda e fica estável por uma verificação (arquivos
+        ainda sendo copiados não disparam a recarga).
+        """
+        seen = self._active.fingerprint if self._active is not None else source_fingerprint(self.source)
+        while True:
+            time.sleep(self.poll_interval)
+            current = source_fingerprint(self.source)
+            if current == seen or not current:
+                continue
+            time.sleep(self.poll_interval)
+            if source_fingerprint(self.source) != current:
+                continue
+            seen = current
+            self.reload(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Versão ativa, versões em drenagem, histórico e contadores de recarga.
+        """
+        with self._lock:
+            active = self._active
+            return {
+                'active': active.status() if active is not None else None,
+                'reloading': self._reload_lock.locked(),
+                'draining': [version.status() for version in self._draining],
+                'history': list(self._history),
+                'reloads': self.reloads,
+                'failed_reloads': self.failed_reloads,
+                'last_error': self.last_error,
+                'watching': bool(self.poll_interval),
+                'source': self.source
+            }
@@ -0,0 +1,214 @@
+"""
+DogMatch NumPy Models - Estimadores equivalentes aos do sklearn, em NumPy puro
+
+Este arquivo contém versões mínimas dos estimadores que o DogMatch usa
+(KNeighborsClassifier, NearestNeighbors, RobustScaler e LabelEncoder),
+reconstruídas a partir dos arrays do bundle (model_bundle.py). Com elas um
+worker serve requisições sem importar sklearn (nem pandas), o que reduz o
+tempo de import e a memória de cada processo.
+
+As classes têm os mesmos nomes, parâmetros e atributos treinados (classes_,
+_fit_X, _y, center_, scale_...) dos originais, então o restante do backend
+(export do bundle, FastFeaturePipeline, tabela de lookup) as usa sem
+distinção. Os KNN usam o SimilarityIndex para a busca brute-force: mesmas
+distâncias, mesma ordem de desempate e mesma regra de votação do sklearn.
+"""
+
+from typing import Dict, Any, Optional
+
+import numpy as np
+
+from similarity_index import SimilarityIndex
+
+
+def _as_matrix(X: Any, feature_names: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Matriz float64 2D; DataFrames são reordenados pelas colunas do treino.
+    """
+    if feature_names is not None and hasattr(X, 'columns'):
+        X = X[list(feature_names)]
+    X = np.asarray(X, dtype=np.float64)
+    return X[np.newaxis, :] if X.ndim == 1 else X
+
+
+def neighbor_weights(distances: np.ndarray, weights: Optional[str] = 'uniform') -> np.ndarray:
+    """
+    Pesos dos vizinhos: 1/distância com weights='distance'; se a consulta coincide
+    com alguma linha do catálogo, só as linhas a distância zero votam (peso 1),
+    como no sklearn.
+    """
+    if weights in (None, 'uniform'):
+        return np.ones_like(distances)
+    with np.errstate(divide='ignore'):
+        inverse = 1.0 / distances
+    inf_mask = np.isinf(inverse)
+    inf_row = inf_mask.any(axis=1)
+    inverse[inf_row] = inf_mask[inf_row]
+    return inverse
+
+
+def neighbor_probabilities(labels: np.ndarray, weights: np.ndarray, n_classes: int) -> np.ndarray:
+    """
+    Probabilidade de cada classe a partir dos vizinhos já encontrados.
+
+    Args:
+        labels: Código da classe de cada vizinho (n_consultas, k)
+        weights: Peso de cada vizinho (n_consultas, k), ver neighbor_weights()
+        n_classes: Número de classes do modelo
+    """
+    probabilities = np.zeros((labels.shape[0], n_classes))
+    rows = np.arange(labels.shape[0])
+    for column in range(labels.shape[1]):
+        probabilities[rows, labels[:, column]] += weights[:, column]
+    probabilities /= probabilities.sum(axis=1)[:, np.newaxis]
+    return probabilities
+
+
+class _BruteNeighbors:
+    """
+    Base dos KNN: guarda o catálogo e busca vizinhos com o SimilarityIndex.
+    """
+
+    def __init__(self, n_neighbors: int = 5, metric: str = 'minkowski', p: float = 2,
+                 metric_params: Optional[Dict[str, Any]] = None, **params: Any):
+        """
+        Args:
+            n_neighbors: Vizinhos usados por padrão em kneighbors()/predict()
+            metric: Métrica do sklearn ('cosine', 'euclidean', 'manhattan', 'minkowski'...)
+            p: Parâmetro da métrica minkowski
+            metric_params: Parâmetros extras da métrica (apenas 'p' é usado)
+            **params: Demais parâmetros do estimador do sklearn (algorithm, leaf_size,
+                n_jobs...), guardados para get_params() e sem efeito na busca
+        """
+        self.n_neighbors = n_neighbors
+        self.metric = metric
+        self.p = p
+        self.metric_params = metric_params
+        self._params = {'n_neighbors': n_neighbors, 'metric': metric, 'p': p,
+                        'metric_params': metric_params, **params}
+
+    def get_params(self, deep: bool = True) -> Dict[str, Any]:
+        return dict(self._params)
+
+    def _fit_index(self, X: Any) -> None:
+        if hasattr(X, 'columns'):
+            self.feature_names_in_ = np.asarray(X.columns, dtype=object)
+        self._fit_X = np.ascontiguousarray(_as_matrix(X))
+        self.n_features_in_ = self._fit_X.shape[1]
+        self.n_samples_fit_ = self._fit_X.shape[0]
+        p = (self.metric_params or {}).get('p', self.p)
+        self._index = SimilarityIndex(self._fit_X, metric=self.metric, p=p)
+
+    def use_index(self, index: SimilarityIndex) -> None:
+        """
+        Passa a buscar em um índice já construído sobre os mesmos dados de treino
+        (ex.: o do segmento compartilhado), sem guardar cópia própria.
+        """
+        self._fit_X = index.data
+        self._index = index
+
+    def kneighbors(self, X: Any, n_neighbors: Optional[int] = None,
+                   return_distance: bool = True) -> Any:
+        """
+        Vizinhos mais próximos de cada linha de X (mesmo formato do sklearn).
+
+        Raises:
+            ValueError: Se n_neighbors for maior que o catálogo
+        """
+        n_neighbors = self.n_neighbors if n_neighbors is None else n_neighbors
+        if n_neighbors > self.n_samples_fit_:
+            raise ValueError(f"Expected n_neighbors <= n_samples_fit, but n_neighbors = {n_neighbors}, "
+                             f"n_samples_fit = {self.n_samples_fit_}")
+        distances, indices = self._index.query(_as_matrix(X, getattr(self, 'feature_names_in_', None)),
+                                               n_neighbors)
+        return (distances, indices) if return_distance else indices
+
+
+class NearestNeighbors(_BruteNeighbors):
+    """
+    Equivalente ao sklearn.neighbors.NearestNeighbors (busca brute-force).
+    """
+
+    def fit(self, X: Any, y: Any = None) -> 'NearestNeighbors':
+        self._fit_index(X)
+        return self
+
+
+class KNeighborsClassifier(_BruteNeighbors):
+    """
+    Equivalente ao sklearn.neighbors.KNeighborsClassifier (pesos 'uniform' ou 'distance').
+    """
+
+    def __init__(self, n_neighbors: int = 5, weights: str = 'uniform', **params: Any):
+        """
+        Raises:
+            ValueError: Se weights não for 'uniform' nem 'distance'
+        """
+        if weights not in ('uniform', 'distance', None):
+            raise ValueError(f"Pesos não suportados sem sklearn: {weights}")
+        super().__init__(n_neighbors=n_neighbors, weights=weights, **params)
+        self.weights = weights
+
+    def fit(self, X: Any, y: Any) -> 'KNeighborsClassifier':
+        self._fit_index(X)
+        self.classes_, self._y = np.unique(np.asarray(y), return_inverse=True)
+        self._y = self._y.astype(np.intp)
+        return self
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        """
+        Probabilidade de cada classe (votos ponderados dos vizinhos, normalizados).
+        """
+        distances, indices = self.kneighbors(X)
+        return neighbor_probabilities(self._y[indices], neighbor_weights(distances, self.weights),
+                                      len(self.classes_))
+
+    def predict(self, X: Any) -> np.ndarray:
+        """
+        Classe mais votada de cada linha (empates: menor classe, como no sklearn).
+        """
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class RobustScaler:
+    """
+    Equivalente ao transform() de um sklearn.preprocessing.RobustScaler treinado.
+    """
+
+    def __init__(self, **params: Any):
+        self._params = dict(params)
+        self.center_: Optional[np.ndarray] = None
+        self.scale_: Optional[np.ndarray] = None
+
+    def get_params(self, deep: bool = True) -> Dict[str, Any]:
+        return dict(self._params)
+
+    def transform(self, X: Any) -> np.ndarray:
+        X = _as_matrix(X, getattr(self, 'feature_names_in_', None)).copy()
+        if self.center_ is not None:
+            X -= self.center_
+        if self.scale_ is not None:
+            X /= self.scale_
+        return X
+
+
+class LabelEncoder:
+    """
+    Equivalente ao transform() de um sklearn.preprocessing.LabelEncoder treinado.
+    """
+
+    def __init__(self, classes: Any = ()):
+        self.classes_ = np.asarray(classes, dtype=object)
+        self._codes = {value: code for code, value in enumerate(self.classes_)}
+
+    def transform(self, values: Any) -> np.ndarray:
+        """
+        Raises:
+            ValueError: Se algum valor não estiver em classes_
+        """
+        try:
+            return np.array([self._codes[value] for value in values], dtype=np.intp)
+        except (KeyError, TypeError):
+            unseen = sorted({str(value) for value in values if value not in self._codes})
+            raise ValueError(f"y contains previously unseen labels: {unseen}")
+
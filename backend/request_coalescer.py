@@ -0,0 +1,173 @@
+"""
+DogMatch Request Coalescer - Micro-batching de predições individuais
+
+Sob carga concorrente, muitas chamadas a /api/recommend chegam ao mesmo tempo
+e cada uma faria uma inferência de uma única linha. O RequestCoalescer junta as
+entradas que chegam dentro de uma janela curta (ex.: 2 ms) ou até N entradas,
+executa uma única passada vetorizada de DogMatchPredictor.predict_batch
+(encoding, scaling, model.predict e busca de similares) e devolve o resultado
+de cada chamador. Métricas de tamanho de lote e de latência adicionada pela
+fila ficam disponíveis em stats().
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Any, Callable, Optional, Tuple
+
+# Limites superiores dos buckets dos histogramas (o último bucket é "+Inf")
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_WAIT_BUCKETS_MS = (0.5, 1, 2, 5, 10, 25, 50, 100)
+
+
+class _Histogram:
+    """
+    Histograma simples: contagem por bucket (limite superior fixo), contagem total e soma.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self) -> Dict[str, Any]:
+        labels = [str(bound) for bound in self.buckets] + ['+Inf']
+        return {
+            'count': self.count,
+            'sum': round(self.total, 4),
+            'mean': round(self.total / self.count, 4) if self.count else 0.0,
+            'buckets': dict(zip(labels, self.counts))
+        }
+
+
+class RequestCoalescer:
+    """
+    Agrupa predições individuais em lotes executados por uma thread dedicada.
+    """
+
+    def __init__(self, get_predictor: Callable[[], Any], max_wait_ms: float = 2.0, max_batch: int = 64):
+        """
+        Args:
+            get_predictor: Função que retorna o DogMatchPredictor atual (usado quando
+                a entrada é enfileirada sem predictor)
+            max_wait_ms: Tempo máximo que a primeira entrada de um lote espera por outras
+            max_batch: Número máximo de entradas por lote
+        """
+        self.get_predictor = get_predictor
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.max_batch = max(1, int(max_batch))
+
+        self._queue: 'queue.Queue[Tuple[Dict[str, Any], int, Any, Future, float]]' = queue.Queue()
+        self._lock = threading.Lock()
+        self._batch_sizes = _Histogram(BATCH_SIZE_BUCKETS)
+        self._queue_wait_ms = _Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self.batches = 0
+        self.requests = 0
+
+        self._thread = threading.Thread(target=self._run, name='dogmatch-coalescer', daemon=True)
+        self._thread.start()
+
+    def submit(self, user_input: Dict[str, Any], top_k: int = 5, predictor: Optional[Any] = None) -> Future:
+        """
+        Enfileira uma entrada; o Future recebe o resultado (formato de predict()) ou a exceção.
+
+        Args:
+            predictor: DogMatchPredictor que deve calcular a entrada (ex.: a versão
+                reservada pela requisição); None usa get_predictor() no momento do lote
+        """
+        future: Future = Future()
+        self._queue.put((user_input, top_k, predictor, future, time.perf_counter()))
+        return future
+
+    def predict(self, user_input: Dict[str, Any], top_k: int = 5, predictor: Optional[Any] = None) -> Dict[str, Any]:
+        """
+        Equivalente bloqueante de DogMatchPredictor.predict, servido em lote.
+
+        Raises:
+            MissingFieldsError/ValueError: Entrada inválida (a mesma exceção de predict())
+            Exception: Falha interna na entrada ou no lote inteiro
+        """
+        return self.submit(user_input, top_k, predictor).result()
+
+    def _run(self) -> None:
+        while True:
+            pending = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(pending) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    pending.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # Esvaziar o que já chegou, sem esperar mais
+            while len(pending) < self.max_batch:
+                try:
+                    pending.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            self._flush(pending)
+
+    def _flush(self, pending: List[Tuple[Dict[str, Any], int, Any, Future, float]]) -> None:
+        """
+        Executa o lote (um predict_batch por predictor e top_k distintos) e resolve os Futures.
+        """
+        started = time.perf_counter()
+        with self._lock:
+            self.batches += 1
+            self.requests += len(pending)
+            self._batch_sizes.observe(len(pending))
+            for _, _, _, _, enqueued_at in pending:
+                self._queue_wait_ms.observe((started - enqueued_at) * 1000)
+
+        # Cada entrada é calculada pela versão do modelo que a requisição reservou
+        groups: Dict[Tuple[int, int], Tuple[Any, List[Tuple[Dict[str, Any], Future]]]] = {}
+        for user_input, top_k, predictor, future, _ in pending:
+            groups.setdefault((id(predictor), top_k), (predictor, []))[1].append((user_input, future))
+
+        for (_, top_k), (predictor, items) in groups.items():
+            try:
+                predictor = predictor if predictor is not None else self.get_predictor()
+                results = predictor.predict_batch([user_input for user_input, _ in items], top_k=top_k,
+                                                  return_exceptions=True)
+            except Exception as e:
+                for _, future in items:
+                    future.set_exception(Exception(f"Erro ao fazer predição: {e}"))
+                continue
+
+            for (_, future), result in zip(items, results):
+                if isinstance(result, Exception):
+                    # Mesma exceção que predict() levantaria (validação -> 400, falha interna -> 500)
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Configuração, distribuição do tamanho dos lotes e latência adicionada pela fila.
+        """
+        with self._lock:
+            return {
+                'enabled': True,
+                'max_wait_ms': self.max_wait * 1000,
+                'max_batch': self.max_batch,
+                'requests': self.requests,
+                'batches': self.batches,
+                'queued': self._queue.qsize(),
+                'batch_size': self._batch_sizes.snapshot(),
+                'queue_wait_ms': self._queue_wait_ms.snapshot()
+            }
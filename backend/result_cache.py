@@ -0,0 +1,132 @@
+"""
+DogMatch Result Cache - Cache LRU de resultados de predição
+
+Muitos usuários enviam questionários idênticos (ex.: os valores do
+/api/example). Este arquivo contém a classe ResultCache, um cache LRU em
+memória com tamanho máximo e TTL, indexado por uma forma canônica da entrada
+(valores numéricos normalizados, ordem das chaves irrelevante e top_k incluído).
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple
+
+
+class ResultCache:
+    """
+    Cache LRU thread-safe com expiração por TTL e contadores de uso.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 300.0):
+        """
+        Args:
+            max_size: Número máximo de entradas (0 desabilita o cache)
+            ttl: Tempo de vida de cada entrada, em segundos (0 = sem expiração)
+        """
+        self.max_size = max(0, int(max_size))
+        self.ttl = max(0.0, float(ttl))
+        self._entries: 'OrderedDict[Tuple, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Contadores expostos em stats()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def make_key(user_input: Dict[str, Any], fields: List[str], top_k: int) -> Tuple:
+        """
+        Chave canônica de uma entrada.
+
+        Considera apenas os campos usados pelo modelo, em ordem fixa; valores
+        numéricos (inclusive strings numéricas como "2.0") viram float, de modo
+        que 2, 2.0 e "2" geram a mesma chave.
+
+        Args:
+            user_input: Preferências do usuário
+            fields: Campos que influenciam o resultado
+            top_k: Número de raças similares pedido
+        """
+        values = []
+        for field in fields:
+            value = user_input.get(field)
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = float(value)
+            elif isinstance(value, str):
+                try:
+                    value = float(value)
+                except ValueError:
+                    pass
+            elif not isinstance(value, (bool, type(None))):
+                value = repr(value)
+            values.append(value)
+        return (int(top_k), tuple(values))
+
+    def get(self, key: Tuple) -> Optional[Any]:
+        """
+        Resultado em cache para a chave, ou None (miss ou entrada expirada).
+        """
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            stored_at, value = entry
+            if self.ttl and time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Tuple, value: Any) -> None:
+        """
+        Armazena um resultado, removendo o menos usado recentemente se o cache estiver cheio.
+        """
+        if not self.enabled:
+            return
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Remove todas as entradas (ex.: após trocar o modelo).
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Contadores e configuração do cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'enabled': self.enabled,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+            }
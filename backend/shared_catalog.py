@@ -0,0 +1,346 @@
+"""
+DogMatch Shared Catalog - Catálogo em um segmento de memória compartilhada
+
+Com vários workers (gunicorn), cada processo monta o próprio snapshot do
+catálogo: matriz pré-processada, índice de similaridade (matriz normalizada e
+normas), classe de cada linha, vizinhos pré-calculados por raça e índices de
+atributos dos filtros (attribute_index.py). Este arquivo
+grava essas estruturas uma única vez em um segmento (arquivo em /dev/shm ou
+outro diretório, no mesmo layout alinhado do bundle) que os processos mapeiam
+somente leitura: as páginas ficam uma única vez na memória, qualquer que seja o
+número de workers.
+
+- catalog_key(): identifica o catálogo (dados, labels, parâmetros dos modelos)
+  e nomeia o segmento; quem carregar o mesmo catálogo depois (outro worker, uma
+  recarga do modelo) reaproveita o segmento em vez de recalcular
+- write_segment(): grava o segmento (arquivo temporário + rename atômico)
+- CatalogSegment: segmento mapeado em memória (arrays somente leitura)
+- CatalogJournal: atualizações do catálogo (update_catalog) publicadas para
+  todos os processos; cada um reaplica as que ainda não viu e mapeia o
+  segmento que o processo que publicou já gravou
+- release_segment()/remove_written_segments()/remove_segments(): limpeza do
+  diretório (segmento substituído por update_catalog, saída do processo, saída
+  do master do gunicorn); processos que já mapearam um segmento removido
+  continuam usando as páginas
+
+Journal: um arquivo JSON Lines por catálogo base (catalog-<chave>.journal), só
+com acréscimos, uma linha por update_catalog: {"version", "upsert", "remove"}.
+
+Formato:
+    MAGIC (8 bytes) | versão do schema (uint32) | tamanho do cabeçalho (uint32)
+    | cabeçalho JSON | padding até 64 bytes | arrays (cada um alinhado a 64 bytes)
+"""
+
+import datetime
+import glob
+import hashlib
+import json
+import mmap
+import os
+import struct
+import weakref
+from contextlib import contextmanager
+from typing import Dict, List, Any, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem lock entre processos (um único processo por diretório)
+    fcntl = None
+
+import numpy as np
+
+from model_bundle import map_arrays, pack_arrays
+
+
+SEGMENT_MAGIC = b'DMCATSEG'
+SEGMENT_SCHEMA_VERSION = 1
+SEGMENT_ALIGNMENT = 64
+
+# Diretório padrão dos segmentos (tmpfs: memória compartilhada, sem escrita em disco)
+DEFAULT_SEGMENT_DIR = '/dev/shm/dogmatch'
+
+_PREFIX = struct.Struct('<8sII')
+
+# Segmentos gravados neste processo: {caminho: pid de quem gravou} (processos
+# criados por fork herdam o dicionário, por isso o pid)
+_written: Dict[str, int] = {}
+
+# Segmentos mapeados neste processo (um por snapshot que usa o catálogo compartilhado)
+_mapped: 'weakref.WeakSet[CatalogSegment]' = weakref.WeakSet()
+
+
+def _align(offset: int) -> int:
+    return (offset + SEGMENT_ALIGNMENT - 1) // SEGMENT_ALIGNMENT * SEGMENT_ALIGNMENT
+
+
+def catalog_key(data: np.ndarray, breed_labels: Any, model: Any, similarity_model: Any,
+                attributes: Optional[Dict[str, np.ndarray]] = None, **options: Any) -> str:
+    """
+    Identificador do catálogo: muda com os dados, as labels, os parâmetros,
+    dados de treino e classes do modelo principal, os atributos brutos das
+    raças e as opções do índice.
+
+    Args:
+        data: Matriz pré-processada do catálogo
+        breed_labels: Nome da raça de cada linha
+        model: Modelo principal (KNN)
+        similarity_model: Modelo de similaridade (define a métrica do índice)
+        attributes: Valores brutos das colunas numéricas de cada linha (índices de atributos)
+        **options: Demais parâmetros que alteram o snapshot (backend do índice, vizinhos por raça...)
+    """
+    digest = hashlib.sha256()
+    digest.update(_PREFIX.pack(SEGMENT_MAGIC, SEGMENT_SCHEMA_VERSION, 0))
+    digest.update(json.dumps(list(data.shape)).encode('utf-8'))
+    digest.update(np.ascontiguousarray(data, dtype=np.float64).tobytes())
+    digest.update(json.dumps([str(label) for label in breed_labels]).encode('utf-8'))
+    for estimator in (model, similarity_model):
+        digest.update(json.dumps(estimator.get_params(), sort_keys=True, default=str).encode('utf-8'))
+    digest.update(json.dumps([str(label) for label in getattr(model, 'classes_', [])]).encode('utf-8'))
+    digest.update(np.asarray(getattr(model, '_y', []), dtype=np.int64).tobytes())
+    fit_X = getattr(model, '_fit_X', None)
+    if fit_X is not None:
+        digest.update(np.ascontiguousarray(fit_X, dtype=np.float64).tobytes())
+    for col, values in sorted((attributes or {}).items()):
+        digest.update(col.encode('utf-8'))
+        digest.update(np.ascontiguousarray(values, dtype=np.float64).tobytes())
+    digest.update(json.dumps(options, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()[:24]
+
+
+def segment_path(directory: str, key: str) -> str:
+    """Caminho do segmento de um catálogo."""
+    return os.path.join(directory, f'catalog-{key}.seg')
+
+
+def journal_path(directory: str, key: str) -> str:
+    """Caminho do journal das atualizações de um catálogo base."""
+    return os.path.join(directory, f'catalog-{key}.journal')
+
+
+def write_segment(path: str, key: str, arrays: Dict[str, np.ndarray],
+                  metadata: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Grava os arrays do catálogo em um segmento.
+
+    O arquivo é escrito com outro nome e renomeado no fim, então processos que
+    abrem o segmento ao mesmo tempo nunca veem um arquivo incompleto; se dois
+    processos gravarem o mesmo catálogo, o conteúdo é o mesmo.
+
+    Args:
+        path: Caminho do segmento (ver segment_path())
+        key: catalog_key() do catálogo
+        arrays: {nome: array}
+        metadata: Campos extras do cabeçalho (ex.: métrica do índice)
+
+    Returns:
+        Cabeçalho gravado
+    """
+    layout, payload = pack_arrays(arrays)
+    header = {
+        'schema_version': SEGMENT_SCHEMA_VERSION,
+        'key': key,
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'pid': os.getpid(),
+        'payload_size': len(payload),
+        'arrays': layout,
+        **(metadata or {}),
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+    data_start = _align(_PREFIX.size + len(header_bytes))
+
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(_PREFIX.pack(SEGMENT_MAGIC, SEGMENT_SCHEMA_VERSION, len(header_bytes)))
+            f.write(header_bytes)
+            f.write(b'\0' * (data_start - f.tell()))
+            f.write(payload)
+        os.replace(tmp_path, path)
+        _written[path] = os.getpid()
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    return header
+
+
+class CatalogSegment:
+    """
+    Segmento do catálogo mapeado em memória: cabeçalho + arrays somente leitura.
+    """
+
+    def __init__(self, path: str, expected_key: Optional[str] = None):
+        """
+        Args:
+            path: Caminho do segmento
+            expected_key: catalog_key() esperado (confere que o segmento é do mesmo catálogo)
+
+        Raises:
+            ValueError: Se o arquivo não for um segmento, tiver outra versão de schema,
+                estiver truncado ou for de outro catálogo
+        """
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self._mmap) < _PREFIX.size:
+            raise ValueError(f"Segmento inválido (arquivo truncado): {path}")
+        magic, schema_version, header_size = _PREFIX.unpack_from(self._mmap, 0)
+        if magic != SEGMENT_MAGIC:
+            raise ValueError(f"Arquivo não é um segmento de catálogo do DogMatch: {path}")
+        if schema_version != SEGMENT_SCHEMA_VERSION:
+            raise ValueError(f"Versão de schema do segmento não suportada: {schema_version} "
+                             f"(esperada: {SEGMENT_SCHEMA_VERSION})")
+
+        self.header = json.loads(self._mmap[_PREFIX.size:_PREFIX.size + header_size].decode('utf-8'))
+        if expected_key is not None and self.header['key'] != expected_key:
+            raise ValueError(f"Segmento de outro catálogo: {path}")
+
+        data_start = _align(_PREFIX.size + header_size)
+        payload_size = self.header['payload_size']
+        if len(self._mmap) < data_start + payload_size:
+            raise ValueError(f"Segmento inválido (arquivo truncado): {path}")
+
+        payload = memoryview(self._mmap)[data_start:data_start + payload_size]
+        self.arrays = map_arrays(payload, self.header['arrays'])
+        _mapped.add(self)
+
+    @property
+    def nbytes(self) -> int:
+        """Tamanho do segmento mapeado."""
+        return len(self._mmap)
+
+
+class CatalogJournal:
+    """
+    Atualizações publicadas de um catálogo base e a posição até onde este
+    processo já as aplicou.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: Caminho do journal (ver journal_path())
+        """
+        self.path = path
+        self.offset = 0
+
+    def has_pending(self) -> bool:
+        """Se outro processo publicou atualizações ainda não aplicadas (um stat, sem ler o arquivo)."""
+        try:
+            return os.stat(self.path).st_size > self.offset
+        except FileNotFoundError:
+            return False
+
+    def pending(self) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Atualizações ainda não aplicadas (só linhas completas).
+
+        Returns:
+            (atualizações em ordem, posição do fim da última; passe-a a advance()
+            depois de aplicá-las)
+        """
+        try:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                data = f.read()
+        except FileNotFoundError:
+            return [], self.offset
+        end = data.rfind(b'\n') + 1
+        entries = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        return entries, self.offset + end
+
+    def advance(self, offset: int) -> None:
+        """Marca as atualizações até offset como aplicadas."""
+        self.offset = offset
+
+    def append(self, entry: Dict[str, Any]) -> None:
+        """
+        Publica uma atualização (chame dentro de lock(), depois de aplicar as pendentes).
+        """
+        line = json.dumps(entry, ensure_ascii=False).encode('utf-8') + b'\n'
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(self.path, 'ab') as f:
+            f.write(line)
+            self.offset = f.tell()
+
+    @contextmanager
+    def lock(self) -> Iterator[None]:
+        """Exclusão mútua entre processos para aplicar as pendentes e publicar (flock)."""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        with open(f'{self.path}.lock', 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def remove_segment(path: str) -> bool:
+    """
+    Remove um segmento.
+
+    Returns:
+        Se o arquivo existia
+    """
+    _written.pop(path, None)
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def release_segment(segment: CatalogSegment) -> bool:
+    """
+    Remove o segmento de um snapshot substituído (update_catalog), se foi este
+    processo que o gravou e nenhum outro snapshot do processo o mapeia.
+
+    Segmentos gravados por outro processo (ex.: o master do gunicorn, antes do
+    fork) continuam no diretório para os workers que ainda vão carregá-los; o
+    on_exit do master os remove.
+
+    Returns:
+        Se o arquivo foi removido
+    """
+    if _written.get(segment.path) != os.getpid():
+        return False
+    if any(other is not segment and other.path == segment.path for other in list(_mapped)):
+        return False
+    return remove_segment(segment.path)
+
+
+def remove_written_segments() -> int:
+    """
+    Remove os segmentos gravados por este processo (registrado com atexit pelo
+    api_service; sob o gunicorn, o on_exit do master remove os demais).
+
+    Returns:
+        Número de arquivos removidos
+    """
+    pid = os.getpid()
+    return sum(remove_segment(path) for path, owner in list(_written.items()) if owner == pid)
+
+
+def remove_segments(directory: str) -> int:
+    """
+    Remove os segmentos e journals de um diretório (processos que já mapearam
+    um segmento continuam usando as páginas até terminar).
+
+    Returns:
+        Número de arquivos removidos
+    """
+    removed = 0
+    paths = [path for pattern in ('catalog-*.seg', 'catalog-*.journal', 'catalog-*.journal.lock')
+             for path in glob.glob(os.path.join(directory, pattern))]
+    for path in paths:
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
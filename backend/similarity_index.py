@@ -0,0 +1,244 @@
+"""
+DogMatch Similarity Index - Busca top-k exata sobre o catálogo de raças
+
+Este arquivo contém a classe SimilarityIndex, um índice de vizinhos mais
+próximos feito sob medida para o catálogo (poucas dezenas de linhas em
+X_enhanced.pkl). Substitui o NearestNeighbors.kneighbors do sklearn em cada
+requisição, evitando a validação de entrada e o dispatch brute/árvore.
+
+O índice guarda a matriz do catálogo contígua (float64 ou float32), as normas
+das linhas pré-calculadas e usa argpartition para o top-k. Os resultados são
+os mesmos do sklearn (mesmas distâncias e mesma ordem de desempate).
+"""
+
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+
+# Métricas suportadas (mesmos nomes usados pelo sklearn)
+SUPPORTED_METRICS = ('cosine', 'euclidean', 'manhattan', 'cityblock', 'l1', 'l2', 'minkowski')
+
+# Número máximo de distâncias calculadas por bloco de consultas (limita memória em lotes)
+MAX_CHUNK_DISTANCES = 1 << 22
+
+
+def effective_metric(metric: str, p: float = 2) -> str:
+    """
+    Nome canônico de uma métrica do sklearn (aliases e minkowski com p=1/p=2).
+    """
+    if metric == 'minkowski' and p == 2 or metric == 'l2':
+        return 'euclidean'
+    if metric == 'minkowski' and p == 1 or metric in ('cityblock', 'l1'):
+        return 'manhattan'
+    return metric
+
+
+class SimilarityIndex:
+    """
+    Índice exato de vizinhos mais próximos sobre uma matriz fixa.
+
+    Construído uma única vez (no __init__ do DogMatchPredictor) e usado tanto
+    para consultas únicas quanto para lotes.
+    """
+
+    def __init__(self, data: Any, metric: str = 'cosine', p: float = 2, dtype: Any = np.float64):
+        """
+        Args:
+            data: Matriz do catálogo (n_amostras, n_features)
+            metric: Métrica de distância ('cosine', 'euclidean', 'manhattan', 'minkowski')
+            p: Parâmetro da métrica minkowski (p=1 manhattan, p=2 euclidiana)
+            dtype: np.float64 (paridade exata com o sklearn) ou np.float32
+
+        Raises:
+            ValueError: Se a métrica não for suportada
+        """
+        if metric not in SUPPORTED_METRICS:
+            raise ValueError(f"Métrica não suportada pelo índice: {metric}. "
+                             f"Métricas suportadas: {list(SUPPORTED_METRICS)}")
+
+        self.metric = effective_metric(metric, p)
+        self.p = p
+        self.dtype = np.dtype(dtype)
+        self.data = np.ascontiguousarray(data, dtype=self.dtype)
+        self.n_samples = self.data.shape[0]
+
+        # Normas das linhas pré-calculadas (cosine: matriz já normalizada)
+        self._sq_norms = np.einsum('ij,ij->i', self.data, self.data)
+        if self.metric == 'cosine':
+            norms = np.sqrt(self._sq_norms)
+            norms[norms == 0.0] = 1.0
+            self._normalized = np.ascontiguousarray(self.data / norms[:, np.newaxis])
+
+    @classmethod
+    def from_estimator(cls, estimator: Any, data: Any = None, dtype: Any = np.float64) -> 'SimilarityIndex':
+        """
+        Cria o índice com a mesma métrica de um NearestNeighbors/KNeighbors* treinado.
+
+        Args:
+            estimator: Estimador do sklearn já treinado
+            data: Matriz do catálogo (padrão: dados de treino do estimador)
+            dtype: Tipo de ponto flutuante do índice
+        """
+        if data is None:
+            data = estimator._fit_X
+        metric = estimator.metric if isinstance(estimator.metric, str) else None
+        if getattr(estimator, 'metric_params', None):
+            p = estimator.metric_params.get('p', estimator.p)
+        else:
+            p = getattr(estimator, 'p', 2)
+        return cls(data, metric=metric, p=p, dtype=dtype)
+
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """
+        Arrays do índice (dados e normas pré-calculadas), ex.: para gravar em um segmento compartilhado.
+        """
+        arrays = {'data': self.data, 'sq_norms': self._sq_norms}
+        if self.metric == 'cosine':
+            arrays['normalized'] = self._normalized
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], metric: str, p: float = 2) -> 'SimilarityIndex':
+        """
+        Reconstrói o índice a partir de arrays() sem recalcular nem copiar (ex.: views
+        somente leitura de um segmento de memória compartilhada).
+        """
+        index = cls.__new__(cls)
+        index.metric = effective_metric(metric, p)
+        index.p = p
+        index.data = arrays['data']
+        index.dtype = index.data.dtype
+        index.n_samples = index.data.shape[0]
+        index._sq_norms = arrays['sq_norms']
+        if index.metric == 'cosine':
+            index._normalized = arrays['normalized']
+        return index
+
+    def __len__(self) -> int:
+        return self.n_samples
+
+    def query(self, X: Any, k: int, rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Busca os k vizinhos mais próximos de cada linha de X.
+
+        Args:
+            X: Consultas (n_consultas, n_features) ou um único vetor
+            k: Número de vizinhos (limitado ao tamanho do catálogo)
+            rows: Linhas candidatas (ex.: as que passaram nos filtros, não vazias);
+                None considera o catálogo inteiro. Os índices retornados
+                continuam sendo linhas do catálogo
+
+        Returns:
+            (distâncias, índices), ambos com shape (n_consultas, k), ordenados
+            da menor para a maior distância
+
+        Raises:
+            ValueError: Se X contiver NaN/infinito
+        """
+        X = np.asarray(X, dtype=self.dtype)
+        if X.ndim == 1:
+            X = X[np.newaxis, :]
+        if not np.isfinite(X).all():
+            raise ValueError("Input X contains NaN or infinity.")
+
+        n_candidates = self.n_samples if rows is None else len(rows)
+        k = max(1, min(int(k), n_candidates))
+
+        # manhattan/minkowski materializam as diferenças (n_consultas, n_amostras, n_features)
+        per_query = n_candidates if self.metric in ('cosine', 'euclidean') else n_candidates * self.data.shape[1]
+        chunk_size = max(1, MAX_CHUNK_DISTANCES // max(per_query, 1))
+
+        if X.shape[0] <= chunk_size:
+            return self._query_chunk(X, k, rows)
+
+        distances = np.empty((X.shape[0], k), dtype=self.dtype)
+        indices = np.empty((X.shape[0], k), dtype=np.intp)
+        for start in range(0, X.shape[0], chunk_size):
+            stop = start + chunk_size
+            distances[start:stop], indices[start:stop] = self._query_chunk(X[start:stop], k, rows)
+        return distances, indices
+
+    def pairwise_distances(self, X: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Distâncias de cada consulta para todas as linhas do catálogo (ou só para rows).
+        """
+        data = self.data if rows is None else self.data[rows]
+        if self.metric == 'cosine':
+            normalized = self._normalized if rows is None else self._normalized[rows]
+            norms = np.sqrt(np.einsum('ij,ij->i', X, X))
+            norms[norms == 0.0] = 1.0
+            distances = X / norms[:, np.newaxis] @ normalized.T
+            distances *= -1
+            distances += 1
+            np.clip(distances, 0, 2, out=distances)
+            return distances
+
+        if self.metric == 'euclidean':
+            distances = X @ data.T
+            distances *= -2
+            distances += np.einsum('ij,ij->i', X, X)[:, np.newaxis]
+            distances += (self._sq_norms if rows is None else self._sq_norms[rows])[np.newaxis, :]
+            np.maximum(distances, 0, out=distances)
+            return np.sqrt(distances, out=distances)
+
+        diff = np.abs(X[:, np.newaxis, :] - data[np.newaxis, :, :])
+        if self.metric == 'manhattan':
+            return diff.sum(axis=2)
+        return (diff ** self.p).sum(axis=2) ** (1.0 / self.p)
+
+    def _query_chunk(self, X: np.ndarray, k: int,
+                     rows: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k de um bloco de consultas (mesmo algoritmo de desempate do sklearn).
+        """
+        distances = self.pairwise_distances(X, rows)
+        sample_range = np.arange(distances.shape[0])[:, np.newaxis]
+
+        indices = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        indices = indices[sample_range, np.argsort(distances[sample_range, indices])]
+
+        distances = distances[sample_range, indices]
+        if rows is not None:
+            indices = np.asarray(rows, dtype=np.intp)[indices]
+        return distances, indices
+
+
+# Backends de similaridade disponíveis para o DogMatchPredictor
+SIMILARITY_BACKENDS = ('exact', 'ivf', 'auto')
+
+# Com backend 'auto', catálogos a partir deste tamanho usam o índice aproximado (IVF)
+AUTO_ANN_MIN_SAMPLES = 20_000
+
+
+def build_similarity_index(estimator: Any, data: Any, backend: str = 'exact', **options: Any):
+    """
+    Cria o índice de similaridade do backend escolhido.
+
+    Args:
+        estimator: NearestNeighbors treinado (define a métrica)
+        data: Matriz do catálogo
+        backend: 'exact' (SimilarityIndex), 'ivf' (ann_index.IVFIndex, aproximado) ou
+            'auto' (IVF a partir de AUTO_ANN_MIN_SAMPLES linhas, exato abaixo disso)
+        **options: Parâmetros do IVFIndex (n_lists, n_probe, seed)
+
+    Raises:
+        ValueError: Se o backend ou a métrica não forem suportados
+    """
+    if backend not in SIMILARITY_BACKENDS:
+        raise ValueError(f"Backend de similaridade desconhecido: {backend}. "
+                         f"Backends disponíveis: {list(SIMILARITY_BACKENDS)}")
+
+    if backend == 'auto':
+        backend = 'ivf' if len(data) >= AUTO_ANN_MIN_SAMPLES else 'exact'
+        if backend == 'ivf':
+            try:
+                from ann_index import IVFIndex
+                return IVFIndex.from_estimator(estimator, data, **options)
+            except ValueError:
+                backend = 'exact'
+
+    if backend == 'ivf':
+        from ann_index import IVFIndex
+        return IVFIndex.from_estimator(estimator, data, **options)
+    return SimilarityIndex.from_estimator(estimator, data)
@@ -0,0 +1,42 @@
+"""
+Testes da pontuação offline (batch_score.py)
+
+Uso:
+    python -m pytest backend/tests
+"""
+
+import json
+import os
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Adicionar o diretório do backend ao path para importar os módulos
+sys.path.append(BACKEND_DIR)
+
+from batch_score import score_file
+from dogmatch_predictor import EXAMPLE_INPUT
+
+
+def test_jsonl_non_object_lines_get_row_errors_with_id_column(tmp_path):
+    input_path = tmp_path / 'input.jsonl'
+    output_path = tmp_path / 'output.jsonl'
+    lines = [
+        json.dumps({'user_id': 'u1', **EXAMPLE_INPUT}),
+        '[1, 2]',
+        '"x"',
+        '{inválido',
+        json.dumps({'user_id': 'u5', **EXAMPLE_INPUT}),
+    ]
+    input_path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+
+    summary = score_file(str(input_path), str(output_path), workers=1, chunk_size=2,
+                         id_column='user_id', progress=False)
+
+    rows = [json.loads(line) for line in output_path.read_text(encoding='utf-8').splitlines()]
+    assert summary['rows'] == 5
+    assert summary['errors'] == 3
+    assert [row['row'] for row in rows] == [0, 1, 2, 3, 4]
+    assert [row['user_id'] for row in rows] == ['u1', None, None, None, 'u5']
+    assert all('error' in row for row in rows[1:4])
+    assert 'error' not in rows[0] and 'error' not in rows[4]
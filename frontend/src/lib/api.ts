@@ -17,22 +17,34 @@ export interface ApiUserPreferences {
   "Friendly Rating (1-10)": number;
   "Life Span": number;
   "Average Weight (kg)": number;
+  // Restrições rígidas aplicadas antes do ranking (valor/lista ou faixa {min, max})
+  filters?: {
+    [field: string]: string | string[] | number | { min?: number; max?: number };
+  };
 }
 
 export interface ApiRecommendationResponse {
   api_version: string;
   predictions: Array<{
     breed: string;
-    score: number;
+    score: number;  // Probabilidade do modelo principal
+    rank: number;
+    attributes?: { [field: string]: string | number | null };  // Só com filters
   }>;
   similar_breeds: Array<{
     breed: string;
     rank: number;
     similarity: number;  // Campo correto da API
+    attributes?: { [field: string]: string | number | null };  // Só com filters
   }>;
   user_profile: {
     [key: string]: any;
   };
+  explanation?: {
+    catalog_size: number;
+    candidates: number;
+    filters: Array<{ field: string; condition: any; matches: number }>;
+  };
 }
 
 export interface ApiBreed {